@@ -1,21 +1,219 @@
 # backward_chaining.py
-import pytholog as pl
-from facts import MedicalFacts
-from rules import MedicalRules
+from knowledge_base import (COMPARISONS, Atom, MedicalKnowledgeBase, format_answers, is_variable, match_args,
+                            parse_query, substitute)
+from proof_tree import proof_table, proof_trees, supporting_facts
+
+
+class TabledResolver:
+    def __init__(self, knowledge_base, record_proofs=False):
+        """
+        Goal-directed resolution with answer tables (tabling)
+
+        Every subgoal is evaluated once per call pattern; its complete set of
+        answers is stored together with the versions of the predicates it
+        was derived from, and reused until one of those predicates changes.
+        Tables for goals naming a patient live in that patient's shard and
+        are dropped with it.
+
+        Args:
+            knowledge_base (MedicalKnowledgeBase): Facts and rules to resolve against
+            record_proofs (bool): Record the derivation of every derived answer
+                in the patient's proof table (see proof_tree)
+        """
+        self.kb = knowledge_base
+        self.record_proofs = record_proofs
+        # Tables built without recording have no proofs, so they are stored apart
+        self._tables_key = "proof_tables" if record_proofs else "tables"
+        self.tables = {}  # call pattern without a bound patient -> table entry
+        self._in_progress = {}  # call pattern being evaluated -> answers found so far
+        self._provisional_reads = set()
+
+    def clear_tables(self):
+        self.tables.clear()
+        for shard in self.kb.shards.values():
+            shard.cache.pop(self._tables_key, None)
+
+    @staticmethod
+    def call_pattern(goal):
+        # Variables are interchangeable: high_risk(X, r) and high_risk(Y, r) share a table
+        return goal.predicate, tuple(None if is_variable(term) else term for term in goal.args)
+
+    def _table_store(self, pattern):
+        patient = pattern[1][0] if pattern[1] else None
+        if patient is None:
+            return self.tables
+        shard = self.kb.shards.get(patient)
+        return None if shard is None else shard.cache.setdefault(self._tables_key, {})
+
+    def _table_valid(self, entry):
+        _, dependencies, rules_version = entry
+        return rules_version == self.kb.rules_version and all(
+            self.kb.version_of(predicate, patient) == version
+            for (patient, predicate), version in dependencies.items())
+
+    def solve(self, goal):
+        """
+        All answers to a goal
+
+        Args:
+            goal (Atom): Goal, possibly with variables
+
+        Returns:
+            tuple: Ground argument tuples of the goal's predicate
+        """
+        answers, _, _ = self._solve(self.call_pattern(goal))
+        return answers
+
+    def _solve(self, pattern):
+        store = self._table_store(pattern)
+        entry = store.get(pattern) if store is not None else None
+        if entry is not None and self._table_valid(entry):
+            return entry
+
+        predicate, call_args = pattern
+        patient = call_args[0] if call_args else None
+        dependencies = {(patient, predicate): self.kb.version_of(predicate, patient)}
+        if pattern in self._in_progress:
+            # Recursive call to an incomplete table: answer with what is known so far
+            self._provisional_reads.add(pattern)
+            return tuple(self._in_progress[pattern]), dependencies, self.kb.rules_version
+
+        graph = self.kb.rule_graph()
+        outer_reads = self._provisional_reads
+        self._provisional_reads = set()
+        self._in_progress[pattern] = {}
+        try:
+            while True:
+                answers = {}
+                for args in self.kb.lookup(predicate, patient):
+                    if all(term is None or term == value for term, value in zip(call_args, args)):
+                        answers[args] = None
+
+                for rule in graph.rules_by_head.get(predicate, ()):
+                    if patient is not None and self._missing_facts(rule, patient, graph, dependencies):
+                        continue
+                    bindings = self._bind_head(rule.head.args, call_args)
+                    if bindings is None:
+                        continue
+                    for solution in self._prove(rule.body, bindings, dependencies):
+                        args = tuple(substitute(term, solution) for term in rule.head.args)
+                        answers[args] = None
+                        if self.record_proofs:
+                            self._record(rule, args, solution, graph)
+
+                # Predicates on a cycle are re-evaluated until their answers stop growing
+                if not graph.is_recursive(predicate) or len(answers) == len(self._in_progress[pattern]):
+                    break
+                self._in_progress[pattern] = answers
+        finally:
+            del self._in_progress[pattern]
+            self._provisional_reads.discard(pattern)
+            incomplete = self._provisional_reads
+            self._provisional_reads = outer_reads | incomplete
+
+        entry = (tuple(answers), dependencies, self.kb.rules_version)
+        # Tables built on another goal's unfinished answers are not stored
+        if store is not None and not incomplete:
+            store[pattern] = entry
+        return entry
+
+    def _record(self, rule, args, solution, graph):
+        shard = self.kb.shards.get(args[0])
+        if shard is None:
+            return
+        proofs = proof_table(shard)
+        if not proofs.is_derived(rule.head.predicate, args):
+            proofs.record(rule.head.predicate, args, graph.rule_ids[rule], rule, solution,
+                          supporting_facts(rule, solution, self.solve))
+
+    def _missing_facts(self, rule, patient, graph, dependencies):
+        # A rule needing a fact predicate the patient has no facts of can never
+        # fire; its absence is recorded so the table is rebuilt once such a fact arrives
+        for goal in rule.body:
+            if isinstance(goal, Atom) and graph.is_base(goal.predicate):
+                version = self.kb.version_of(goal.predicate, patient)
+                if version <= 0:
+                    dependencies[(patient, goal.predicate)] = version
+                    return True
+        return False
+
+    @staticmethod
+    def _bind_head(head_args, call_args):
+        # Bind rule head variables to the call's constants; free call arguments (None) bind nothing
+        if len(head_args) != len(call_args):
+            return None
+        bindings = {}
+        for term, value in zip(head_args, call_args):
+            if value is None:
+                continue
+            if is_variable(term):
+                if bindings.setdefault(term, value) != value:
+                    return None
+            elif term != value:
+                return None
+        return bindings
+
+    def _prove(self, body, bindings, dependencies, position=0):
+        if position == len(body):
+            yield bindings
+            return
+
+        goal = body[position]
+        if isinstance(goal, Atom):
+            subgoal = Atom(goal.predicate, tuple(substitute(term, bindings) for term in goal.args))
+            answers, subgoal_dependencies, _ = self._solve(self.call_pattern(subgoal))
+            dependencies.update(subgoal_dependencies)
+            for args in answers:
+                extended = match_args(goal.args, args, bindings)
+                if extended is not None:
+                    yield from self._prove(body, extended, dependencies, position + 1)
+        elif COMPARISONS[goal.operator](substitute(goal.left, bindings), substitute(goal.right, bindings)):
+            yield from self._prove(body, bindings, dependencies, position + 1)
+
 
 class BackwardChainingReasoner:
-    def __init__(self):
-        self.facts = MedicalFacts()
-        self.rules = MedicalRules()
-        self.kb = pl.KnowledgeBase("MedicalExpertSystem")
-        
-        # Load facts and rules
-        self.kb(self.facts.get_knowledge_base())
-        self.kb(self.rules.get_rules())
+    def __init__(self, knowledge_base=None, compiled=False, record_proofs=False):
+        """
+        Args:
+            knowledge_base (MedicalKnowledgeBase): Shared knowledge base;
+                a default one with MedicalFacts and MedicalRules is built if omitted
+            compiled (bool): Evaluate the rules as compiled Python closures
+                (see rule_compiler) instead of interpreting them
+            record_proofs (bool): Record proof trees while resolving, for prove()
+
+        Raises:
+            ValueError: If both compiled and record_proofs are requested
+        """
+        self.kb = knowledge_base if knowledge_base is not None else MedicalKnowledgeBase.from_defaults()
+        if compiled and record_proofs:
+            raise ValueError("Proofs are only recorded by the interpreted resolver")
+        if compiled:
+            from rule_compiler import CompiledResolver
+            self.resolver = CompiledResolver(self.kb)
+        else:
+            self.resolver = TabledResolver(self.kb, record_proofs)
+
+    def prove(self, query):
+        """
+        Prove a hypothesis and return the proof of every answer
+
+        Args:
+            query (pl.Expr): The hypothesis to prove
+
+        Returns:
+            list: One proof_tree.ProofNode per answer
+        """
+        if not getattr(self.resolver, "record_proofs", False):
+            raise ValueError("Construct the reasoner with record_proofs=True to capture proofs")
+        goal = parse_query(query)
+        return proof_trees(self.kb, goal.predicate, self.resolver.solve(goal))
 
     def backward_chain(self, query):
         """
         Perform backward chaining to prove a hypothesis
+
+        Subgoal answers are tabled, so repeated and overlapping hypotheses
+        are answered from the tables instead of being re-derived.
         
         Args:
             query (pl.Expr): The hypothesis to prove
@@ -24,7 +222,9 @@ class BackwardChainingReasoner:
             list: List of proofs or results
         """
         try:
-            results = self.kb.query(query)
+            goal = parse_query(query)
+            solutions = (match_args(goal.args, args, {}) for args in self.resolver.solve(goal))
+            results = format_answers(goal, (bindings for bindings in solutions if bindings is not None))
             
             print(f"Backward Chaining Results for {query}:")
             for result in results:
@@ -42,6 +242,7 @@ class BackwardChainingReasoner:
         print("Testing Medical Hypotheses:")
         
         # Example hypotheses using Pytholog expressions
+        import pytholog as pl
         hypotheses = [
             pl.Expr("diagnose(john, viral_infection)"),
             pl.Expr("high_risk(john, diabetes_complications)"),
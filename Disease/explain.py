@@ -1,163 +1,235 @@
 # explain.py
+import sys
+from collections import namedtuple
+
+from knowledge_base import format_fact
+
+# One line of an explanation: the section it belongs to (facts, rules,
+# diagnoses, treatments), the template entry it was rendered from (None for
+# headings) and the display text
+ExplanationLine = namedtuple("ExplanationLine", "section key text")
+
+SYMPTOM_FACTS = {
+    'fever_check': 'Fever present',
+    'headache_check': 'Headache reported',
+    'fatigue_check': 'Fatigue experienced'
+}
+
+HISTORY_FACTS = {
+    'diabetes_history': 'History of Diabetes',
+    'hypertension_history': 'History of Hypertension'
+}
+
+DIAGNOSTIC_RULES = (
+    {
+        "condition": "Fever + Fatigue",
+        "explanation": "Combination of fever and fatigue typically indicates a viral infection",
+        "logic": "If patient has fever and fatigue, potential viral infection is suspected"
+    },
+    {
+        "condition": "Diabetes History + Fatigue",
+        "explanation": "Fatigue in a patient with diabetes history may indicate diabetes complications",
+        "logic": "Fatigue can be a sign of unmanaged diabetes or related metabolic issues"
+    },
+    {
+        "condition": "Hypertension + Headache",
+        "explanation": "Headache in a patient with hypertension history may suggest cardiovascular risk",
+        "logic": "Headaches can be a symptom of high blood pressure or cardiovascular stress"
+    }
+)
+
+DIAGNOSIS_DETAILS = {
+    "Viral Infection": {
+        "key_indicators": ["Fever", "Fatigue"],
+        "additional_info": "Viral infections are common and typically resolve with rest and hydration"
+    },
+    "Diabetes Complications": {
+        "key_indicators": ["Diabetes History", "Fatigue"],
+        "additional_info": "Ongoing fatigue may indicate need for diabetes management review"
+    },
+    "Cardiovascular Risk": {
+        "key_indicators": ["Hypertension History", "Headache"],
+        "additional_info": "Potential indicators of cardiovascular stress requiring medical attention"
+    }
+}
+
+TREATMENT_REASONING = {
+    "Viral Infection": {
+        "primary_goal": "Manage symptoms and support recovery",
+        "rationale": "Rest, hydration, and over-the-counter medications help the body fight viral infections"
+    },
+    "Diabetes Complications": {
+        "primary_goal": "Stabilize blood sugar and prevent further complications",
+        "rationale": "Requires medical consultation to adjust treatment plan and manage underlying condition"
+    },
+    "Cardiovascular Risk": {
+        "primary_goal": "Reduce cardiovascular stress and prevent potential complications",
+        "rationale": "Requires specialized medical assessment and potential lifestyle modifications"
+    }
+}
+
+# The templates rendered once at import; explanations only select and stream them
+_RULE_LINES = tuple(
+    ExplanationLine("rules", rule["condition"], text)
+    for rule in DIAGNOSTIC_RULES
+    for text in (f"   Rule: {rule['condition']}",
+                 f"   - {rule['explanation']}",
+                 f"   - Logical Reasoning: {rule['logic']}"))
+
+_DIAGNOSIS_LINES = {
+    diagnosis: (ExplanationLine("diagnoses", diagnosis, f"   {diagnosis}:"),
+                ExplanationLine("diagnoses", diagnosis, "   - Key Indicators:"),
+                *(ExplanationLine("diagnoses", diagnosis, f"     * {indicator}")
+                  for indicator in details["key_indicators"]),
+                ExplanationLine("diagnoses", diagnosis, f"   - {details['additional_info']}"))
+    for diagnosis, details in DIAGNOSIS_DETAILS.items()
+}
+
+_TREATMENT_LINES = {
+    diagnosis: (ExplanationLine("treatments", diagnosis, f"   {diagnosis} Treatment:"),
+                ExplanationLine("treatments", diagnosis, f"   - Primary Goal: {reasoning['primary_goal']}"),
+                ExplanationLine("treatments", diagnosis, f"   - Rationale: {reasoning['rationale']}"),
+                ExplanationLine("treatments", diagnosis, "   Recommended Actions:"))
+    for diagnosis, reasoning in TREATMENT_REASONING.items()
+}
+
+
 class MedicalExplanation:
-    def __init__(self, patient_info, diagnoses, treatments):
+    def __init__(self, patient_info, diagnoses, treatments, proofs=None):
         """
         Initialize explanation system
-        
+
         Args:
             patient_info (dict): Patient's collected information
             diagnoses (list): Diagnosed conditions
             treatments (dict): Recommended treatments
+            proofs (list): Proof trees (proof_tree.ProofNode) captured by a
+                reasoner; when given, the reasoning section shows the rules
+                that actually fired instead of the generic rule descriptions
         """
         self.patient_info = patient_info
         self.diagnoses = diagnoses
         self.treatments = treatments
+        self.proofs = proofs
+
+    def lines(self):
+        """
+        Generate the explanation lazily, one line at a time
+
+        Nothing is printed, so callers decide where the explanation goes:
+        a web front-end can stream the lines to the client and a batch job
+        can write them straight to a file.
+
+        Yields:
+            ExplanationLine: Explanation lines in display order
+        """
+        yield ExplanationLine("title", None, "\n=== Diagnostic Reasoning Explanation ===")
+        yield from self._explain_input_facts()
+        yield from self._explain_diagnostic_rules()
+        yield from self._explain_diagnoses()
+        yield from self._explain_treatments()
 
-    def explain_reasoning(self):
+    def explain_reasoning(self, output=None):
         """
         Provide a comprehensive explanation of the diagnostic reasoning
+
+        Args:
+            output (file): Text file to write to; defaults to stdout
         """
-        print("\n=== Diagnostic Reasoning Explanation ===")
-        
-        # Explain input facts
-        self._explain_input_facts()
-        
-        # Explain diagnostic rules
-        self._explain_diagnostic_rules()
-        
-        # Explain diagnoses
-        self._explain_diagnoses()
-        
-        # Explain treatment recommendations
-        self._explain_treatments()
+        output = output if output is not None else sys.stdout
+        for line in self.lines():
+            output.write(line.text + "\n")
 
     def _explain_input_facts(self):
         """
         Explain the input facts collected during the questionnaire
         """
-        print("\n1. Patient Input Facts:")
-        
-        # Symptom facts
-        symptom_facts = {
-            'fever_check': 'Fever present',
-            'headache_check': 'Headache reported',
-            'fatigue_check': 'Fatigue experienced'
-        }
-        
-        # Medical history facts
-        history_facts = {
-            'diabetes_history': 'History of Diabetes',
-            'hypertension_history': 'History of Hypertension'
-        }
-        
-        print("   Symptoms:")
-        for key, description in symptom_facts.items():
+        yield ExplanationLine("facts", None, "\n1. Patient Input Facts:")
+
+        yield ExplanationLine("facts", None, "   Symptoms:")
+        for key, description in SYMPTOM_FACTS.items():
             if self.patient_info.get(key):
-                print(f"   - {description}")
-        
-        print("\n   Medical History:")
-        for key, description in history_facts.items():
+                yield ExplanationLine("facts", key, f"   - {description}")
+
+        yield ExplanationLine("facts", None, "\n   Medical History:")
+        for key, description in HISTORY_FACTS.items():
             if self.patient_info.get(key):
-                print(f"   - {description}")
+                yield ExplanationLine("facts", key, f"   - {description}")
 
     def _explain_diagnostic_rules(self):
         """
         Explain the diagnostic reasoning rules
         """
-        print("\n2. Diagnostic Reasoning Rules:")
-        
-        rules = [
-            {
-                "condition": "Fever + Fatigue",
-                "explanation": "Combination of fever and fatigue typically indicates a viral infection",
-                "logic": "If patient has fever and fatigue, potential viral infection is suspected"
-            },
-            {
-                "condition": "Diabetes History + Fatigue",
-                "explanation": "Fatigue in a patient with diabetes history may indicate diabetes complications",
-                "logic": "Fatigue can be a sign of unmanaged diabetes or related metabolic issues"
-            },
-            {
-                "condition": "Hypertension + Headache",
-                "explanation": "Headache in a patient with hypertension history may suggest cardiovascular risk",
-                "logic": "Headaches can be a symptom of high blood pressure or cardiovascular stress"
-            }
-        ]
-        
-        for rule in rules:
-            print(f"   Rule: {rule['condition']}")
-            print(f"   - {rule['explanation']}")
-            print(f"   - Logical Reasoning: {rule['logic']}")
+        yield ExplanationLine("rules", None, "\n2. Diagnostic Reasoning Rules:")
+        if self.proofs is None:
+            yield from _RULE_LINES
+            return
+        for proof in self.proofs:
+            yield from _proof_lines(proof, 1)
 
     def _explain_diagnoses(self):
         """
         Provide detailed explanations for each diagnosis
         """
-        print("\n3. Diagnosis Explanations:")
-        
-        diagnosis_details = {
-            "Viral Infection": {
-                "key_indicators": ["Fever", "Fatigue"],
-                "additional_info": "Viral infections are common and typically resolve with rest and hydration"
-            },
-            "Diabetes Complications": {
-                "key_indicators": ["Diabetes History", "Fatigue"],
-                "additional_info": "Ongoing fatigue may indicate need for diabetes management review"
-            },
-            "Cardiovascular Risk": {
-                "key_indicators": ["Hypertension History", "Headache"],
-                "additional_info": "Potential indicators of cardiovascular stress requiring medical attention"
-            }
-        }
-        
+        yield ExplanationLine("diagnoses", None, "\n3. Diagnosis Explanations:")
         for diagnosis in self.diagnoses:
-            if diagnosis in diagnosis_details:
-                details = diagnosis_details[diagnosis]
-                print(f"   {diagnosis}:")
-                print("   - Key Indicators:")
-                for indicator in details['key_indicators']:
-                    print(f"     * {indicator}")
-                print(f"   - {details['additional_info']}")
+            yield from _DIAGNOSIS_LINES.get(diagnosis, ())
 
     def _explain_treatments(self):
         """
         Explain the reasoning behind treatment recommendations
         """
-        print("\n4. Treatment Recommendation Reasoning:")
-        
-        treatment_reasoning = {
-            "Viral Infection": {
-                "primary_goal": "Manage symptoms and support recovery",
-                "rationale": "Rest, hydration, and over-the-counter medications help the body fight viral infections"
-            },
-            "Diabetes Complications": {
-                "primary_goal": "Stabilize blood sugar and prevent further complications",
-                "rationale": "Requires medical consultation to adjust treatment plan and manage underlying condition"
-            },
-            "Cardiovascular Risk": {
-                "primary_goal": "Reduce cardiovascular stress and prevent potential complications",
-                "rationale": "Requires specialized medical assessment and potential lifestyle modifications"
-            }
-        }
-        
+        yield ExplanationLine("treatments", None, "\n4. Treatment Recommendation Reasoning:")
         for diagnosis, treatments in self.treatments.items():
-            if diagnosis in treatment_reasoning:
-                reasoning = treatment_reasoning[diagnosis]
-                print(f"   {diagnosis} Treatment:")
-                print(f"   - Primary Goal: {reasoning['primary_goal']}")
-                print(f"   - Rationale: {reasoning['rationale']}")
-                print("   Recommended Actions:")
+            if diagnosis in _TREATMENT_LINES:
+                yield from _TREATMENT_LINES[diagnosis]
                 for treatment in treatments:
-                    print(f"   - {treatment}")
+                    yield ExplanationLine("treatments", diagnosis, f"   - {treatment}")
+
+
+def _proof_lines(node, depth):
+    # A proven fact, the rule and bindings that derived it, then its supporting facts one level deeper
+    indent = "   " * depth
+    fact = format_fact(*node.fact)
+    if node.rule is None:
+        yield ExplanationLine("rules", fact, f"{indent}- {fact} (given)")
+        return
+    yield ExplanationLine("rules", fact, f"{indent}{fact}")
+    yield ExplanationLine("rules", fact, f"{indent}- Rule: {node.rule.text}")
+    if node.bindings:
+        bindings = ", ".join(f"{variable} = {value}" for variable, value in node.bindings.items())
+        yield ExplanationLine("rules", fact, f"{indent}- Bindings: {bindings}")
+    for child in node.children:
+        yield from _proof_lines(child, depth + 1)
+
+
+def stream_explanation(patient_info, diagnoses, treatments, proofs=None):
+    """
+    Generate an explanation's text lines without printing them
 
-def create_explanation(patient_info, diagnoses, treatments):
+    Args:
+        patient_info (dict): Collected patient information
+        diagnoses (list): Identified diagnoses
+        treatments (dict): Recommended treatments
+        proofs (list): Proof trees captured by a reasoner, if any
+
+    Yields:
+        str: Explanation text, one line at a time
+    """
+    for line in MedicalExplanation(patient_info, diagnoses, treatments, proofs).lines():
+        yield line.text
+
+
+def create_explanation(patient_info, diagnoses, treatments, output=None, proofs=None):
     """
     Create and display a comprehensive medical reasoning explanation
-    
+
     Args:
         patient_info (dict): Collected patient information
         diagnoses (list): Identified diagnoses
         treatments (dict): Recommended treatments
+        output (file): Text file to write to; defaults to stdout
+        proofs (list): Proof trees captured by a reasoner, if any
     """
-    explanation = MedicalExplanation(patient_info, diagnoses, treatments)
-    explanation.explain_reasoning()
\ No newline at end of file
+    explanation = MedicalExplanation(patient_info, diagnoses, treatments, proofs)
+    explanation.explain_reasoning(output)
@@ -1,29 +1,36 @@
 # facts.py
-import pytholog as pl
+import random
 
 class MedicalFacts:
-    def __init__(self):
+    def __init__(self, patient_id="john"):
+        """
+        Sample facts for one patient
+
+        Args:
+            patient_id (str): Patient the facts are recorded for
+        """
+        self.patient_id = patient_id
         self.patient_facts = [
-            "age(john, 45)",
-            "gender(john, male)",
-            "weight(john, 80)",
-            "height(john, 175)"
+            f"age({patient_id}, 45)",
+            f"gender({patient_id}, male)",
+            f"weight({patient_id}, 80)",
+            f"height({patient_id}, 175)"
         ]
 
         # Symptom-related facts
         self.symptom_facts = [
-            "symptom(john, fever)",
-            "symptom(john, headache)",
-            "symptom(john, fatigue)",
-            "fever_duration(john, 3)"  # Changed from duration to fever_duration
+            f"symptom({patient_id}, fever)",
+            f"symptom({patient_id}, headache)",
+            f"symptom({patient_id}, fatigue)",
+            f"fever_duration({patient_id}, 3)"  # Changed from duration to fever_duration
         ]
 
         # Medical history facts
         self.medical_history_facts = [
-            "history(john, diabetes)",
-            "history(john, hypertension)",
-            "medication(john, insulin)",
-            "medication(john, blood_pressure_medication)"
+            f"history({patient_id}, diabetes)",
+            f"history({patient_id}, hypertension)",
+            f"medication({patient_id}, insulin)",
+            f"medication({patient_id}, blood_pressure_medication)"
         ]
 
     def get_knowledge_base(self):
@@ -34,4 +41,27 @@ class MedicalFacts:
             self.patient_facts + 
             self.symptom_facts + 
             self.medical_history_facts
-        )
\ No newline at end of file
+        )
+
+def generate_patient_facts(patient_count, seed=0):
+    """
+    Synthetic patients with random ages, symptoms and history, for benchmarks
+
+    Args:
+        patient_count (int): Number of patients (patient0, patient1, ...)
+        seed (int): Random seed, so runs are reproducible
+
+    Returns:
+        list: Fact strings for all patients
+    """
+    rng = random.Random(seed)
+    facts = []
+    for index in range(patient_count):
+        patient_id = f"patient{index}"
+        facts.append(f"age({patient_id}, {rng.randint(18, 90)})")
+        facts.append(f"fever_duration({patient_id}, {rng.randint(0, 7)})")
+        facts.extend(f"symptom({patient_id}, {symptom})"
+                     for symptom in ("fever", "headache", "fatigue") if rng.random() < 0.5)
+        facts.extend(f"history({patient_id}, {condition})"
+                     for condition in ("diabetes", "hypertension") if rng.random() < 0.3)
+    return facts
@@ -1,21 +1,191 @@
 # forward_chaining.py
-import pytholog as pl
-from facts import MedicalFacts
-from rules import MedicalRules
+from knowledge_base import (COMPARISONS, Atom, MedicalKnowledgeBase, format_answers, is_variable, match_args,
+                            parse_query, substitute)
+from proof_tree import proof_table, proof_trees, supporting_facts
+
+
+def join_body(body, sources, bindings, position=0):
+    """
+    Enumerate the bindings satisfying a rule body, goal by goal
+
+    Args:
+        body (tuple): Atom and Comparison goals
+        sources (list): Per goal, the argument tuples to match atoms against
+        bindings (dict): Variable bindings so far
+
+    Yields:
+        dict: Complete bindings for the body
+    """
+    if position == len(body):
+        yield bindings
+        return
+
+    goal = body[position]
+    if isinstance(goal, Atom):
+        for args in sources[position]:
+            extended = match_args(goal.args, args, bindings)
+            if extended is not None:
+                yield from join_body(body, sources, extended, position + 1)
+    elif COMPARISONS[goal.operator](substitute(goal.left, bindings), substitute(goal.right, bindings)):
+        yield from join_body(body, sources, bindings, position + 1)
+
+
+class SemiNaiveEvaluator:
+    def __init__(self, knowledge_base, record_proofs=False):
+        """
+        Bottom-up evaluation of the knowledge base rules to a fixpoint
+
+        Rules are patient-local, so each patient shard is evaluated on its
+        own and its results cached in the shard until the shard or the rules
+        change.
+
+        Args:
+            knowledge_base (MedicalKnowledgeBase): Facts and rules to evaluate
+            record_proofs (bool): Record the derivation of every derived fact
+                in the patient's proof table (see proof_tree)
+        """
+        self.kb = knowledge_base
+        self.record_proofs = record_proofs
+        # Results computed without recording have no proofs, so they are cached apart
+        self._cache_key = "proof_fixpoint" if record_proofs else "fixpoint"
+
+    def materialize(self, patient_id, predicate=None):
+        """
+        Derive every fact the rules entail for one patient
+
+        Rules are evaluated stratum by stratum (see rule_graph), each stratum
+        to its own fixpoint. Within a stratum each round only joins rules
+        against facts that were new in the previous round (the delta);
+        evaluation stops when a round derives nothing new. With a predicate,
+        only the rules and facts that predicate depends on are evaluated.
+
+        Args:
+            patient_id: Patient whose shard is evaluated
+            predicate (str): Only derive what this predicate needs; everything if omitted
+
+        Returns:
+            dict: Base and derived facts of the patient, predicate -> {argument tuple: None}
+        """
+        shard = self.kb.shards.get(patient_id)
+        if shard is None:
+            return {}
+        key = (shard.stamp, self.kb.rules_version)
+        cached = shard.cache.get(self._cache_key)
+        if cached is None or cached[0] != key:
+            cached = shard.cache[self._cache_key] = (key, {})
+        if predicate in cached[1]:
+            return cached[1][predicate]
+
+        graph = self.kb.rule_graph()
+        if predicate is None:
+            facts = {name: dict(bucket) for name, bucket in shard.facts.items()}
+        else:
+            # Derived predicates can have stored facts too, so every predicate in the closure is copied
+            facts = {name: dict(shard.facts[name]) for name in graph.closure(predicate) if name in shard.facts}
+
+        proofs = proof_table(shard) if self.record_proofs else None
+
+        def candidates(atom):
+            return facts.get(atom.predicate, ())
+
+        for rules in graph.evaluation_strata(predicate):
+            # In the first round every known fact is new
+            delta = facts
+            while delta:
+                derived = {}
+                for rule in rules:
+                    for position, goal in enumerate(rule.body):
+                        if not isinstance(goal, Atom) or goal.predicate not in delta:
+                            continue
+                        # One goal reads the delta, the others everything known so far
+                        sources = [facts.get(other.predicate, ()) if isinstance(other, Atom) else None
+                                   for other in rule.body]
+                        sources[position] = list(delta[goal.predicate])
+                        for bindings in join_body(rule.body, sources, {}):
+                            args = tuple(substitute(term, bindings) for term in rule.head.args)
+                            if args not in facts.get(rule.head.predicate, ()):
+                                derived.setdefault(rule.head.predicate, {})[args] = None
+                                if proofs is not None:
+                                    proofs.record(rule.head.predicate, args, graph.rule_ids[rule], rule, bindings,
+                                                  supporting_facts(rule, bindings, candidates))
+
+                for name, bucket in derived.items():
+                    facts.setdefault(name, {}).update(bucket)
+                delta = derived
+
+        cached[1][predicate] = facts
+        return facts
+
+    def lookup(self, query):
+        """
+        Answer a query from the materialized facts
+
+        A query naming a patient only evaluates that patient's shard, and
+        only the rules the query's predicate depends on are evaluated.
+
+        Args:
+            query (Atom): Query atom, possibly with variables
+
+        Returns:
+            list: pytholog-style answers
+        """
+        patient = query.args[0] if query.args else None
+        patients = self.kb.shards if is_variable(patient) else (patient,)
+        solutions = (match_args(query.args, args, {})
+                     for patient_id in patients
+                     for args in self.materialize(patient_id, query.predicate).get(query.predicate, ()))
+        return format_answers(query, (bindings for bindings in solutions if bindings is not None))
+
 
 class ForwardChainingReasoner:
-    def __init__(self):
-        self.facts = MedicalFacts()
-        self.rules = MedicalRules()
-        self.kb = pl.KnowledgeBase("MedicalExpertSystem")
-        
-        # Load facts and rules
-        self.kb(self.facts.get_knowledge_base())
-        self.kb(self.rules.get_rules())
+    def __init__(self, knowledge_base=None, compiled=False, record_proofs=False):
+        """
+        Args:
+            knowledge_base (MedicalKnowledgeBase): Shared knowledge base;
+                a default one with MedicalFacts and MedicalRules is built if omitted
+            compiled (bool): Evaluate the rules as compiled Python closures
+                (see rule_compiler) instead of interpreting them
+            record_proofs (bool): Record proof trees while deriving, for prove()
+
+        Raises:
+            ValueError: If both compiled and record_proofs are requested
+        """
+        self.kb = knowledge_base if knowledge_base is not None else MedicalKnowledgeBase.from_defaults()
+        if compiled and record_proofs:
+            raise ValueError("Proofs are only recorded by the interpreted evaluator")
+        if compiled:
+            from rule_compiler import CompiledEvaluator
+            self.evaluator = CompiledEvaluator(self.kb)
+        else:
+            self.evaluator = SemiNaiveEvaluator(self.kb, record_proofs)
+
+    def prove(self, query):
+        """
+        Answer a query and return the proof of every answer
+
+        Args:
+            query (pl.Expr): The query to reason about
+
+        Returns:
+            list: One proof_tree.ProofNode per answer
+        """
+        if not self.evaluator.record_proofs:
+            raise ValueError("Construct the reasoner with record_proofs=True to capture proofs")
+        goal = parse_query(query)
+        patient = goal.args[0] if goal.args else None
+        patients = self.kb.shards if is_variable(patient) else (patient,)
+        answers = [args
+                   for patient_id in patients
+                   for args in self.evaluator.materialize(patient_id, goal.predicate).get(goal.predicate, ())
+                   if match_args(goal.args, args, {}) is not None]
+        return proof_trees(self.kb, goal.predicate, answers)
 
     def forward_chain(self, query):
         """
         Perform forward chaining to derive new facts
+
+        All facts entailed by the rules are materialized bottom-up once;
+        queries are then answered by lookups until the knowledge base changes.
         
         Args:
             query (pl.Expr): The query to reason about
@@ -24,7 +194,7 @@ class ForwardChainingReasoner:
             list: List of derived facts or results
         """
         try:
-            results = self.kb.query(query)
+            results = self.evaluator.lookup(parse_query(query))
             
             print(f"Forward Chaining Results for {query}:")
             for result in results:
@@ -42,6 +212,7 @@ class ForwardChainingReasoner:
         print("Deriving New Facts:")
         
         # Example derivations using Pytholog expressions
+        import pytholog as pl
         derivations = [
             pl.Expr("diagnose(john, X)"),
             pl.Expr("recommend_treatment(john, X)"),
@@ -0,0 +1,370 @@
+# knowledge_base.py
+import operator
+import re
+from collections import namedtuple
+
+from facts import MedicalFacts
+from rules import MedicalRules
+
+_UNBOUND = object()
+
+_ATOM = re.compile(r"^\s*([a-z_][A-Za-z0-9_]*)\s*\((.*)\)\s*$")
+_COMPARISON = re.compile(r"^\s*(.+?)\s*(>=|<=|==|!=|>|<)\s*(.+?)\s*$")
+
+COMPARISONS = {
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Parsed rule structure; atom/comparison arguments are parse_term() values,
+# variables are strings starting with an uppercase letter or "_"
+Atom = namedtuple("Atom", "predicate args")
+Comparison = namedtuple("Comparison", "left operator right")
+Rule = namedtuple("Rule", "head body text")
+
+
+def parse_term(token):
+    """
+    Convert a term token into a Python value (int, float or atom string)
+    """
+    token = token.strip()
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        return token
+
+
+def parse_fact(fact):
+    """
+    Split a fact string such as "symptom(john, fever)" into its parts
+
+    Returns:
+        tuple: (predicate, tuple of argument values)
+    """
+    match = _ATOM.match(fact)
+    if not match or ":-" in fact:
+        raise ValueError(f"Not a fact: {fact!r}")
+    predicate, arguments = match.groups()
+    return predicate, tuple(parse_term(argument) for argument in arguments.split(","))
+
+
+def is_variable(term):
+    return isinstance(term, str) and (term[:1].isupper() or term[:1] == "_")
+
+
+def _split_goals(body):
+    # Split a rule body on the commas that are not inside parentheses
+    goals, depth, start = [], 0, 0
+    for position, char in enumerate(body):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            goals.append(body[start:position])
+            start = position + 1
+    goals.append(body[start:])
+    return [goal.strip() for goal in goals if goal.strip()]
+
+
+def parse_rule(rule):
+    """
+    Parse a rule string such as "high_risk(X, r) :- history(X, d), Age > 40"
+
+    Returns:
+        Rule: Head Atom and a body of Atom / Comparison goals
+    """
+    head, body = rule.split(":-", 1)
+    goals = []
+    for goal in _split_goals(body):
+        if "(" in goal:
+            goals.append(Atom(*parse_fact(goal)))
+            continue
+        match = _COMPARISON.match(goal)
+        if not match:
+            raise ValueError(f"Unsupported goal {goal!r} in rule {rule!r}")
+        left, op, right = match.groups()
+        goals.append(Comparison(parse_term(left), op, parse_term(right)))
+    return Rule(Atom(*parse_fact(head)), tuple(goals), rule)
+
+
+def parse_query(query):
+    """
+    Turn a pytholog Expr or a query string into an Atom
+    """
+    if isinstance(query, str):
+        return Atom(*parse_fact(query))
+    return Atom(query.predicate, tuple(parse_term(term) for term in query.terms))
+
+
+def substitute(term, bindings):
+    return bindings.get(term, term) if is_variable(term) else term
+
+
+def match_args(pattern, values, bindings):
+    """
+    Unify atom arguments with a ground fact's arguments
+
+    Returns:
+        dict: Extended bindings, or None if they do not unify
+    """
+    if len(pattern) != len(values):
+        return None
+    extended = bindings
+    for term, value in zip(pattern, values):
+        if term == "_":
+            continue
+        if is_variable(term):
+            bound = extended.get(term, _UNBOUND)
+            if bound is _UNBOUND:
+                if extended is bindings:
+                    extended = dict(bindings)
+                extended[term] = value
+            elif bound != value:
+                return None
+        elif term != value:
+            return None
+    return extended
+
+
+def format_answers(query, solutions):
+    """
+    Shape solutions like pytholog query results
+
+    Args:
+        query (Atom): The query that was answered
+        solutions (iterable): Bindings dicts of the query's variables
+
+    Returns:
+        list: Distinct {variable: value} dicts with the values as strings,
+        as pytholog prints them; ["Yes"] for a proven ground query, or
+        ["No"] when there is no answer
+    """
+    variables = [term for term in dict.fromkeys(query.args) if is_variable(term) and term != "_"]
+    answers = {}
+    for bindings in solutions:
+        answer = tuple(bindings[variable] for variable in variables)
+        answers.setdefault(answer, None)
+    if not answers:
+        return ["No"]
+    if not variables:
+        return ["Yes"]
+    return [{variable: str(value) for variable, value in zip(variables, answer)} for answer in answers]
+
+
+def format_fact(predicate, args):
+    """
+    Inverse of parse_fact()
+    """
+    return f"{predicate}({', '.join(str(arg) for arg in args)})"
+
+
+def is_patient_local(rule):
+    """
+    True if every atom of the rule shares the head's first argument variable,
+    so the rule can be evaluated inside a single patient's shard
+    """
+    patient = rule.head.args[0] if rule.head.args else None
+    return is_variable(patient) and all(
+        goal.args and goal.args[0] == patient for goal in rule.body if isinstance(goal, Atom))
+
+
+class PatientShard:
+    """Facts of one patient, plus per-patient derived data cached by the reasoners"""
+    __slots__ = ("facts", "versions", "stamp", "cache")
+
+    def __init__(self):
+        self.facts = {}  # predicate -> {argument tuple: None}, in insertion order
+        self.versions = {}  # predicate -> stamp of its last change
+        self.stamp = 0
+        self.cache = {}
+
+
+class MedicalKnowledgeBase:
+    def __init__(self, name="MedicalExpertSystem"):
+        """
+        Knowledge base shared by the forward and backward reasoners
+
+        Facts are parsed once on insertion and partitioned by patient (their
+        first argument) into shards indexed by predicate, so one patient can
+        be queried, updated or dropped without touching the others. Rules
+        must be patient-local and are evaluated shard by shard.
+
+        Args:
+            name (str): Name of the pytholog knowledge base built for query()
+        """
+        self.name = name
+        self.shards = {}  # patient id -> PatientShard
+        self.rules = []
+        self.parsed_rules = []
+        self.rules_by_head = {}  # head predicate -> parsed rules
+        # Monotonic change counter; shards and predicates record the value of
+        # their last change so derived data can tell when it is stale
+        self.version = 0
+        self.rules_version = 0
+        self.predicate_versions = {}
+        self._interpreted = None
+        self._rule_graph = None
+
+    @classmethod
+    def from_defaults(cls):
+        """
+        Build a knowledge base holding MedicalFacts and MedicalRules
+        """
+        knowledge_base = cls()
+        knowledge_base.add_facts(MedicalFacts().get_knowledge_base())
+        knowledge_base.add_rules(MedicalRules().get_rules())
+        return knowledge_base
+
+    def add_fact(self, fact):
+        """
+        Add a single fact; already known facts are ignored
+
+        Returns:
+            bool: True if the fact was new
+        """
+        return bool(self.add_facts([fact]))
+
+    def add_facts(self, facts):
+        """
+        Add facts incrementally, touching only the shards they belong to
+
+        Args:
+            facts (iterable): Fact strings such as "symptom(john, fever)"
+
+        Returns:
+            list: The facts that were new
+        """
+        return [fact for fact in facts if self.insert(*parse_fact(fact))]
+
+    def insert(self, predicate, args):
+        """
+        Add an already parsed fact straight into its patient's shard
+
+        Args:
+            predicate (str): Fact predicate
+            args (tuple): Ground argument values, the patient id first
+
+        Returns:
+            bool: True if the fact was new
+        """
+        shard = self.shards.get(args[0])
+        if shard is None:
+            shard = self.shards[args[0]] = PatientShard()
+        bucket = shard.facts.setdefault(predicate, {})
+        if args in bucket:
+            return False
+        bucket[args] = None
+        self.version += 1
+        shard.versions[predicate] = shard.stamp = self.predicate_versions[predicate] = self.version
+        return True
+
+    def add_rules(self, rules):
+        """
+        Add rule strings to the knowledge base
+
+        Raises:
+            ValueError: If a rule joins facts of different patients
+        """
+        parsed_rules = [parse_rule(rule) for rule in rules]
+        if not parsed_rules:
+            return
+        for parsed in parsed_rules:
+            if not is_patient_local(parsed):
+                raise ValueError(f"Rule is not local to one patient: {parsed.text!r}")
+
+        self.version += 1
+        self.rules_version = self.version
+        for parsed in parsed_rules:
+            self.parsed_rules.append(parsed)
+            self.rules.append(parsed.text)
+            self.rules_by_head.setdefault(parsed.head.predicate, []).append(parsed)
+            self.predicate_versions[parsed.head.predicate] = self.version
+
+    def drop_patient(self, patient_id):
+        """
+        Remove a patient's shard and everything derived from it
+
+        Returns:
+            bool: True if the patient was known
+        """
+        shard = self.shards.pop(patient_id, None)
+        if shard is None:
+            return False
+        self.version += 1
+        for predicate in shard.facts:
+            self.predicate_versions[predicate] = self.version
+        return True
+
+    def version_of(self, predicate, patient_id=None):
+        """
+        Stamp of the last change to a predicate, for one patient or overall
+        """
+        if patient_id is None:
+            return self.predicate_versions.get(predicate, 0)
+        shard = self.shards.get(patient_id)
+        return -1 if shard is None else shard.versions.get(predicate, 0)
+
+    def lookup(self, predicate, first_arg=None):
+        """
+        Facts of a predicate, optionally restricted to one patient
+
+        Returns:
+            iterable: Argument tuples of the matching facts
+        """
+        if first_arg is not None:
+            shard = self.shards.get(first_arg)
+            return shard.facts.get(predicate, {}) if shard is not None else ()
+        return [args for shard in self.shards.values() for args in shard.facts.get(predicate, ())]
+
+    def rule_graph(self):
+        """
+        Dependency graph of the current rules, rebuilt after rule changes
+
+        Returns:
+            RuleGraph: Predicate dependencies, cycles and strata
+        """
+        if self._rule_graph is None or self._rule_graph[0] != self.rules_version:
+            from rule_graph import RuleGraph
+            self._rule_graph = (self.rules_version, RuleGraph(self.parsed_rules))
+        return self._rule_graph[1]
+
+    def interpreted(self):
+        """
+        pytholog KnowledgeBase with the current facts and rules, rebuilt after changes
+
+        Returns:
+            pl.KnowledgeBase: Knowledge base for pytholog's general resolution
+        """
+        if self._interpreted is None or self._interpreted[0] != self.version:
+            import pytholog as pl
+            kb = pl.KnowledgeBase(self.name)
+            kb([format_fact(predicate, args)
+                for shard in self.shards.values()
+                for predicate, bucket in shard.facts.items()
+                for args in bucket])
+            kb(self.rules)
+            self._interpreted = (self.version, kb)
+        return self._interpreted[1]
+
+    def query(self, expr):
+        """
+        Resolve a pytholog expression with pytholog's interpreter
+        """
+        return self.interpreted().query(expr)
+
+    def __call__(self, facts):
+        # Same calling convention as pytholog.KnowledgeBase, plus single fact strings
+        if isinstance(facts, str):
+            facts = [facts]
+        facts = list(facts)
+        self.add_rules([entry for entry in facts if ":-" in entry])
+        self.add_facts([entry for entry in facts if ":-" not in entry])
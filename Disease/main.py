@@ -1,40 +1,80 @@
 
-import pytholog as pl
-from forward_chaining import ForwardChainingReasoner
-from backward_chaining import BackwardChainingReasoner
+from itertools import count
+
+from knowledge_base import MedicalKnowledgeBase
 from questions import MedicalQuestions
 from explain import create_explanation
 
+
+def parse_expr(text):
+    """
+    Parse a query typed at the menu into a pytholog expression
+    """
+    import pytholog as pl
+    return pl.Expr(text)
+
+
 class MedicalExpertSystem:
     def __init__(self):
-        self.forward_reasoner = ForwardChainingReasoner()
-        self.backward_reasoner = BackwardChainingReasoner()
-        self.kb = self.forward_reasoner.kb  # Use the same knowledge base
+        # Facts and rules are parsed once and shared by both reasoners
+        self.kb = MedicalKnowledgeBase.from_defaults()
         self.medical_questions = MedicalQuestions(self.kb)
+        self._patient_numbers = count(1)
+        # The reasoners are built when a menu option first needs them
+        self._forward_reasoner = None
+        self._backward_reasoner = None
+
+    @property
+    def forward_reasoner(self):
+        if self._forward_reasoner is None:
+            from forward_chaining import ForwardChainingReasoner
+            self._forward_reasoner = ForwardChainingReasoner(self.kb)
+        return self._forward_reasoner
+
+    @property
+    def backward_reasoner(self):
+        if self._backward_reasoner is None:
+            from backward_chaining import BackwardChainingReasoner
+            # Proofs are recorded while resolving, so explanations need no second pass
+            self._backward_reasoner = BackwardChainingReasoner(self.kb, record_proofs=True)
+        return self._backward_reasoner
+
+    def new_patient_id(self):
+        """
+        A patient id with no facts in the knowledge base yet
+        """
+        while True:
+            patient_id = f"patient{next(self._patient_numbers)}"
+            if patient_id not in self.kb.shards:
+                return patient_id
 
     def run_diagnostic_process(self):
         """
         Run full diagnostic process with explanation
         """
+        # Answers are recorded for a new patient, so only they can support a diagnosis
+        questions = MedicalQuestions(self.kb, self.new_patient_id(), self.medical_questions.catalog)
+        print(f"Recording your answers as {questions.patient_id}")
+
         # Conduct interactive questionnaire
-        patient_info = self.medical_questions.interactive_questionnaire()
+        patient_info = questions.interactive_questionnaire()
         
-        # Generate diagnosis
-        diagnoses = self.medical_questions.generate_diagnosis(patient_info)
+        # One reasoning pass yields both the diagnoses and the proofs the explanation shows
+        diagnoses, proofs = questions.prove_diagnoses(self.backward_reasoner)
         print("\n=== Potential Diagnoses ===")
         for diagnosis in diagnoses:
             print(f"- {diagnosis}")
         
         # Recommend treatments
-        treatments = self.medical_questions.recommend_treatment(diagnoses)
+        treatments = questions.recommend_treatment(diagnoses)
         print("\n=== Treatment Recommendations ===")
         for diagnosis, recommendations in treatments.items():
             print(f"\n{diagnosis} Treatment:")
             for recommendation in recommendations:
                 print(f"- {recommendation}")
         
-        # Generate explanation
-        create_explanation(patient_info, diagnoses, treatments)
+        # Generate explanation from the rules that fired for the patient
+        create_explanation(patient_info, diagnoses, treatments, proofs=proofs)
 
     def interactive_forward_chaining(self):
         """
@@ -58,7 +98,7 @@ class MedicalExpertSystem:
 
             try:
                 # Convert string to Pytholog expression
-                query = pl.Expr(query_str)
+                query = parse_expr(query_str)
                 
                 # Perform forward chaining
                 print(f"\nForward Chaining Query: {query}")
@@ -93,7 +133,7 @@ class MedicalExpertSystem:
 
             try:
                 # Convert string to Pytholog expression
-                query = pl.Expr(query_str)
+                query = parse_expr(query_str)
                 
                 # Perform backward chaining
                 print(f"\nBackward Chaining Query: {query}")
@@ -139,9 +179,9 @@ def main():
             # Predefined forward chaining demonstration
             print("\n=== Predefined Forward Chaining Demonstration ===")
             queries = [
-                pl.Expr("diagnose(john, X)"),
-                pl.Expr("recommend_treatment(john, X)"),
-                pl.Expr("potential_serious_condition(john)")
+                parse_expr("diagnose(john, X)"),
+                parse_expr("recommend_treatment(john, X)"),
+                parse_expr("potential_serious_condition(john)")
             ]
             for query in queries:
                 print(f"\nForward Chaining Query: {query}")
@@ -151,9 +191,9 @@ def main():
             # Predefined backward chaining demonstration
             print("\n=== Predefined Backward Chaining Demonstration ===")
             queries = [
-                pl.Expr("diagnose(john, viral_infection)"),
-                pl.Expr("high_risk(john, diabetes_complications)"),
-                pl.Expr("recommend_treatment(john, rest_and_hydration)")
+                parse_expr("diagnose(john, viral_infection)"),
+                parse_expr("high_risk(john, diabetes_complications)"),
+                parse_expr("recommend_treatment(john, rest_and_hydration)")
             ]
             for query in queries:
                 print(f"\nBackward Chaining Query: {query}")
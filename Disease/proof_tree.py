@@ -0,0 +1,187 @@
+# proof_tree.py
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+
+from knowledge_base import Atom, is_variable, match_args, substitute
+
+# Expanded view of one derivation: the proven fact as (predicate, args), the
+# rule that derived it (None for a given fact), the rule's variable bindings
+# and the proofs of the facts it used
+ProofNode = namedtuple("ProofNode", "fact rule bindings children")
+
+
+@lru_cache(maxsize=None)
+def rule_variables(rule):
+    """
+    Variables of a rule in order of first appearance, head first
+
+    Returns:
+        tuple: Variable names
+    """
+    terms = list(rule.head.args)
+    for goal in rule.body:
+        terms.extend(goal.args if isinstance(goal, Atom) else (goal.left, goal.right))
+    return tuple(term for term in dict.fromkeys(terms) if is_variable(term) and term != "_")
+
+
+def supporting_facts(rule, bindings, candidates):
+    """
+    The ground facts a rule body used under a complete set of bindings
+
+    Args:
+        rule (Rule): Rule that fired
+        bindings (dict): Bindings of the rule's variables
+        candidates (function): Atom -> argument tuples matching it, used to
+            resolve "_" arguments
+
+    Returns:
+        list: (predicate, args) pairs in body order
+    """
+    supports = []
+    for goal in rule.body:
+        if not isinstance(goal, Atom):
+            continue
+        atom = Atom(goal.predicate, tuple(substitute(term, bindings) for term in goal.args))
+        if "_" in atom.args:
+            args = next(args for args in candidates(atom) if match_args(atom.args, args, {}) is not None)
+        else:
+            args = atom.args
+        supports.append((goal.predicate, args))
+    return supports
+
+
+class ProofTable:
+    """
+    First derivation of every fact a reasoner derived for one patient
+
+    Derivations are stored column-wise in flat arrays indexed by fact id:
+    the rule index (into the knowledge base's parsed_rules, -1 for given
+    facts), a slice of term ids holding the rule variable bindings and a
+    slice of fact ids of the facts the rule body used. Facts are never
+    retracted from a shard and rules are only appended, so a recorded
+    derivation stays valid for the lifetime of the shard.
+    """
+    __slots__ = ("facts", "fact_ids", "terms", "term_ids", "rule_of",
+                 "binding_start", "binding_end", "support_start", "support_end", "bindings", "supports")
+
+    def __init__(self):
+        self.facts = []  # fact id -> (predicate, args)
+        self.fact_ids = {}
+        self.terms = []  # term id -> value
+        self.term_ids = {}
+        self.rule_of = array("i")
+        self.binding_start = array("I")
+        self.binding_end = array("I")
+        self.support_start = array("I")
+        self.support_end = array("I")
+        self.bindings = array("I")
+        self.supports = array("I")
+
+    def fact_id(self, predicate, args):
+        fact = (predicate, args)
+        fact_id = self.fact_ids.get(fact)
+        if fact_id is None:
+            fact_id = self.fact_ids[fact] = len(self.facts)
+            self.facts.append(fact)
+            self.rule_of.append(-1)
+            for column in (self.binding_start, self.binding_end, self.support_start, self.support_end):
+                column.append(0)
+        return fact_id
+
+    def is_derived(self, predicate, args):
+        fact_id = self.fact_ids.get((predicate, args))
+        return fact_id is not None and self.rule_of[fact_id] != -1
+
+    def _term_id(self, value):
+        term_id = self.term_ids.get(value)
+        if term_id is None:
+            term_id = self.term_ids[value] = len(self.terms)
+            self.terms.append(value)
+        return term_id
+
+    def record(self, predicate, args, rule_id, rule, bindings, supports):
+        """
+        Record how a fact was derived, unless it already has a derivation
+
+        Args:
+            predicate (str): Derived fact's predicate
+            args (tuple): Derived fact's arguments
+            rule_id (int): Index of the rule in the knowledge base's parsed_rules
+            rule (Rule): The rule itself
+            bindings (dict): Bindings of the rule's variables
+            supports (list): (predicate, args) of the facts the body used
+
+        Returns:
+            bool: True if the derivation was recorded
+        """
+        if self.is_derived(predicate, args):
+            return False
+        fact_id = self.fact_id(predicate, args)
+        support_ids = [self.fact_id(*support) for support in supports]
+        self.rule_of[fact_id] = rule_id
+        self.binding_start[fact_id] = len(self.bindings)
+        self.bindings.extend(self._term_id(bindings[variable]) for variable in rule_variables(rule))
+        self.binding_end[fact_id] = len(self.bindings)
+        self.support_start[fact_id] = len(self.supports)
+        self.supports.extend(support_ids)
+        self.support_end[fact_id] = len(self.supports)
+        return True
+
+    def tree(self, predicate, args, rules):
+        """
+        Expand the recorded derivation of a fact into a ProofNode tree
+
+        Args:
+            predicate (str): Fact predicate
+            args (tuple): Fact arguments
+            rules (list): The knowledge base's parsed_rules
+
+        Returns:
+            ProofNode: The proof; a fact without a recorded derivation is a given fact
+        """
+        return self._node(self.fact_id(predicate, args), rules, set())
+
+    def _node(self, fact_id, rules, path):
+        rule_id = self.rule_of[fact_id]
+        if rule_id == -1 or fact_id in path:
+            return ProofNode(self.facts[fact_id], None, {}, ())
+        rule = rules[rule_id]
+        values = self.bindings[self.binding_start[fact_id]:self.binding_end[fact_id]]
+        path.add(fact_id)
+        children = tuple(self._node(support_id, rules, path)
+                         for support_id in self.supports[self.support_start[fact_id]:self.support_end[fact_id]])
+        path.discard(fact_id)
+        return ProofNode(self.facts[fact_id], rule,
+                         dict(zip(rule_variables(rule), (self.terms[value] for value in values))), children)
+
+
+def proof_table(shard):
+    """
+    The proof table of a patient shard, created on first use
+    """
+    table = shard.cache.get("proofs")
+    if table is None:
+        table = shard.cache["proofs"] = ProofTable()
+    return table
+
+
+def proof_trees(knowledge_base, predicate, answers):
+    """
+    Proofs of a query's answers, from the derivations recorded while answering it
+
+    Args:
+        knowledge_base (MedicalKnowledgeBase): Knowledge base the reasoner ran on
+        predicate (str): Query predicate
+        answers (iterable): Ground argument tuples of the answers
+
+    Returns:
+        list: One ProofNode per answer
+    """
+    trees = []
+    for args in answers:
+        shard = knowledge_base.shards.get(args[0])
+        if shard is None:
+            continue
+        trees.append(proof_table(shard).tree(predicate, args, knowledge_base.parsed_rules))
+    return trees
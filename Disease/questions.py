@@ -1,80 +1,203 @@
 # questions.py
-import pytholog as pl
+import json
+import os
+from collections import namedtuple
+
+from knowledge_base import MedicalKnowledgeBase, format_fact, is_variable, parse_fact
+
+DEFAULT_QUESTIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "questions.json")
+
+# A catalog question; predicate and args are the parsed template of the fact
+# a "yes" asserts, with a variable where the patient id goes
+Question = namedtuple("Question", "id question predicate args")
+
+_catalogs = {}
+
+
+def load_questions(path=DEFAULT_QUESTIONS):
+    """
+    Load and parse a question catalog, once per process
+
+    Args:
+        path (str): JSON file mapping a section name to its questions
+
+    Returns:
+        dict: Section name -> tuple of Question
+    """
+    catalog = _catalogs.get(path)
+    if catalog is None:
+        with open(path, encoding="utf-8") as f:
+            sections = json.load(f)
+        catalog = _catalogs[path] = {
+            section: tuple(Question(entry["id"], entry["question"], *parse_fact(entry["predicate"]))
+                           for entry in entries)
+            for section, entries in sections.items()
+        }
+    return catalog
+
+
+# Diagnosis table: a diagnosis applies when every listed answer is yes
+DIAGNOSIS_TABLE = (
+    {
+        "diagnosis": "Viral Infection",
+        "conditions": ("fever_check", "fatigue_check"),
+        "treatments": ("Get plenty of rest", "Stay hydrated", "Take over-the-counter fever reducers")
+    },
+    {
+        "diagnosis": "Diabetes Complications",
+        "conditions": ("diabetes_history", "fatigue_check"),
+        "treatments": ("Consult with your endocrinologist", "Monitor blood sugar levels", "Review medication dosage")
+    },
+    {
+        "diagnosis": "Cardiovascular Risk",
+        "conditions": ("hypertension_history", "headache_check"),
+        "treatments": ("Schedule a cardiology consultation", "Monitor blood pressure",
+                       "Consider lifestyle modifications")
+    }
+)
+
+# Head predicate of the rules a reasoner proves the table's diagnoses with,
+# e.g. suspected(Patient, viral_infection)
+GOAL_PREDICATE = "suspected"
+
+
+class DiagnosisIndex:
+    def __init__(self, table):
+        """
+        Diagnosis table compiled into bitmasks and lookups
+
+        Every answer id gets a bit; a diagnosis becomes the mask of its
+        conditions and applies when the answers' mask covers it. Diagnoses
+        are memoized per answer mask, so a repeated answer set is one dict
+        lookup however many diagnoses the table holds.
+
+        Args:
+            table (iterable): Entries with diagnosis, conditions and treatments
+        """
+        self.bits = {}
+        self.rules = []
+        for entry in table:
+            mask = 0
+            for condition in entry["conditions"]:
+                mask |= 1 << self.bits.setdefault(condition, len(self.bits))
+            self.rules.append((mask, entry["diagnosis"]))
+        self.treatments = {entry["diagnosis"]: tuple(entry["treatments"]) for entry in table}
+        self.conditions = {entry["diagnosis"]: tuple(entry["conditions"]) for entry in table}
+        # Diagnosis -> the atom naming it in goal rules, e.g. viral_infection
+        self.atoms = {entry["diagnosis"]: entry["diagnosis"].lower().replace(" ", "_") for entry in table}
+        self._by_mask = {}
+
+    def mask(self, patient_info):
+        """
+        Bitmask of the table conditions answered with yes
+        """
+        bits = self.bits
+        mask = 0
+        for key, answer in patient_info.items():
+            if answer and key in bits:
+                mask |= 1 << bits[key]
+        return mask
+
+    def diagnoses(self, patient_info):
+        """
+        Returns:
+            tuple: Diagnoses whose conditions all hold, in table order
+        """
+        mask = self.mask(patient_info)
+        diagnoses = self._by_mask.get(mask)
+        if diagnoses is None:
+            diagnoses = self._by_mask[mask] = tuple(
+                diagnosis for required, diagnosis in self.rules if mask & required == required)
+        return diagnoses
+
+    def goal_rules(self, catalog):
+        """
+        The table as rules, so a reasoner diagnoses exactly what diagnoses() does
+
+        Each diagnosis becomes GOAL_PREDICATE(Patient, <atom>) with the facts
+        its conditions' "yes" answers assert as the body.
+
+        Args:
+            catalog (dict): Parsed question catalog the condition ids refer to
+
+        Returns:
+            list: Rule strings, in table order
+        """
+        questions = {question.id: question for section in catalog.values() for question in section}
+        rules = []
+        for diagnosis, conditions in self.conditions.items():
+            body = ", ".join(format_fact(questions[condition].predicate, questions[condition].args)
+                             for condition in conditions)
+            rules.append(f"{GOAL_PREDICATE}(Patient, {self.atoms[diagnosis]}) :- {body}")
+        return rules
+
+
+DIAGNOSIS_INDEX = DiagnosisIndex(DIAGNOSIS_TABLE)
+
 
 class MedicalQuestions:
-    def __init__(self, knowledge_base):
+    def __init__(self, knowledge_base, patient_id="john", catalog=None):
         """
         Initialize medical questions with a knowledge base
         
         Args:
-            knowledge_base (pl.KnowledgeBase): Existing knowledge base
+            knowledge_base (MedicalKnowledgeBase): Existing knowledge base
+            patient_id (str): Patient whose answers are recorded
+            catalog (dict): Parsed question catalog; defaults to load_questions()
         """
         self.kb = knowledge_base
-    
+        self.patient_id = patient_id
+        self.catalog = catalog if catalog is not None else load_questions()
+
+    def fact_args(self, question):
+        """
+        Ground arguments of a question's fact for this patient
+        """
+        return tuple(self.patient_id if is_variable(term) else term for term in question.args)
+
+    def predicate(self, question):
+        """
+        A question's fact for this patient as a string, e.g. "symptom(john, fever)"
+        """
+        return format_fact(question.predicate, self.fact_args(question))
+
     def get_symptom_questions(self):
         """
-        Generate a list of symptom-related questions
+        Symptom-related questions
         
         Returns:
-            list: Symptom assessment questions
-        """
-        return [
-            {
-                "id": "fever_check",
-                "question": "Are you experiencing fever?",
-                "predicate": "symptom(john, fever)"
-            },
-            {
-                "id": "headache_check", 
-                "question": "Do you have a headache?",
-                "predicate": "symptom(john, headache)"
-            },
-            {
-                "id": "fatigue_check",
-                "question": "Are you feeling unusually tired or fatigued?", 
-                "predicate": "symptom(john, fatigue)"
-            }
-        ]
+            tuple: Symptom assessment questions
+        """
+        return self.catalog["symptoms"]
     
     def get_medical_history_questions(self):
         """
-        Generate questions about medical history
+        Questions about medical history
         
         Returns:
-            list: Medical history assessment questions
-        """
-        return [
-            {
-                "id": "diabetes_history",
-                "question": "Do you have a history of diabetes?",
-                "predicate": "history(john, diabetes)"
-            },
-            {
-                "id": "hypertension_history",
-                "question": "Have you been diagnosed with hypertension?",
-                "predicate": "history(john, hypertension)"
-            }
-        ]
+            tuple: Medical history assessment questions
+        """
+        return self.catalog["history"]
     
     def get_risk_assessment_questions(self):
         """
-        Generate risk assessment questions
+        Risk assessment questions
         
         Returns:
-            list: Risk assessment questions
-        """
-        return [
-            {
-                "id": "diabetes_risk",
-                "question": "Are you at risk for diabetes complications?",
-                "predicate": "high_risk(john, diabetes_complications)"
-            },
-            {
-                "id": "cardiovascular_risk",
-                "question": "Are you at risk for cardiovascular issues?",
-                "predicate": "high_risk(john, cardiovascular_risk)"
-            }
-        ]
+            tuple: Risk assessment questions
+        """
+        return self.catalog["risk"]
+
+    def record_answer(self, question, answer):
+        """
+        Store a yes/no answer; a yes asserts the question's fact directly in the fact index
+
+        Returns:
+            bool: The answer as a boolean
+        """
+        if answer:
+            self.kb.insert(question.predicate, self.fact_args(question))
+        return answer
     
     def interactive_questionnaire(self):
         """
@@ -89,22 +212,14 @@ class MedicalQuestions:
         # Symptom Questions
         print("\n--- Symptom Assessment ---")
         for q in self.get_symptom_questions():
-            response = input(f"{q['question']} (yes/no): ").lower()
-            patient_info[q['id']] = response == 'yes'
-            
-            # If yes, add to knowledge base
-            if response == 'yes':
-                self.kb(q['predicate'])
+            response = input(f"{q.question} (yes/no): ").lower()
+            patient_info[q.id] = self.record_answer(q, response == 'yes')
         
         # Medical History Questions
         print("\n--- Medical History ---")
         for q in self.get_medical_history_questions():
-            response = input(f"{q['question']} (yes/no): ").lower()
-            patient_info[q['id']] = response == 'yes'
-            
-            # If yes, add to knowledge base
-            if response == 'yes':
-                self.kb(q['predicate'])
+            response = input(f"{q.question} (yes/no): ").lower()
+            patient_info[q.id] = self.record_answer(q, response == 'yes')
         
         return patient_info
     
@@ -118,20 +233,29 @@ class MedicalQuestions:
         Returns:
             list: Potential diagnoses
         """
-        diagnoses = []
-        
-        # Example diagnostic logic
-        if patient_info.get('fever_check') and patient_info.get('fatigue_check'):
-            diagnoses.append("Viral Infection")
-        
-        if patient_info.get('diabetes_history') and patient_info.get('fatigue_check'):
-            diagnoses.append("Diabetes Complications")
-        
-        if patient_info.get('hypertension_history') and patient_info.get('headache_check'):
-            diagnoses.append("Cardiovascular Risk")
-        
-        return diagnoses
+        return list(DIAGNOSIS_INDEX.diagnoses(patient_info))
     
+    def prove_diagnoses(self, reasoner):
+        """
+        Diagnose the patient from the recorded answers with a reasoner
+
+        The diagnosis table is added to the knowledge base as goal rules
+        (see DiagnosisIndex.goal_rules), so the diagnoses are the same as
+        generate_diagnosis() gives for the answers, and each comes with the
+        proof of the query that found it.
+
+        Args:
+            reasoner (BackwardChainingReasoner): Reasoner over this knowledge
+                base, constructed with record_proofs=True
+
+        Returns:
+            tuple: (diagnoses in table order, their proofs)
+        """
+        self.kb.add_rules([rule for rule in DIAGNOSIS_INDEX.goal_rules(self.catalog) if rule not in self.kb.rules])
+        proofs = {proof.fact[1][1]: proof for proof in reasoner.prove(f"{GOAL_PREDICATE}({self.patient_id}, D)")}
+        diagnoses = [diagnosis for diagnosis, atom in DIAGNOSIS_INDEX.atoms.items() if atom in proofs]
+        return diagnoses, [proofs[DIAGNOSIS_INDEX.atoms[diagnosis]] for diagnosis in diagnoses]
+
     def recommend_treatment(self, diagnoses):
         """
         Recommend treatments based on diagnoses
@@ -140,40 +264,17 @@ class MedicalQuestions:
             diagnoses (list): List of potential diagnoses
         
         Returns:
-            dict: Treatment recommendations
+            dict: Treatment recommendations, diagnosis -> tuple of treatments
         """
-        treatments = {}
-        
-        for diagnosis in diagnoses:
-            if diagnosis == "Viral Infection":
-                treatments[diagnosis] = [
-                    "Get plenty of rest",
-                    "Stay hydrated",
-                    "Take over-the-counter fever reducers"
-                ]
-            
-            if diagnosis == "Diabetes Complications":
-                treatments[diagnosis] = [
-                    "Consult with your endocrinologist",
-                    "Monitor blood sugar levels",
-                    "Review medication dosage"
-                ]
-            
-            if diagnosis == "Cardiovascular Risk":
-                treatments[diagnosis] = [
-                    "Schedule a cardiology consultation",
-                    "Monitor blood pressure",
-                    "Consider lifestyle modifications"
-                ]
-        
-        return treatments
+        treatments = DIAGNOSIS_INDEX.treatments
+        return {diagnosis: treatments[diagnosis] for diagnosis in diagnoses if diagnosis in treatments}
 
 def main():
     """
     Demonstration of the medical questionnaire system
     """
     # Create a knowledge base (you might want to import from your main system)
-    kb = pl.KnowledgeBase("MedicalExpertSystem")
+    kb = MedicalKnowledgeBase("MedicalExpertSystem")
     
     # Initialize medical questions
     medical_questions = MedicalQuestions(kb)
@@ -0,0 +1,291 @@
+# rule_compiler.py
+import time
+
+from backward_chaining import TabledResolver
+from facts import generate_patient_facts
+from forward_chaining import SemiNaiveEvaluator
+from knowledge_base import Atom, MedicalKnowledgeBase, is_variable, match_args
+
+_EMPTY = {}
+
+
+def _goal_variables(goal):
+    terms = goal.args if isinstance(goal, Atom) else (goal.left, goal.right)
+    return {term for term in terms if is_variable(term) and term != "_"}
+
+
+def compile_rule(rule):
+    """
+    Compile a patient-local rule into a specialized Python generator function
+
+    The body is reordered once at compile time: atoms whose arguments are
+    all bound become O(1) membership tests, the remaining atoms are joined
+    in order of fewest unbound variables, and every comparison is inlined
+    as soon as its variables are bound.
+
+    Args:
+        rule (Rule): Parsed rule
+
+    Returns:
+        function: rule(patient_id, fetch) yielding head argument tuples, where
+        fetch(predicate) returns the patient's facts of that predicate
+    """
+    patient = rule.head.args[0]
+    names = {patient: "patient"}
+    predicates = list(dict.fromkeys(goal.predicate for goal in rule.body if isinstance(goal, Atom)))
+    lines = ["def compiled_rule(patient, fetch):"]
+    lines.extend(f"    facts_{index} = fetch({predicate!r})" for index, predicate in enumerate(predicates))
+
+    def expression(term):
+        return names[term] if is_variable(term) else repr(term)
+
+    atoms = [goal for goal in rule.body if isinstance(goal, Atom)]
+    comparisons = [goal for goal in rule.body if not isinstance(goal, Atom)]
+    indent = "    "
+    depth = 0
+
+    def emit_ready_comparisons():
+        nonlocal indent
+        for comparison in list(comparisons):
+            if _goal_variables(comparison) <= names.keys():
+                lines.append(f"{indent}if {expression(comparison.left)} {comparison.operator} "
+                             f"{expression(comparison.right)}:")
+                indent += "    "
+                comparisons.remove(comparison)
+
+    emit_ready_comparisons()
+    while atoms:
+        atom = min(atoms, key=lambda goal: len(_goal_variables(goal) - names.keys()))
+        atoms.remove(atom)
+        bucket = f"facts_{predicates.index(atom.predicate)}"
+
+        if _goal_variables(atom) <= names.keys() and "_" not in atom.args:
+            lines.append(f"{indent}if ({', '.join(expression(term) for term in atom.args)},) in {bucket}:")
+            indent += "    "
+        else:
+            row = f"row_{depth}"
+            depth += 1
+            lines.append(f"{indent}for {row} in {bucket}:")
+            indent += "    "
+            checks = [f"len({row}) == {len(atom.args)}"]
+            assignments = []
+            first_positions = {}
+            for position, term in enumerate(atom.args):
+                if term == "_":
+                    continue
+                if term in first_positions:
+                    checks.append(f"{row}[{position}] == {row}[{first_positions[term]}]")
+                elif is_variable(term) and term not in names:
+                    first_positions[term] = position
+                    assignments.append((term, f"{row}[{position}]"))
+                else:
+                    checks.append(f"{row}[{position}] == {expression(term)}")
+            for term, _ in assignments:
+                names[term] = f"var_{len(names)}"
+            # Bound values are checked before new variables are taken from the row
+            lines.append(f"{indent}if {' and '.join(checks)}:")
+            indent += "    "
+            lines.extend(f"{indent}{names[term]} = {value}" for term, value in assignments)
+        emit_ready_comparisons()
+
+    lines.append(f"{indent}yield ({', '.join(expression(term) for term in rule.head.args)},)")
+    namespace = {}
+    exec(compile("\n".join(lines), f"<rule {rule.text}>", "exec"), namespace)
+    compiled = namespace["compiled_rule"]
+    compiled.source = "\n".join(lines)
+    return compiled
+
+
+class CompiledRules:
+    def __init__(self, knowledge_base):
+        """
+        Compiled form of a knowledge base's rules, recompiled when the rules change
+        """
+        self.kb = knowledge_base
+        self._version = None
+        self.functions = {}  # parsed rule -> compiled function
+        self.by_head = {}
+
+    def get(self):
+        if self._version != self.kb.rules_version:
+            self.functions = {rule: compile_rule(rule) for rule in self.kb.parsed_rules}
+            self.by_head = {}
+            for rule, compiled in self.functions.items():
+                self.by_head.setdefault(rule.head.predicate, []).append(compiled)
+            self._version = self.kb.rules_version
+        return self
+
+
+class CompiledEvaluator(SemiNaiveEvaluator):
+    def __init__(self, knowledge_base):
+        """
+        Forward chaining over compiled rules, with the SemiNaiveEvaluator API
+        """
+        super().__init__(knowledge_base)
+        self.compiled = CompiledRules(knowledge_base)
+
+    def materialize(self, patient_id, predicate=None):
+        shard = self.kb.shards.get(patient_id)
+        if shard is None:
+            return {}
+        key = (shard.stamp, self.kb.rules_version)
+        cached = shard.cache.get("compiled_fixpoint")
+        if cached is None or cached[0] != key:
+            cached = shard.cache["compiled_fixpoint"] = (key, {})
+        if predicate in cached[1]:
+            return cached[1][predicate]
+
+        graph = self.kb.rule_graph()
+        if predicate is None:
+            facts = {name: dict(bucket) for name, bucket in shard.facts.items()}
+        else:
+            # Derived predicates can have stored facts too, so every predicate in the closure is copied
+            facts = {name: dict(shard.facts[name]) for name in graph.closure(predicate) if name in shard.facts}
+
+        def fetch(name):
+            return facts.get(name, _EMPTY)
+
+        functions = self.compiled.get().functions
+        for rules in graph.evaluation_strata(predicate):
+            changed = True
+            while changed:
+                changed = False
+                for rule in rules:
+                    head = rule.head.predicate
+                    derived = [args for args in functions[rule](patient_id, fetch)
+                               if args not in facts.get(head, _EMPTY)]
+                    if derived:
+                        facts.setdefault(head, {}).update(dict.fromkeys(derived))
+                        changed = True
+
+        cached[1][predicate] = facts
+        return facts
+
+
+class CompiledResolver:
+    def __init__(self, knowledge_base):
+        """
+        Backward chaining over compiled rules, with the TabledResolver API
+
+        A goal only runs the compiled rules of its predicate and, through
+        fetch, of the predicates those rules depend on. Answers are tabled
+        per patient and predicate in the patient's shard.
+        """
+        self.kb = knowledge_base
+        self.evaluator = CompiledEvaluator(knowledge_base)
+        self.compiled = self.evaluator.compiled
+
+    def solve(self, goal):
+        """
+        All answers to a goal
+
+        Returns:
+            tuple: Ground argument tuples of the goal's predicate
+        """
+        patient = goal.args[0] if goal.args else None
+        patients = list(self.kb.shards) if is_variable(patient) else [patient]
+        answers = []
+        for patient_id in patients:
+            for args in self._answers(goal.predicate, patient_id):
+                if match_args(goal.args, args, {}) is not None:
+                    answers.append(args)
+        return tuple(answers)
+
+    def _answers(self, predicate, patient_id):
+        shard = self.kb.shards.get(patient_id)
+        if shard is None:
+            return ()
+        key = (shard.stamp, self.kb.rules_version)
+        cached = shard.cache.get("compiled_tables")
+        if cached is None or cached[0] != key:
+            cached = shard.cache["compiled_tables"] = (key, {})
+        tables = cached[1]
+
+        if predicate not in tables and self.kb.rule_graph().is_recursive(predicate):
+            # Cycles are evaluated bottom-up as a whole, restricted to what the predicate needs
+            tables[predicate] = self.evaluator.materialize(patient_id, predicate).get(predicate, _EMPTY)
+        elif predicate not in tables:
+            answers = dict(shard.facts.get(predicate, _EMPTY))
+
+            def fetch(body_predicate):
+                self._answers(body_predicate, patient_id)
+                return tables.get(body_predicate, _EMPTY)
+
+            for compiled in self.compiled.get().by_head.get(predicate, ()):
+                answers.update(dict.fromkeys(compiled(patient_id, fetch)))
+            tables[predicate] = answers
+        return tables[predicate]
+
+
+def cross_check(knowledge_base):
+    """
+    Compare the compiled and interpreted evaluation of every patient
+
+    Returns:
+        list: Descriptions of the mismatches; empty when both paths agree
+    """
+    interpreted_forward = SemiNaiveEvaluator(knowledge_base)
+    compiled_forward = CompiledEvaluator(knowledge_base)
+    interpreted_backward = TabledResolver(knowledge_base)
+    compiled_backward = CompiledResolver(knowledge_base)
+    heads = {rule.head for rule in knowledge_base.parsed_rules}
+
+    mismatches = []
+    for patient_id in list(knowledge_base.shards):
+        expected = interpreted_forward.materialize(patient_id)
+        actual = compiled_forward.materialize(patient_id)
+        for predicate in expected.keys() | actual.keys():
+            if set(expected.get(predicate, ())) != set(actual.get(predicate, ())):
+                mismatches.append(f"forward {predicate} for {patient_id}")
+
+        for head in heads:
+            goal = Atom(head.predicate, (patient_id,) + tuple(f"V{index}" for index in range(len(head.args) - 1)))
+            if set(interpreted_backward.solve(goal)) != set(compiled_backward.solve(goal)):
+                mismatches.append(f"backward {head.predicate} for {patient_id}")
+    return mismatches
+
+
+def benchmark(patient_count=5000, seed=0):
+    """
+    Time interpreted against compiled evaluation on synthetic patients
+
+    Returns:
+        dict: Seconds per path, e.g. {"forward_interpreted": ..., "forward_compiled": ...}
+    """
+    timings = {}
+    for compiled in (False, True):
+        knowledge_base = MedicalKnowledgeBase.from_defaults()
+        knowledge_base.add_facts(generate_patient_facts(patient_count, seed))
+        label = "compiled" if compiled else "interpreted"
+
+        evaluator = CompiledEvaluator(knowledge_base) if compiled else SemiNaiveEvaluator(knowledge_base)
+        start = time.perf_counter()
+        for patient_id in knowledge_base.shards:
+            evaluator.materialize(patient_id)
+        timings[f"forward_{label}"] = time.perf_counter() - start
+
+        resolver = CompiledResolver(knowledge_base) if compiled else TabledResolver(knowledge_base)
+        start = time.perf_counter()
+        for patient_id in knowledge_base.shards:
+            resolver.solve(Atom("recommend_treatment", (patient_id, "T")))
+            resolver.solve(Atom("potential_serious_condition", (patient_id,)))
+        timings[f"backward_{label}"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    knowledge_base = MedicalKnowledgeBase.from_defaults()
+    knowledge_base.add_facts(generate_patient_facts(1000))
+    mismatches = cross_check(knowledge_base)
+    print(f"Cross-check: {'OK' if not mismatches else ', '.join(mismatches)}")
+
+    timings = benchmark()
+    for direction in ("forward", "backward"):
+        interpreted = timings[f"{direction}_interpreted"]
+        compiled = timings[f"{direction}_compiled"]
+        print(f"{direction.capitalize()} chaining: interpreted {interpreted * 1000:.1f} ms, "
+              f"compiled {compiled * 1000:.1f} ms ({interpreted / compiled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# rule_graph.py
+from knowledge_base import Atom, is_variable
+
+
+class RuleGraph:
+    def __init__(self, rules):
+        """
+        Predicate dependency graph of a rule set
+
+        An edge leads from a rule's head predicate to every predicate in its
+        body. Strongly connected components are the recursive predicate
+        groups (cycles); ordering them so that every predicate comes after
+        the predicates it depends on gives the strata used for evaluation.
+
+        Args:
+            rules (iterable): Parsed rules (knowledge_base.Rule)
+        """
+        self.rules = tuple(rules)
+        self.rule_ids = {rule: index for index, rule in enumerate(self.rules)}
+        self.rules_by_head = {}
+        self.depends_on = {}  # predicate -> predicates used in the bodies of its rules
+        for rule in self.rules:
+            head = rule.head.predicate
+            self.rules_by_head.setdefault(head, []).append(rule)
+            body = self.depends_on.setdefault(head, set())
+            for goal in rule.body:
+                if isinstance(goal, Atom):
+                    body.add(goal.predicate)
+                    self.depends_on.setdefault(goal.predicate, set())
+
+        self.components = self._strongly_connected_components()
+        self.component_of = {predicate: index
+                             for index, component in enumerate(self.components)
+                             for predicate in component}
+        self.cycles = [component for component in self.components
+                       if len(component) > 1 or self._has_self_loop(next(iter(component)))]
+
+        # Components come out dependencies first; base predicates are stratum 0
+        self.strata = {}
+        for component in self.components:
+            stratum = 0
+            for predicate in component:
+                for dependency in self.depends_on[predicate]:
+                    if dependency not in component:
+                        stratum = max(stratum, self.strata[dependency] + 1)
+            if any(predicate in self.rules_by_head for predicate in component):
+                stratum = max(stratum, 1)
+            for predicate in component:
+                self.strata[predicate] = stratum
+
+        self._closures = {}
+        self._dependencies = {}
+
+    def _has_self_loop(self, predicate):
+        return predicate in self.depends_on[predicate]
+
+    def _strongly_connected_components(self):
+        # Iterative Tarjan; emits each component after all components it depends on
+        index_of, low, on_stack, stack, components = {}, {}, set(), [], []
+        for root in self.depends_on:
+            if root in index_of:
+                continue
+            work = [(root, iter(self.depends_on[root]))]
+            index_of[root] = low[root] = len(index_of)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                predicate, dependencies = work[-1]
+                for dependency in dependencies:
+                    if dependency not in index_of:
+                        index_of[dependency] = low[dependency] = len(index_of)
+                        stack.append(dependency)
+                        on_stack.add(dependency)
+                        work.append((dependency, iter(self.depends_on[dependency])))
+                        break
+                    if dependency in on_stack:
+                        low[predicate] = min(low[predicate], index_of[dependency])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[predicate])
+                    if low[predicate] == index_of[predicate]:
+                        component = set()
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.add(member)
+                            if member == predicate:
+                                break
+                        components.append(frozenset(component))
+        return components
+
+    def is_base(self, predicate):
+        """
+        True if no rule derives the predicate, i.e. it only comes from facts
+        """
+        return predicate not in self.rules_by_head
+
+    def is_recursive(self, predicate):
+        return predicate in self.component_of and self.components[self.component_of[predicate]] in self.cycles
+
+    def closure(self, predicate):
+        """
+        The predicate and every predicate it transitively depends on
+
+        Returns:
+            frozenset: Predicate names
+        """
+        closure = self._closures.get(predicate)
+        if closure is None:
+            seen, pending = {predicate}, [predicate]
+            while pending:
+                for dependency in self.depends_on.get(pending.pop(), ()):
+                    if dependency not in seen:
+                        seen.add(dependency)
+                        pending.append(dependency)
+            closure = self._closures[predicate] = frozenset(seen)
+        return closure
+
+    def dependencies(self, predicate):
+        """
+        Minimal rules and fact predicates needed to answer queries on a predicate
+
+        Returns:
+            tuple: (rules in stratum order, frozenset of base predicates)
+        """
+        dependencies = self._dependencies.get(predicate)
+        if dependencies is None:
+            closure = self.closure(predicate)
+            rules = [rule for rule in self.rules if rule.head.predicate in closure]
+            rules.sort(key=lambda rule: self.strata[rule.head.predicate])
+            dependencies = self._dependencies[predicate] = (
+                tuple(rules), frozenset(name for name in closure if self.is_base(name)))
+        return dependencies
+
+    def evaluation_strata(self, predicate=None):
+        """
+        Rules grouped by stratum, optionally restricted to one predicate's dependencies
+
+        Returns:
+            list: Tuples of rules; each group only depends on earlier groups and itself
+        """
+        rules = self.rules if predicate is None else self.dependencies(predicate)[0]
+        groups = {}
+        for rule in rules:
+            groups.setdefault(self.strata[rule.head.predicate], []).append(rule)
+        return [tuple(groups[stratum]) for stratum in sorted(groups)]
+
+
+def relevant_facts(knowledge_base, query):
+    """
+    The facts a query can depend on, for the query's patient or for everyone
+
+    Args:
+        knowledge_base (MedicalKnowledgeBase): Facts and rules
+        query (Atom): Query atom, possibly with variables
+
+    Returns:
+        dict: predicate -> list of argument tuples
+    """
+    predicates = knowledge_base.rule_graph().closure(query.predicate)
+    patient = query.args[0] if query.args else None
+    first_arg = None if is_variable(patient) else patient
+    # Derived predicates are included: facts can be stored for them too
+    return {predicate: list(knowledge_base.lookup(predicate, first_arg)) for predicate in sorted(predicates)}
@@ -1,5 +1,4 @@
 # rules.py
-import pytholog as pl
 
 class MedicalRules:
     def __init__(self):
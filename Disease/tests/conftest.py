@@ -0,0 +1,33 @@
+# conftest.py
+import os
+import sys
+
+import pytest
+
+# The Disease modules import each other by bare module name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_base import MedicalKnowledgeBase  # noqa: E402
+
+# Patient-local transitive closure: reachable/3 depends on itself
+RECURSIVE_RULES = [
+    "reachable(P, A, B) :- link(P, A, B)",
+    "reachable(P, A, C) :- link(P, A, B), reachable(P, B, C)",
+]
+
+RECURSIVE_FACTS = ["link(p, a, b)", "link(p, b, c)", "link(p, c, a)", "link(p, c, d)", "link(q, x, y)"]
+
+
+@pytest.fixture
+def knowledge_base():
+    """MedicalFacts and MedicalRules, as the expert system starts with"""
+    return MedicalKnowledgeBase.from_defaults()
+
+
+@pytest.fixture
+def recursive_knowledge_base():
+    knowledge_base = MedicalKnowledgeBase()
+    knowledge_base.add_rules(RECURSIVE_RULES)
+    knowledge_base.add_facts(RECURSIVE_FACTS)
+    return knowledge_base
+
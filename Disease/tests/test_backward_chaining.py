@@ -0,0 +1,104 @@
+# test_backward_chaining.py
+import pytest
+import pytholog as pl
+
+from backward_chaining import BackwardChainingReasoner, TabledResolver
+from knowledge_base import Atom
+
+HYPOTHESES = [
+    "diagnose(john, viral_infection)",
+    "high_risk(john, diabetes_complications)",
+    "high_risk(john, heart_failure)",
+    "recommend_treatment(john, rest_and_hydration)",
+    "recommend_treatment(john, X)",
+    "potential_serious_condition(X)",
+    "fever_duration(john, D)",
+]
+
+
+def answers(reasoner, query):
+    return sorted(map(str, reasoner.backward_chain(query)))
+
+
+def pytholog_answers(knowledge_base, query):
+    # pytholog repeats an answer once per derivation; the reasoners list it once
+    return sorted(set(map(str, knowledge_base.query(pl.Expr(query)))))
+
+
+@pytest.fixture(params=[False, True], ids=["tabled", "compiled"])
+def compiled(request):
+    return request.param
+
+
+@pytest.mark.parametrize("query", HYPOTHESES)
+def test_default_results_match_pytholog(knowledge_base, compiled, query):
+    reasoner = BackwardChainingReasoner(knowledge_base, compiled=compiled)
+    assert answers(reasoner, query) == pytholog_answers(knowledge_base, query)
+
+
+def test_default_results(knowledge_base, compiled):
+    reasoner = BackwardChainingReasoner(knowledge_base, compiled=compiled)
+    assert reasoner.backward_chain("diagnose(john, viral_infection)") == ["Yes"]
+    assert answers(reasoner, "high_risk(john, X)") == [
+        "{'X': 'cardiovascular_risk'}", "{'X': 'diabetes_complications'}"]
+    assert reasoner.backward_chain("fever_duration(john, D)") == [{"D": "3"}]
+
+
+def test_recursive_rules(recursive_knowledge_base, compiled):
+    reasoner = BackwardChainingReasoner(recursive_knowledge_base, compiled=compiled)
+    assert answers(reasoner, "reachable(p, a, X)") == [
+        "{'X': 'a'}", "{'X': 'b'}", "{'X': 'c'}", "{'X': 'd'}"]
+    assert reasoner.backward_chain("reachable(p, d, a)") == ["No"]
+    assert answers(reasoner, "reachable(X, x, Y)") == ["{'X': 'q', 'Y': 'y'}"]
+
+
+def test_recursive_tables_see_new_facts(recursive_knowledge_base, compiled):
+    reasoner = BackwardChainingReasoner(recursive_knowledge_base, compiled=compiled)
+    assert reasoner.backward_chain("reachable(p, d, a)") == ["No"]
+    recursive_knowledge_base.add_facts(["link(p, d, a)"])
+    assert reasoner.backward_chain("reachable(p, d, a)") == ["Yes"]
+    assert answers(reasoner, "reachable(p, d, X)") == [
+        "{'X': 'a'}", "{'X': 'b'}", "{'X': 'c'}", "{'X': 'd'}"]
+
+
+def test_tables_are_reused(knowledge_base):
+    resolver = TabledResolver(knowledge_base)
+    goal = Atom("recommend_treatment", ("john", "T"))
+    first = resolver.solve(goal)
+    assert resolver.solve(goal) is first
+
+
+def test_add_facts_invalidates_tables(knowledge_base, compiled):
+    reasoner = BackwardChainingReasoner(knowledge_base, compiled=compiled)
+    assert reasoner.backward_chain("high_risk(mary, diabetes_complications)") == ["No"]
+    knowledge_base.add_facts(["history(mary, diabetes)"])
+    # Still missing the fatigue symptom
+    assert reasoner.backward_chain("high_risk(mary, diabetes_complications)") == ["No"]
+    knowledge_base.add_facts(["symptom(mary, fatigue)"])
+    assert reasoner.backward_chain("high_risk(mary, diabetes_complications)") == ["Yes"]
+    assert reasoner.backward_chain("recommend_treatment(mary, X)") == [{"X": "medical_consultation"}]
+
+
+def test_add_rules_invalidates_tables(knowledge_base, compiled):
+    reasoner = BackwardChainingReasoner(knowledge_base, compiled=compiled)
+    assert reasoner.backward_chain("recommend_treatment(john, cardiology_referral)") == ["No"]
+    knowledge_base.add_rules(["recommend_treatment(X, cardiology_referral) :- potential_serious_condition(X)"])
+    assert reasoner.backward_chain("recommend_treatment(john, cardiology_referral)") == ["Yes"]
+
+
+def test_drop_patient_invalidates_tables(knowledge_base, compiled):
+    reasoner = BackwardChainingReasoner(knowledge_base, compiled=compiled)
+    assert reasoner.backward_chain("potential_serious_condition(X)") == [{"X": "john"}]
+    knowledge_base.drop_patient("john")
+    assert reasoner.backward_chain("potential_serious_condition(X)") == ["No"]
+    assert reasoner.backward_chain("potential_serious_condition(john)") == ["No"]
+
+
+def test_proofs(knowledge_base):
+    reasoner = BackwardChainingReasoner(knowledge_base, record_proofs=True)
+    (proof,) = reasoner.prove("recommend_treatment(john, rest_and_hydration)")
+    assert proof.fact == ("recommend_treatment", ("john", "rest_and_hydration"))
+    (diagnosis,) = proof.children
+    assert diagnosis.fact == ("diagnose", ("john", "viral_infection"))
+    assert [child.fact for child in diagnosis.children] == [
+        ("symptom", ("john", "fever")), ("symptom", ("john", "fatigue")), ("fever_duration", ("john", 3))]
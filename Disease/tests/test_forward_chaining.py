@@ -0,0 +1,117 @@
+# test_forward_chaining.py
+import pytest
+import pytholog as pl
+
+from facts import generate_patient_facts
+from forward_chaining import ForwardChainingReasoner
+from rule_compiler import cross_check
+
+QUERIES = [
+    "diagnose(john, X)",
+    "high_risk(john, X)",
+    "recommend_treatment(john, X)",
+    "potential_serious_condition(john)",
+    "age(john, A)",
+    "diagnose(X, viral_infection)",
+    "high_risk(john, heart_failure)",
+]
+
+
+def answers(reasoner, query):
+    return sorted(map(str, reasoner.forward_chain(query)))
+
+
+def pytholog_answers(knowledge_base, query):
+    # pytholog repeats an answer once per derivation; the reasoners list it once
+    return sorted(set(map(str, knowledge_base.query(pl.Expr(query)))))
+
+
+@pytest.fixture(params=[False, True], ids=["interpreted", "compiled"])
+def compiled(request):
+    return request.param
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_default_results_match_pytholog(knowledge_base, compiled, query):
+    reasoner = ForwardChainingReasoner(knowledge_base, compiled=compiled)
+    assert answers(reasoner, query) == pytholog_answers(knowledge_base, query)
+
+
+def test_default_results(knowledge_base, compiled):
+    reasoner = ForwardChainingReasoner(knowledge_base, compiled=compiled)
+    assert answers(reasoner, "recommend_treatment(john, X)") == [
+        "{'X': 'medical_consultation'}", "{'X': 'rest_and_hydration'}"]
+    assert reasoner.forward_chain("potential_serious_condition(john)") == ["Yes"]
+    assert reasoner.forward_chain("diagnose(mary, X)") == ["No"]
+
+
+def test_answers_print_as_strings(knowledge_base, compiled):
+    # pytholog returns every value as a string, numbers included
+    reasoner = ForwardChainingReasoner(knowledge_base, compiled=compiled)
+    assert reasoner.forward_chain("age(john, A)") == [{"A": "45"}]
+
+
+def test_recursive_rules(recursive_knowledge_base, compiled):
+    reasoner = ForwardChainingReasoner(recursive_knowledge_base, compiled=compiled)
+    assert answers(reasoner, "reachable(p, a, X)") == [
+        "{'X': 'a'}", "{'X': 'b'}", "{'X': 'c'}", "{'X': 'd'}"]
+    assert answers(reasoner, "reachable(q, X, Y)") == ["{'X': 'x', 'Y': 'y'}"]
+
+
+def test_recursive_rules_see_new_facts(recursive_knowledge_base, compiled):
+    reasoner = ForwardChainingReasoner(recursive_knowledge_base, compiled=compiled)
+    assert reasoner.forward_chain("reachable(q, x, z)") == ["No"]
+    recursive_knowledge_base.add_facts(["link(q, y, z)"])
+    assert reasoner.forward_chain("reachable(q, x, z)") == ["Yes"]
+
+
+def test_add_facts_invalidates_results(knowledge_base, compiled):
+    reasoner = ForwardChainingReasoner(knowledge_base, compiled=compiled)
+    assert reasoner.forward_chain("diagnose(mary, X)") == ["No"]
+    knowledge_base.add_facts(["symptom(mary, fever)", "symptom(mary, fatigue)", "fever_duration(mary, 4)"])
+    assert reasoner.forward_chain("diagnose(mary, X)") == [{"X": "viral_infection"}]
+    assert reasoner.forward_chain("recommend_treatment(mary, X)") == [{"X": "rest_and_hydration"}]
+
+
+def test_stored_facts_of_derived_predicates(knowledge_base, compiled):
+    # questions.json's risk section stores high_risk facts that rules derive as well
+    knowledge_base.add_facts(["diagnose(john, flu)", "high_risk(mary, diabetes_complications)"])
+    reasoner = ForwardChainingReasoner(knowledge_base, compiled=compiled)
+    assert answers(reasoner, "diagnose(john, X)") == ["{'X': 'flu'}", "{'X': 'viral_infection'}"]
+    assert reasoner.forward_chain("recommend_treatment(mary, X)") == [{"X": "medical_consultation"}]
+    for query in ("diagnose(john, X)", "recommend_treatment(mary, X)"):
+        assert answers(reasoner, query) == pytholog_answers(knowledge_base, query)
+
+
+def test_add_rules_invalidates_results(knowledge_base, compiled):
+    reasoner = ForwardChainingReasoner(knowledge_base, compiled=compiled)
+    assert reasoner.forward_chain("recommend_treatment(john, cardiology_referral)") == ["No"]
+    knowledge_base.add_rules(["recommend_treatment(X, cardiology_referral) :- potential_serious_condition(X)"])
+    assert reasoner.forward_chain("recommend_treatment(john, cardiology_referral)") == ["Yes"]
+
+
+def test_drop_patient_invalidates_results(knowledge_base, compiled):
+    reasoner = ForwardChainingReasoner(knowledge_base, compiled=compiled)
+    assert reasoner.forward_chain("diagnose(X, viral_infection)") == [{"X": "john"}]
+    knowledge_base.drop_patient("john")
+    assert reasoner.forward_chain("diagnose(X, viral_infection)") == ["No"]
+    assert reasoner.forward_chain("diagnose(john, X)") == ["No"]
+
+
+def given_facts(proof):
+    if proof.rule is None:
+        return {proof.fact}
+    return set().union(*map(given_facts, proof.children))
+
+
+def test_proofs(knowledge_base):
+    reasoner = ForwardChainingReasoner(knowledge_base, record_proofs=True)
+    (proof,) = reasoner.prove("potential_serious_condition(john)")
+    assert proof.fact == ("potential_serious_condition", ("john",))
+    assert given_facts(proof) == {("history", ("john", "hypertension")), ("age", ("john", 45)),
+                                  ("symptom", ("john", "headache"))}
+
+
+def test_compiled_matches_interpreted(knowledge_base):
+    knowledge_base.add_facts(generate_patient_facts(200))
+    assert cross_check(knowledge_base) == []
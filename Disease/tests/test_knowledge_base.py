@@ -0,0 +1,92 @@
+# test_knowledge_base.py
+import pytest
+
+from facts import MedicalFacts
+from knowledge_base import MedicalKnowledgeBase, format_answers, format_fact, parse_fact, parse_query
+
+
+@pytest.mark.parametrize("fact", MedicalFacts().get_knowledge_base() + [
+    "fever_duration(mary, 2.5)",
+    "temperature(mary, -1)",
+    "gender(patient7, female)",
+])
+def test_parse_fact_format_fact_round_trip(fact):
+    assert format_fact(*parse_fact(fact)) == fact
+
+
+def test_parse_fact_converts_numbers():
+    assert parse_fact("age(john, 45)") == ("age", ("john", 45))
+    assert parse_fact("fever_duration( mary , 2.5 )") == ("fever_duration", ("mary", 2.5))
+
+
+@pytest.mark.parametrize("text", ["age john 45", "diagnose(X, flu) :- symptom(X, fever)", "Age(john, 45)"])
+def test_parse_fact_rejects_non_facts(text):
+    with pytest.raises(ValueError):
+        parse_fact(text)
+
+
+def test_parse_query_accepts_pytholog_expressions():
+    import pytholog as pl
+    assert parse_query(pl.Expr("age(john, 45)")) == parse_query("age(john, 45)")
+
+
+def test_format_answers():
+    query = parse_query("age(X, A)")
+    assert format_answers(query, [{"X": "john", "A": 45}, {"X": "john", "A": 45}]) == [{"X": "john", "A": "45"}]
+    assert format_answers(parse_query("age(john, 45)"), [{}]) == ["Yes"]
+    assert format_answers(query, []) == ["No"]
+
+
+def test_facts_are_sharded_by_patient(knowledge_base):
+    knowledge_base.add_facts(["age(mary, 30)", "symptom(mary, fever)"])
+    assert set(knowledge_base.shards) == {"john", "mary"}
+    assert list(knowledge_base.lookup("age", "mary")) == [("mary", 30)]
+    assert sorted(knowledge_base.lookup("age")) == [("john", 45), ("mary", 30)]
+    assert list(knowledge_base.lookup("age", "nobody")) == []
+
+
+def test_add_facts_ignores_known_facts(knowledge_base):
+    version = knowledge_base.version
+    assert knowledge_base.add_facts(["age(john, 45)", "age(mary, 30)"]) == ["age(mary, 30)"]
+    assert not knowledge_base.add_fact("age(mary, 30)")
+    assert knowledge_base.version == version + 1
+
+
+def test_add_facts_only_touches_its_patient(knowledge_base):
+    knowledge_base.add_facts(["age(mary, 30)"])
+    john = knowledge_base.version_of("symptom", "john")
+    knowledge_base.add_facts(["symptom(mary, fever)"])
+    assert knowledge_base.version_of("symptom", "john") == john
+    assert knowledge_base.version_of("symptom", "mary") == knowledge_base.version
+    assert knowledge_base.version_of("symptom") == knowledge_base.version
+
+
+def test_add_rules_bumps_rule_version(knowledge_base):
+    graph = knowledge_base.rule_graph()
+    knowledge_base.add_rules(["needs_referral(X) :- potential_serious_condition(X)"])
+    assert knowledge_base.rules_version == knowledge_base.version
+    assert knowledge_base.version_of("needs_referral") == knowledge_base.version
+    assert knowledge_base.rule_graph() is not graph
+
+
+def test_add_rules_rejects_rules_across_patients():
+    knowledge_base = MedicalKnowledgeBase()
+    with pytest.raises(ValueError):
+        knowledge_base.add_rules(["contact(X, Y) :- visit(X, clinic), visit(Y, clinic)"])
+    assert knowledge_base.rules == []
+
+
+def test_drop_patient(knowledge_base):
+    symptoms = knowledge_base.version_of("symptom")
+    assert knowledge_base.drop_patient("john")
+    assert "john" not in knowledge_base.shards
+    assert knowledge_base.version_of("symptom", "john") == -1
+    assert knowledge_base.version_of("symptom") > symptoms
+    assert not knowledge_base.drop_patient("john")
+
+
+def test_interpreted_knowledge_base_follows_changes(knowledge_base):
+    import pytholog as pl
+    assert knowledge_base.query(pl.Expr("age(mary, A)")) == ["No"]
+    knowledge_base.add_facts(["age(mary, 30)"])
+    assert knowledge_base.query(pl.Expr("age(mary, A)")) == [{"A": "30"}]
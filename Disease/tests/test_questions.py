@@ -0,0 +1,58 @@
+# test_questions.py
+from itertools import product
+
+import pytest
+
+from backward_chaining import BackwardChainingReasoner
+from questions import MedicalQuestions, load_questions
+
+CATALOG = load_questions()
+ANSWERED = CATALOG["symptoms"] + CATALOG["history"]
+
+
+def answer(questions, answers):
+    patient_info = {}
+    for question in ANSWERED:
+        patient_info[question.id] = questions.record_answer(question, answers.get(question.id, False))
+    return patient_info
+
+
+@pytest.fixture
+def reasoner(knowledge_base):
+    return BackwardChainingReasoner(knowledge_base, record_proofs=True)
+
+
+@pytest.mark.parametrize("values", list(product((False, True), repeat=len(ANSWERED))))
+def test_proven_diagnoses_match_the_table(knowledge_base, reasoner, values):
+    questions = MedicalQuestions(knowledge_base, "mary")
+    patient_info = answer(questions, dict(zip((question.id for question in ANSWERED), values)))
+    diagnoses, proofs = questions.prove_diagnoses(reasoner)
+    assert diagnoses == questions.generate_diagnosis(patient_info)
+    assert len(proofs) == len(diagnoses)
+
+
+def test_proofs_show_the_answers_used(knowledge_base, reasoner):
+    # john's facts would prove high_risk(cardiovascular_risk) only over 40; the table needs a headache
+    questions = MedicalQuestions(knowledge_base, "mary")
+    knowledge_base.add_facts(["age(mary, 30)"])
+    answer(questions, {"hypertension_history": True, "headache_check": True})
+    diagnoses, (proof,) = questions.prove_diagnoses(reasoner)
+    assert diagnoses == ["Cardiovascular Risk"]
+    assert proof.fact == ("suspected", ("mary", "cardiovascular_risk"))
+    assert [child.fact for child in proof.children] == [("history", ("mary", "hypertension")),
+                                                        ("symptom", ("mary", "headache"))]
+
+
+def test_goal_rules_are_added_once(knowledge_base, reasoner):
+    rules = len(knowledge_base.rules)
+    for patient_id in ("mary", "paul"):
+        MedicalQuestions(knowledge_base, patient_id).prove_diagnoses(reasoner)
+    assert len(knowledge_base.rules) == rules + 3
+
+
+def test_seeded_patient_facts_do_not_leak(knowledge_base, reasoner):
+    # john's sample facts satisfy every rule; a new patient answering no must get nothing
+    questions = MedicalQuestions(knowledge_base, "mary")
+    answer(questions, {})
+    assert questions.prove_diagnoses(reasoner) == ([], [])
+    assert "mary" not in knowledge_base.shards
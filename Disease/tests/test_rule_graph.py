@@ -0,0 +1,62 @@
+# test_rule_graph.py
+from knowledge_base import Atom
+from rule_graph import RuleGraph, relevant_facts
+
+
+def test_strata(knowledge_base):
+    graph = knowledge_base.rule_graph()
+    assert {predicate: graph.strata[predicate] for predicate in ("symptom", "age", "diagnose", "high_risk")} == {
+        "symptom": 0, "age": 0, "diagnose": 1, "high_risk": 1}
+    assert graph.strata["recommend_treatment"] == graph.strata["potential_serious_condition"] == 2
+    assert graph.cycles == []
+
+
+def test_evaluation_strata_follow_dependencies(knowledge_base):
+    graph = knowledge_base.rule_graph()
+    groups = graph.evaluation_strata("potential_serious_condition")
+    assert [sorted({rule.head.predicate for rule in group}) for group in groups] == [
+        ["high_risk"], ["potential_serious_condition"]]
+
+
+def test_cycles(recursive_knowledge_base):
+    graph = recursive_knowledge_base.rule_graph()
+    assert graph.cycles == [frozenset({"reachable"})]
+    assert graph.is_recursive("reachable")
+    assert not graph.is_recursive("link")
+    assert graph.strata == {"reachable": 1, "link": 0}
+
+
+def test_mutual_recursion_is_one_component(recursive_knowledge_base):
+    recursive_knowledge_base.add_rules(["odd(P, A, B) :- link(P, A, B)",
+                                        "even(P, A, C) :- odd(P, A, B), link(P, B, C)",
+                                        "odd(P, A, C) :- even(P, A, B), link(P, B, C)"])
+    graph = recursive_knowledge_base.rule_graph()
+    assert frozenset({"odd", "even"}) in graph.cycles
+    assert graph.strata["odd"] == graph.strata["even"] == 1
+
+
+def test_dependencies(knowledge_base):
+    graph = knowledge_base.rule_graph()
+    rules, base = graph.dependencies("recommend_treatment")
+    assert base == {"symptom", "fever_duration", "history", "age"}
+    assert [rule.head.predicate for rule in rules] == ["diagnose", "high_risk", "high_risk", "recommend_treatment",
+                                                       "recommend_treatment"]
+    assert graph.closure("recommend_treatment") == base | {"diagnose", "high_risk", "recommend_treatment"}
+    assert graph.dependencies("age") == ((), {"age"})
+    assert graph.dependencies("age") is graph.dependencies("age")
+
+
+def test_empty_graph():
+    graph = RuleGraph([])
+    assert graph.cycles == [] and graph.strata == {}
+    assert graph.dependencies("age") == ((), {"age"})
+
+
+def test_relevant_facts(knowledge_base):
+    knowledge_base.add_facts(["high_risk(mary, diabetes_complications)", "symptom(mary, fatigue)"])
+    assert relevant_facts(knowledge_base, Atom("recommend_treatment", ("mary", "X"))) == {
+        "age": [], "diagnose": [], "fever_duration": [], "high_risk": [("mary", "diabetes_complications")],
+        "history": [], "recommend_treatment": [], "symptom": [("mary", "fatigue")]}
+    everyone = relevant_facts(knowledge_base, Atom("high_risk", ("P", "X")))
+    assert sorted(everyone["symptom"]) == [("john", "fatigue"), ("john", "fever"), ("john", "headache"),
+                                           ("mary", "fatigue")]
@@ -1,246 +1,412 @@
+import argparse
+import time
+from itertools import islice
+
+from confirmation import Ask, Say, confirm_symptoms, run_dialogue
+from diagnosis_cache import DiagnosisCache, MatchTable, symptom_mask
+from differential import differential_pages
+from knowledge_file import DEFAULT_SOURCE, load_catalog, source_digest
+
+# Largest symptom vocabulary whose full answer table is precomputed (2 ** 16 answer sets)
+PRECOMPUTE_MAX_SYMPTOMS = 16
+
+# Memory budget of a precomputed answer table; larger catalogs are cached per answer set instead
+PRECOMPUTE_MAX_BYTES = 64 << 20
+
+# Answer sets scored together while precomputing
+PRECOMPUTE_BLOCK = 1024
+
+# Seconds between checks whether the catalog source changed
+CATALOG_CHECK_INTERVAL = 5.0
+
+# Diseases listed by a probabilistic diagnosis
+PROBABLE_DISEASES = 5
+
+# Diseases shown per page of a differential diagnosis
+DIFFERENTIAL_PAGE_SIZE = 5
+
+
 class DentalExpertSystem:
-    def __init__(self):
-        self.diseases = {
-            "Cavities": {
-                "symptoms": ["tooth pain", "sensitivity to sweets", "visible holes"],
-                "detailed_questions": {
-                    "tooth pain": [
-                        "Do you experience sharp, sudden pain when biting down?",
-                        "Does the pain worsen when eating hot or cold foods?",
-                        "Do you feel persistent aching in a specific tooth?",
-                        "Does the pain keep you awake at night?"
-                    ],
-                    "sensitivity to sweets": [
-                        "Do you experience pain when eating sugary foods?",
-                        "Do your teeth hurt when consuming cold or sweet drinks?",
-                        "Do you feel a sharp sensation when something sweet touches your teeth?"
-                    ],
-                    "visible holes": [
-                        "Have you noticed any dark spots or holes in your teeth?",
-                        "Can you see any discoloration or chipped areas in your teeth?",
-                        "When you run your tongue over your teeth, do you feel any rough or uneven surfaces?"
-                    ]
-                },
-                "treatment": (
-                    "\n* Dental fillings: Removing the decayed part and filling it with composite resin, amalgam, or other materials.\n"
-                    "* Crowns: If the cavity is extensive, a crown may be used to protect the remaining tooth.\n"
-                    "* Fluoride treatments: Strengthen enamel and reverse early stages of decay.\n"
-                    "* Preventive care: Brushing twice daily with fluoride toothpaste, reducing sugary foods and drinks."
-                )
-            },
-            "Tooth Sensitivity": {
-                "symptoms": ["tooth pain", "sensitivity to sweets"],
-                "detailed_questions": {
-                    "tooth pain": [
-                        "Do you experience sharp, quick pain when exposed to cold or hot temperatures?",
-                        "Does brushing or flossing cause discomfort?",
-                        "Do you experience pain when breathing in cold air?",
-                        "Is the pain localized to a specific tooth or area?"
-                    ],
-                    "sensitivity to sweets": [
-                        "Do sweet foods cause a sudden, sharp pain?",
-                        "Do you avoid certain foods due to sensitivity?",
-                        "Does the pain subside quickly after the stimulus is removed?"
-                    ]
-                },
-                "treatment": (
-                    "\n* Desensitizing toothpaste: Reduces nerve sensitivity over time.\n"
-                    "* Fluoride treatments: Applied by a dentist to strengthen enamel and reduce pain.\n"
-                    "* Dental bonding: Covers exposed roots or damaged areas with a protective resin.\n"
-                    "* Nightguards: For teeth grinding (bruxism) which can exacerbate sensitivity."
-                )
-            },
-            "Tooth Abscess": {
-                "symptoms": ["tooth pain", "swollen gums", "bad breath"],
-                "detailed_questions": {
-                    "tooth pain": [
-                        "Do you experience severe, throbbing pain?",
-                        "Does the pain worsen when you lie down?",
-                        "Do you feel pain when touching the affected area?",
-                        "Is the pain constant or intermittent?"
-                    ],
-                    "swollen gums": [
-                        "Are your gums red and swollen?",
-                        "Do you notice any pus around the affected tooth?",
-                        "Is there a painful bump or abscess on your gums?",
-                        "Do your gums feel tender to touch?"
-                    ],
-                    "bad breath": [
-                        "Do people comment on your bad breath?",
-                        "Do you have a persistent bad taste in your mouth?",
-                        "Does the bad breath persist even after brushing?",
-                        "Do you notice an unpleasant odor when you exhale?"
-                    ]
-                },
-                "treatment": (
-                    "\n* Root canal therapy: Removes the infection and seals the tooth to prevent reinfection.\n"
-                    "* Incision and drainage: Draining the abscess if necessary.\n"
-                    "* Antibiotics: To control the infection if it has spread.\n"
-                    "* Tooth extraction: In severe cases where the tooth cannot be saved."
-                )
-            },
-            "Gingivitis": {
-                "symptoms": ["bleeding gums", "swollen gums", "bad breath"],
-                "detailed_questions": {
-                    "bleeding gums": [
-                        "Do your gums bleed when brushing or flossing?",
-                        "Do you see blood on your toothbrush or dental floss?",
-                        "Do your gums bleed easily when touched?",
-                        "Do you notice bleeding when eating hard foods?"
-                    ],
-                    "swollen gums": [
-                        "Are your gums puffy or enlarged?",
-                        "Do your gums appear red instead of pink?",
-                        "Do your gums feel tender or painful?",
-                        "Do you notice any changes in gum texture?"
-                    ],
-                    "bad breath": [
-                        "Do you have persistent bad breath?",
-                        "Do people comment on an unpleasant odor from your mouth?",
-                        "Does the bad breath continue even after brushing?",
-                        "Do you have a constant bad taste in your mouth?"
-                    ]
-                },
-                "treatment": (
-                    "\n* Improved oral hygiene: Regular brushing and flossing.\n"
-                    "* Professional dental cleaning: Remove plaque and tartar buildup.\n"
-                    "* Antiseptic mouthwash: Reduces bacteria and inflammation.\n"
-                    "* Antibiotics: In severe cases to control bacterial infection."
-                )
-            },
-        }
+    def __init__(self, cache_size=4096, precompute=False, probabilistic=False, source_path=DEFAULT_SOURCE,
+                 check_interval=CATALOG_CHECK_INTERVAL):
+        """
+        Args:
+            cache_size (int): Diagnosis results kept per catalog version
+            precompute (bool): Score every possible answer set at load time
+                when the vocabulary has at most PRECOMPUTE_MAX_SYMPTOMS symptoms
+                and the table fits in PRECOMPUTE_MAX_BYTES
+            probabilistic (bool): Rank diagnoses by naive Bayes posterior
+                (see bayes_scorer) instead of reporting perfect and partial matches
+            source_path (str): Catalog source (see knowledge_file.load_catalog)
+            check_interval (float): Seconds between checks whether the source
+                changed (see check_catalog); None never checks
+        """
+        self.source_path = source_path
+        self.diseases = load_catalog(source_path)
+        self.disease_names = list(self.diseases)
+        self._symptom_matrix = None
+        self._bayes_scorer = None
+        self.probabilistic = probabilistic
+        self.precompute = precompute
+        self.check_interval = check_interval
+        self._next_check = time.monotonic() + (check_interval or 0)
+        # Sessions mostly give the same few answer sets, so matches are cached by symptom set;
+        # dialogues and batches share the cache
+        self.diagnosis_cache = DiagnosisCache(cache_size)
+        if precompute:
+            self.precompute_diagnoses()
+
+    @property
+    def symptom_matrix(self):
+        """
+        Bit-packed catalog used to score diagnoses, built on first use
+
+        Returns:
+            SymptomMatrix: Compiled catalog
+        """
+        if self._symptom_matrix is None:
+            # Deferred: numpy dominates startup and only the diagnosis flows need it
+            from symptom_matrix import SymptomMatrix
+            self._symptom_matrix = SymptomMatrix(self.diseases)
+        return self._symptom_matrix
+
+    @property
+    def bayes_scorer(self):
+        """
+        Naive Bayes posteriors over the catalog, built on first use
+
+        Returns:
+            NaiveBayesScorer: Scorer with uniform priors
+        """
+        if self._bayes_scorer is None:
+            from bayes_scorer import NaiveBayesScorer
+            self._bayes_scorer = NaiveBayesScorer(self.symptom_matrix)
+        return self._bayes_scorer
+
+    def reload_catalog(self):
+        """
+        Switch to the current catalog if its source changed since it was loaded
+
+        Diagnoses cached for the previous catalog version are dropped on the
+        next lookup.
+
+        Returns:
+            bool: True if a new catalog version was loaded
+        """
+        catalog = load_catalog(self.source_path)
+        if catalog.version == self.diseases.version:
+            return False
+        self.diseases = catalog
+        self.disease_names = list(catalog)
+        self._symptom_matrix = None
+        self._bayes_scorer = None
+        if self.precompute:
+            self.precompute_diagnoses()
+        return True
+
+    def check_catalog(self):
+        """
+        Reload the catalog if its source changed, at most once per check_interval
+
+        Diagnoses and batches call this as they start, so long-running
+        processes (the session server, Streamlit, batch workers) pick up an
+        edited catalog without a restart. A source that is missing or
+        half-written keeps the loaded catalog until the next check.
+
+        Returns:
+            bool: True if a new catalog version was loaded
+        """
+        if self.check_interval is None or time.monotonic() < self._next_check:
+            return False
+        self._next_check = time.monotonic() + self.check_interval
+        try:
+            if source_digest(self.source_path).hex() == self.diseases.version:
+                return False
+            return self.reload_catalog()
+        except (OSError, ValueError):
+            return False
+
+    def precompute_diagnoses(self):
+        """
+        Score every possible answer set and install them as the cache's answer table
+
+        Only the matches are stored, as disease ids and counts (see
+        MatchTable), and the answer sets are scored a block at a time.
+
+        Returns:
+            bool: False if the vocabulary is too large to enumerate or the
+            table would exceed PRECOMPUTE_MAX_BYTES
+        """
+        matrix = self.symptom_matrix
+        vocabulary_size = len(matrix.vocabulary)
+        if vocabulary_size > PRECOMPUTE_MAX_SYMPTOMS:
+            return False
+        masks = 1 << vocabulary_size
+        # A disease listing n symptoms matches every mask but the 2 ** (size - n) sharing none of them
+        entries = sum(masks - (masks >> listed) for listed in matrix.symptom_counts.tolist())
+        if MatchTable.size(entries, masks) > PRECOMPUTE_MAX_BYTES:
+            return False
+
+        def scored_blocks():
+            for first in range(0, masks, PRECOMPUTE_BLOCK):
+                answers = [[symptom for column, symptom in enumerate(matrix.symptoms) if mask >> column & 1]
+                           for mask in range(first, min(first + PRECOMPUTE_BLOCK, masks))]
+                yield first, matrix.match_counts_batch(matrix.encode_batch(answers))
+
+        self.diagnosis_cache.precompute(MatchTable.build(scored_blocks(), masks, entries), self.diseases.version)
+        return True
+
+    # Drives a dialogue generator on the terminal with input() and print()
+    run_dialogue = staticmethod(run_dialogue)
 
     def confirm_disease(self):
-        print("\nAvailable Diseases:")
+        self.run_dialogue(self.confirm_dialogue())
+
+    def confirm_dialogue(self):
+        """
+        Confirm flow as a generator: yields Ask/Say steps and receives the replies to Ask steps
+        """
+        self.check_catalog()
+        yield Say("\nAvailable Diseases:")
         for disease in self.diseases.keys():
-            print(f"- {disease}")
+            yield Say(f"- {disease}")
 
-        suspected_disease = input("\nEnter the name of the disease you want to confirm: ").strip()
+        suspected_disease = (yield Ask("\nEnter the name of the disease you want to confirm: ")).strip()
 
         if suspected_disease not in self.diseases:
-            print("Disease not found in our database.")
+            yield Say("Disease not found in our database.")
             return
 
         disease_details = self.diseases[suspected_disease]
         symptoms = disease_details["symptoms"]
 
-        # Track confirmed and unconfirmed symptoms
-        confirmed_symptoms = []
-        unconfirmed_symptoms = []
-
-        # Initial symptom check
-        for symptom in symptoms:
-            response = input(f"Do you have the symptom: {symptom}? (y/n): ").strip().lower()
-            if response == 'y':
-                confirmed_symptoms.append(symptom)
-            else:
-                unconfirmed_symptoms.append(symptom)
-
-        # If not all symptoms are confirmed, do deeper investigation
-        if unconfirmed_symptoms:
-            print("\nLet's do a more detailed investigation of your symptoms.")
-            for symptom in unconfirmed_symptoms:
-                # Check if detailed questions exist for this symptom
-                if "detailed_questions" in disease_details and symptom in disease_details["detailed_questions"]:
-                    detailed_questions = disease_details["detailed_questions"][symptom]
-
-                    # Ask additional detailed questions
-                    detailed_confirmations = 0
-                    total_questions = len(detailed_questions)
-
-                    print(f"\nAdditional questions about {symptom}:")
-                    for question in detailed_questions:
-                        detailed_response = input(f"{question} (y/n): ").strip().lower()
-                        if detailed_response == 'y':
-                            detailed_confirmations += 1
-
-                    # If more than half of detailed questions are confirmed, consider the symptom confirmed
-                    if detailed_confirmations > total_questions // 2:
-                        confirmed_symptoms.append(symptom)
+        # Asking stops as soon as the verdict is settled
+        confirmed_symptoms, unconfirmed_symptoms = yield from confirm_symptoms(
+            symptoms, disease_details.get("detailed_questions", {}))
 
         # Final diagnosis
         if len(confirmed_symptoms) == len(symptoms):
-            print(f"\nConfirmed: You have {suspected_disease}")
-            print(f"Matching Symptoms: {', '.join(confirmed_symptoms)}")
-            print("\nTreatment Options:")
-            print(disease_details["treatment"])
+            yield Say(f"\nConfirmed: You have {suspected_disease}")
+            yield Say(f"Matching Symptoms: {', '.join(confirmed_symptoms)}")
+            yield Say("\nTreatment Options:")
+            yield Say(disease_details["treatment"])
         elif confirmed_symptoms:
             confidence = len(confirmed_symptoms) / len(symptoms)
             if confidence >= 0.5:
-                print(f"\nMay Have: High probability of {suspected_disease}")
-                print(f"Confirmed Symptoms: {', '.join(confirmed_symptoms)}")
-                print("Recommendation: Consult a dental professional for a definitive diagnosis.")
+                yield Say(f"\nMay Have: High probability of {suspected_disease}")
+                yield Say(f"Confirmed Symptoms: {', '.join(confirmed_symptoms)}")
+                yield Say("Recommendation: Consult a dental professional for a definitive diagnosis.")
             else:
-                print(f"\nMay Have: Low probability of {suspected_disease}")
-                print(f"Partially Confirmed Symptoms: {', '.join(confirmed_symptoms)}")
-                print("Recommendation: Seek professional medical advice for accurate diagnosis.")
+                yield Say(f"\nMay Have: Low probability of {suspected_disease}")
+                yield Say(f"Partially Confirmed Symptoms: {', '.join(confirmed_symptoms)}")
+                yield Say("Recommendation: Seek professional medical advice for accurate diagnosis.")
         else:
-            print(f"\nVery low probability of {suspected_disease}")
-            print("Recommendation: Consult a dental professional for a comprehensive examination.")
+            yield Say(f"\nVery low probability of {suspected_disease}")
+            yield Say("Recommendation: Consult a dental professional for a comprehensive examination.")
+
+        if self.probabilistic:
+            # Symptoms left unconfirmed after the detailed questions count as answered with no
+            denied_symptoms = [symptom for symptom in unconfirmed_symptoms if symptom not in confirmed_symptoms]
+            probability = self.bayes_scorer.probability(self.disease_names.index(suspected_disease),
+                                                        confirmed_symptoms, denied_symptoms)
+            yield Say(f"Posterior probability of {suspected_disease}: {probability:.0%}")
 
-    def diagnose(self):
+    def diagnose(self, adaptive=False):
+        self.run_dialogue(self.diagnosis_dialogue(adaptive))
+
+    def diagnosis_dialogue(self, adaptive=False):
+        """
+        Diagnosis flow as a generator: yields Ask/Say steps and receives the replies to Ask steps
+        """
+        self.check_catalog()
         user_symptoms = []
-        print("\nPlease answer the following questions about your symptoms (yes/no).")
-        for symptom in {"tooth pain", "sensitivity to sweets", "visible holes", "swollen gums", "bleeding gums",
-                        "bad breath"}:
-            response = input(f"Do you have {symptom}? (y/n): ").strip().lower()
-            if response == 'y':
-                user_symptoms.append(symptom)
-
-        perfectly_matching = []
-        partially_matching = []
-
-        for disease, details in self.diseases.items():
-            disease_symptoms = details["symptoms"]
-            matched_symptoms = set(user_symptoms).intersection(disease_symptoms)
-            if len(matched_symptoms) == len(disease_symptoms):
-                perfectly_matching.append({
-                    "name": disease,
-                    "matched_count": len(matched_symptoms),
-                    "symptoms": disease_symptoms,
-                    "treatment": details["treatment"]
-                })
-            elif matched_symptoms:
-                partially_matching.append({
-                    "name": disease,
-                    "matched_count": len(matched_symptoms),
-                    "symptoms": disease_symptoms,
-                    "treatment": details["treatment"]
-                })
-
-        if perfectly_matching:
-            print("\nYou have these diseases:")
-            for disease in perfectly_matching:
-                print(f"- {disease['name']} (Symptoms Matched: {disease['matched_count']})")
-                print(f"  Symptoms: {', '.join(disease['symptoms'])}")
-                print(f"  Treatment: {disease['treatment']}\n")
+        denied_symptoms = []
+        yield Say("\nPlease answer the following questions about your symptoms (yes/no).")
+        if adaptive:
+            # Ask the most informative symptom next and stop once the diagnosis is settled
+            from question_planner import next_symptom
+            while symptom := next_symptom(self.symptom_matrix, user_symptoms, denied_symptoms):
+                response = (yield Ask(f"Do you have {symptom}? (y/n): ")).strip().lower()
+                if response == 'y':
+                    user_symptoms.append(symptom)
+                else:
+                    denied_symptoms.append(symptom)
         else:
-            print("\nYou may have these diseases:")
-            for disease in partially_matching:
-                print(f"- {disease['name']} (Symptoms Matched: {disease['matched_count']})")
-                print(f"  Symptoms: {', '.join(disease['symptoms'])}")
-                print(f"  Treatment: {disease['treatment']}\n")
+            for symptom in {"tooth pain", "sensitivity to sweets", "visible holes", "swollen gums", "bleeding gums",
+                            "bad breath"}:
+                response = (yield Ask(f"Do you have {symptom}? (y/n): ")).strip().lower()
+                if response == 'y':
+                    user_symptoms.append(symptom)
+                else:
+                    denied_symptoms.append(symptom)
+
+        if self.probabilistic:
+            yield from self._probable_diseases(user_symptoms, denied_symptoms)
+            return
+
+        # Pages hold disease ids of this catalog, even if another session reloads it meanwhile
+        diseases = self.diseases
+        perfect, total, pages = self.differential(user_symptoms)
+        yield Say("\nYou have these diseases:" if perfect else "\nYou may have these diseases:")
+        shown = 0
+        for page in pages:
+            if shown:
+                more = (yield Ask(f"Show more diseases ({total - shown} left)? (y/n): ")).strip().lower()
+                if more != 'y':
+                    break
+            for entry in page:
+                # Details are only decoded for the diseases shown
+                details = diseases.summary(entry.disease_id)
+                yield Say(f"- {entry.name} (Symptoms Matched: {entry.matched_count})")
+                yield Say(f"  Symptoms: {', '.join(details['symptoms'])}")
+                yield Say(f"  Treatment: {details['treatment']}\n")
+            shown += len(page)
+
+    def differential(self, symptoms):
+        """
+        Ranked differential diagnosis, paginated lazily
+
+        Perfect matches are ranked if there are any, partial matches
+        otherwise, by match ratio and then specificity (see differential).
+        The matches come from the diagnosis cache (or its precomputed
+        table) by symptom set; pages are only ranked when requested.
+
+        Args:
+            symptoms (iterable): Confirmed symptom names
+
+        Returns:
+            tuple: (perfect, total, pages): whether the candidates are
+            perfect matches, their number, and an iterator over pages of
+            DIFFERENTIAL_PAGE_SIZE Differential entries
+        """
+        matrix = self.symptom_matrix
+        symptoms = list(symptoms)
+        mask = symptom_mask(matrix.vocabulary, symptoms)
+        version = self.diseases.version
+        matches = self.diagnosis_cache.get(mask, version)
+        if matches is None:
+            # Only diseases on the posting lists of the confirmed symptoms are scored
+            matches = matrix.match(symptoms)
+            self.diagnosis_cache.put(mask, matches, version)
+
+        disease_ids, matched_counts = matches
+        perfect = matrix.is_perfect(disease_ids, matched_counts)
+        if perfect.any():
+            disease_ids, matched_counts = disease_ids[perfect], matched_counts[perfect]
+        return bool(perfect.any()), len(disease_ids), differential_pages(matrix, disease_ids, matched_counts,
+                                                                         DIFFERENTIAL_PAGE_SIZE)
 
+    def _probable_diseases(self, confirmed_symptoms, denied_symptoms):
+        # The PROBABLE_DISEASES highest posteriors, most probable first
+        yield Say("\nMost probable diseases:")
+        diseases, disease_names = self.diseases, self.disease_names
+        for disease_id, probability in self.bayes_scorer.top_k(confirmed_symptoms, denied_symptoms,
+                                                               PROBABLE_DISEASES):
+            details = diseases.summary(disease_id)
+            yield Say(f"- {disease_names[disease_id]} (Probability: {probability:.0%})")
+            yield Say(f"  Symptoms: {', '.join(details['symptoms'])}")
+            yield Say(f"  Treatment: {details['treatment']}\n")
+
+    def _build_result(self, disease_ids, matched_counts, summaries):
+        # Matches (diseases with a matched symptom, in catalog order) as the result dict;
+        # summaries memoizes decoded catalog records by disease id across the results of a batch
+        perfect = self.symptom_matrix.is_perfect(disease_ids, matched_counts)
+        result = {"perfect": [], "partial": []}
+
+        for disease_id, matched_count, is_perfect in zip(disease_ids.tolist(), matched_counts.tolist(),
+                                                         perfect.tolist()):
+            # Decoded by catalog position; the detailed questions are never shown here
+            details = summaries.get(disease_id)
+            if details is None:
+                details = summaries[disease_id] = self.diseases.summary(disease_id)
+            result["perfect" if is_perfect else "partial"].append({
+                "name": self.disease_names[disease_id],
+                "matched_count": matched_count,
+                "symptoms": details["symptoms"],
+                "treatment": details["treatment"]
+            })
+        return result
+
+    def diagnose_batch(self, answers, batch_size=1024):
+        """
+        Diagnose many pre-filled questionnaires without prompting
+
+        Args:
+            answers (Iterable[set[str]]): Confirmed symptoms of each patient
+            batch_size (int): Patients scored together against the catalog
+
+        Yields:
+            dict: Per patient, in input order, "perfect" and "partial" lists of
+            matches with name, matched_count, symptoms and treatment; shared, do not modify
+        """
+        answers = iter(answers)
+        while True:
+            batch = list(islice(answers, batch_size))
+            if not batch:
+                return
+            self.check_catalog()
+            matrix = self.symptom_matrix
+            version = self.diseases.version
+            masks = [symptom_mask(matrix.vocabulary, symptoms) for symptoms in batch]
+            matches = {}
+            for mask in masks:
+                if mask not in matches:
+                    matches[mask] = self.diagnosis_cache.get(mask, version)
+
+            # Only answer sets missing from the cache are scored, each once per batch
+            missing = {mask: symptoms for mask, symptoms in zip(masks, batch) if matches[mask] is None}
+            if missing:
+                matched_counts = matrix.match_counts_batch(matrix.encode_batch(missing.values()))
+                for mask, patient_counts in zip(missing, matched_counts):
+                    disease_ids = patient_counts.nonzero()[0]
+                    matches[mask] = (disease_ids, patient_counts[disease_ids])
+                    self.diagnosis_cache.put(mask, matches[mask], version)
+
+            # One result per answer set, shared by the patients of the batch who gave it
+            results = {}
+            summaries = {}
+            for mask in masks:
+                if mask not in results:
+                    results[mask] = self._build_result(*matches[mask], summaries)
+                yield results[mask]
 
     def run(self):
+        self.run_dialogue(self.menu_dialogue())
+
+    def menu_dialogue(self):
+        """
+        Main menu as a generator, delegating to the diagnosis and confirm dialogues
+        """
         while True:
-            print("Select an option:")
-            print("1. Disease Diagnosis")
-            print("2. Confirm Specific Disease")
-            print("3. Exit")
-            choice = input("Enter your choice (1, 2, 3): ").strip()
+            yield Say("Select an option:")
+            yield Say("1. Disease Diagnosis")
+            yield Say("2. Confirm Specific Disease")
+            yield Say("3. Quick Disease Diagnosis (adaptive questions)")
+            yield Say("4. Exit")
+            choice = (yield Ask("Enter your choice (1, 2, 3, 4): ")).strip()
 
             if choice == '1':
-                self.diagnose()
+                yield from self.diagnosis_dialogue()
             elif choice == '2':
-                self.confirm_disease()
+                yield from self.confirm_dialogue()
             elif choice == '3':
-                print("Thank you for using the Dental Expert System. Goodbye!")
+                yield from self.diagnosis_dialogue(adaptive=True)
+            elif choice == '4':
+                yield Say("Thank you for using the Dental Expert System. Goodbye!")
                 break
             else:
-                print("Invalid choice. Please try again.\n")
+                yield Say("Invalid choice. Please try again.\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dental expert system")
+    parser.add_argument("--bayes", action="store_true",
+                        help="Rank diagnoses by naive Bayes posterior instead of symptom matches")
+    args = parser.parse_args()
+
+    expert_system = DentalExpertSystem(probabilistic=args.bayes)
+    expert_system.run()
 
 
 if __name__ == "__main__":
-    expert_system = DentalExpertSystem()
-    expert_system.run()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,131 @@
+# batch_diagnose.py
+import argparse
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from app import DentalExpertSystem
+
+# Engine preloaded in each worker process by _init_worker
+_engine = None
+
+
+def _init_worker(engine):
+    global _engine
+    _engine = engine
+
+
+def _diagnose_chunk(records):
+    """
+    Diagnose one chunk of intake records inside a worker
+
+    Returns:
+        list: One serialized JSON line per record, in chunk order
+    """
+    results = _engine.diagnose_batch([set(record["symptoms"]) for record in records], batch_size=len(records))
+    lines = []
+    for record, result in zip(records, results):
+        output = {key: value for key, value in record.items() if key != "symptoms"}
+        output.update(result)
+        lines.append(json.dumps(output))
+    return lines
+
+
+def read_records(path, file_format=None):
+    """
+    Stream patient answer records from a JSONL or CSV intake file
+
+    JSONL lines are objects with a "symptoms" list. CSV files need a
+    "symptoms" column holding ";"-separated symptom names. Any other field
+    (e.g. a patient id) is copied to the output untouched.
+
+    Args:
+        path (str): Intake file
+        file_format (str): "jsonl" or "csv"; guessed from the extension if omitted
+
+    Yields:
+        dict: One record per patient
+    """
+    if file_format is None:
+        file_format = "csv" if path.lower().endswith(".csv") else "jsonl"
+
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            for row in csv.DictReader(f):
+                row["symptoms"] = [s.strip() for s in (row.get("symptoms") or "").split(";") if s.strip()]
+                yield row
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def run_batch(records, output, workers=None, chunk_size=1000, max_in_flight=None, precompute=False):
+    """
+    Fan intake records out over a process pool and write results in input order
+
+    Args:
+        records (iterable): Records as produced by read_records()
+        output (file): Text file receiving one JSON line per record
+        workers (int): Worker processes; defaults to the CPU count
+        chunk_size (int): Records sent to a worker per task
+        max_in_flight (int): Chunks submitted but not yet written; defaults to 2 per worker
+        precompute (bool): Score every answer set up front when the table is
+            small enough (see DentalExpertSystem.precompute_diagnoses); each
+            worker otherwise caches the answer sets it sees
+
+    Returns:
+        int: Number of records written
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    records = iter(records)
+    written = 0
+
+    # The engine (catalog, compiled symptom matrix and, if precomputed, the
+    # answer table) is pickled once per worker
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(DentalExpertSystem(precompute=precompute),)) as executor:
+        pending = deque()
+        while True:
+            while len(pending) < max_in_flight:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                pending.append(executor.submit(_diagnose_chunk, chunk))
+            if not pending:
+                break
+
+            # Oldest chunk first keeps the output in input order
+            lines = pending.popleft().result()
+            output.write("\n".join(lines) + "\n")
+            written += len(lines)
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diagnose a file of pre-filled dental questionnaires")
+    parser.add_argument("input", help="JSONL or CSV file of patient symptom answers")
+    parser.add_argument("output", help="JSONL file receiving one diagnosis per input record")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format (default: from extension)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Records per worker task")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="Chunks queued ahead of the writer (default: 2 per worker)")
+    parser.add_argument("--precompute", action="store_true",
+                        help="Score every possible answer set before starting, if the table fits its memory budget")
+    args = parser.parse_args()
+
+    with open(args.output, "w", encoding="utf-8") as output:
+        written = run_batch(read_records(args.input, args.format), output, workers=args.workers,
+                            chunk_size=args.chunk_size, max_in_flight=args.max_in_flight,
+                            precompute=args.precompute)
+    print(f"Diagnosed {written} patients -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
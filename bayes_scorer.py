@@ -0,0 +1,98 @@
+# bayes_scorer.py
+import numpy as np
+
+
+class NaiveBayesScorer:
+    def __init__(self, symptom_matrix, priors=None, likelihoods=None, sensitivity=0.9, false_positive=0.05):
+        """
+        Naive Bayes posteriors over the catalog from yes/no symptom answers
+
+        Every disease has a prior and, per vocabulary symptom, the
+        probability that a patient with the disease reports it. Both are
+        stored as log-probabilities, symptom-major (symptoms x diseases), so
+        scoring a patient sums the rows of the answered symptoms: one
+        vectorized pass over the catalog per answer. Unasked symptoms are
+        left out, i.e. marginalized.
+
+        Args:
+            symptom_matrix (SymptomMatrix): Compiled catalog
+            priors (dict): Disease -> prior probability (relative weights are
+                fine); unlisted diseases get the mean of the listed ones.
+                Uniform if omitted
+            likelihoods (dict): Disease -> {symptom: P(symptom | disease)},
+                overriding the defaults below for single entries
+            sensitivity (float): P(symptom | disease) for symptoms the disease lists
+            false_positive (float): P(symptom | disease) for symptoms it does not list
+        """
+        self.symptom_matrix = symptom_matrix
+        disease_ids = {disease: row for row, disease in enumerate(symptom_matrix.disease_names)}
+        vocabulary = symptom_matrix.vocabulary
+
+        listed = np.unpackbits(symptom_matrix.profiles, axis=1, count=len(vocabulary)).T.astype(bool)
+        probabilities = np.where(listed, sensitivity, false_positive)
+        for disease, symptom_probabilities in (likelihoods or {}).items():
+            for symptom, probability in symptom_probabilities.items():
+                probabilities[vocabulary[symptom], disease_ids[disease]] = probability
+        # Keep both answers possible for every disease, so no posterior collapses to log(0)
+        probabilities = np.clip(probabilities, 1e-6, 1 - 1e-6)
+        # C order, so the row of one symptom is contiguous
+        self.log_present = np.ascontiguousarray(np.log(probabilities), dtype=np.float32)  # answered yes
+        self.log_absent = np.ascontiguousarray(np.log1p(-probabilities), dtype=np.float32)  # answered no
+
+        weights = np.ones(len(disease_ids))
+        if priors:
+            weights[:] = np.mean(list(priors.values()))
+            for disease, prior in priors.items():
+                weights[disease_ids[disease]] = prior
+        self.log_prior = np.log(weights / weights.sum()).astype(np.float32)
+
+    def _columns(self, symptoms):
+        vocabulary = self.symptom_matrix.vocabulary
+        return [vocabulary[symptom] for symptom in set(symptoms) if symptom in vocabulary]
+
+    def log_posteriors(self, confirmed, denied=()):
+        """
+        Normalized log-posterior of every disease
+
+        Args:
+            confirmed (iterable): Symptoms answered with yes
+            denied (iterable): Symptoms answered with no
+
+        Returns:
+            np.ndarray: log P(disease | answers), one entry per disease
+        """
+        scores = self.log_prior.copy()
+        for column in self._columns(confirmed):
+            scores += self.log_present[column]
+        for column in self._columns(denied):
+            scores += self.log_absent[column]
+        # log-sum-exp normalization, shifted by the maximum for stability
+        top = scores.max()
+        return scores - (top + np.log(np.exp(scores - top).sum()))
+
+    def top_k(self, confirmed, denied=(), k=5):
+        """
+        The k most probable diseases, most probable first
+
+        Only the k best are sorted: the rest of the catalog is split off
+        with a linear-time partition. Ties keep catalog order.
+
+        Returns:
+            list: (disease id, posterior probability) pairs
+        """
+        log_posteriors = self.log_posteriors(confirmed, denied)
+        k = min(k, len(log_posteriors))
+        if k <= 0:
+            return []
+        if k < len(log_posteriors):
+            best = np.argpartition(-log_posteriors, k - 1)[:k]
+        else:
+            best = np.arange(len(log_posteriors))
+        best = best[np.lexsort((best, -log_posteriors[best]))]
+        return [(int(disease_id), float(np.exp(log_posteriors[disease_id]))) for disease_id in best]
+
+    def probability(self, disease_id, confirmed, denied=()):
+        """
+        Posterior probability of one disease
+        """
+        return float(np.exp(self.log_posteriors(confirmed, denied)[disease_id]))
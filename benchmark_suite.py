@@ -0,0 +1,359 @@
+# benchmark_suite.py
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# The Disease modules import each other by bare module name
+DISEASE_DIR = os.path.join(ROOT, "Disease")
+
+# Symptoms asked by the fixed-order diagnosis; every synthetic catalog contains them
+ASKED_SYMPTOMS = ("tooth pain", "sensitivity to sweets", "visible holes", "swollen gums", "bleeding gums",
+                  "bad breath")
+
+# Benchmark cases and the sizes they are run at: diseases for the dental
+# cases, patients in the knowledge base for the reasoners
+CASES = {
+    "dental_diagnose": (100, 1000, 10000),
+    "dental_quick": (100, 1000, 10000),
+    "dental_confirm": (100, 1000, 10000),
+    "streamlit_flow": (100, 1000, 10000),
+    "forward_chain": (100, 1000, 10000),
+    "backward_chain": (100, 1000, 10000),
+}
+
+# Metrics compared against a baseline, and whether larger is better; p99_ms is
+# reported but swings too much between runs on a shared machine to gate on
+METRICS = {"throughput": True, "p50_ms": False, "peak_rss_mb": False}
+
+# Baseline for the regression gate, recorded with
+#   python benchmark_suite.py --sizes 100 1000 --repeats 3 --save benchmark_baseline.json
+# and checked with
+#   python benchmark_suite.py --sizes 100 1000 --repeats 3 --baseline benchmark_baseline.json
+# which exits with status 1 on a regression; any run exits with status 1 when
+# a case fails. Record it again with --save whenever a change is meant to move
+# the figures.
+BASELINE = os.path.join(ROOT, "benchmark_baseline.json")
+BASELINE_SIZES = (100, 1000)
+BASELINE_REPEATS = 3
+
+
+def generate_catalog(disease_count, symptom_count=40, question_count=3, seed=0):
+    """
+    Synthetic dental catalog in the diseases.json format
+
+    Args:
+        disease_count (int): Diseases in the catalog
+        symptom_count (int): Symptom vocabulary size, including ASKED_SYMPTOMS
+        question_count (int): Detailed questions per disease symptom
+        seed (int): Random seed, so runs are reproducible
+
+    Returns:
+        dict: Disease name -> symptoms, detailed_questions and treatment
+    """
+    rng = random.Random(seed)
+    vocabulary = list(ASKED_SYMPTOMS) + [f"symptom {index}" for index in range(len(ASKED_SYMPTOMS), symptom_count)]
+    catalog = {}
+    for index in range(disease_count):
+        symptoms = rng.sample(vocabulary, rng.randint(2, 6))
+        catalog[f"Disease {index}"] = {
+            "symptoms": symptoms,
+            "detailed_questions": {
+                symptom: [f"Question {number} about {symptom}?" for number in range(question_count)]
+                for symptom in symptoms
+            },
+            "treatment": f"Treatment plan {index}",
+        }
+    return catalog
+
+
+def scripted_reply(prompt, rng, disease_names):
+    """
+    Answer a dialogue prompt the way a scripted patient would
+
+    Symptoms are confirmed at random, further result pages are declined
+    and confirmations pick a random disease.
+    """
+    if prompt.startswith("\nEnter the name"):
+        return rng.choice(disease_names)
+    if prompt.startswith("Show more"):
+        return "n"
+    return rng.choice("yn")
+
+
+def drive(dialogue, rng, disease_names):
+    """
+    Run a dialogue generator to the end against scripted replies
+
+    Returns:
+        int: Prompts answered
+    """
+    from app import Ask
+    answered = 0
+    reply = None
+    while True:
+        try:
+            step = dialogue.send(reply)
+        except StopIteration:
+            return answered
+        if isinstance(step, Ask):
+            reply = scripted_reply(step.prompt, rng, disease_names)
+            answered += 1
+        else:
+            reply = None
+
+
+def dental_case(name, size, workdir, seed):
+    """
+    Build the engine for a dental case on a synthetic catalog
+
+    Returns:
+        function: One operation, e.g. a full scripted diagnosis
+    """
+    from app import DentalExpertSystem
+    source_path = os.path.join(workdir, "catalog.json")
+    with open(source_path, "w", encoding="utf-8") as f:
+        json.dump(generate_catalog(size, seed=seed), f)
+    engine = DentalExpertSystem(source_path=source_path)
+    engine.symptom_matrix  # compiled up front, not inside the first timed operation
+    rng = random.Random(seed)
+
+    if name == "dental_diagnose":
+        return lambda: drive(engine.diagnosis_dialogue(), rng, engine.disease_names)
+    if name == "dental_quick":
+        return lambda: drive(engine.diagnosis_dialogue(adaptive=True), rng, engine.disease_names)
+    if name == "dental_confirm":
+        return lambda: drive(engine.confirm_dialogue(), rng, engine.disease_names)
+
+    # streamlit_flow: the work behind test2.py's chat, one rerun per input:
+    # a dialogue_fsm step per message and a ranked differential at the end
+    from dialogue_fsm import START, DialogueMachine
+    from differential import rank_differential
+    matrix = engine.symptom_matrix
+    dialogue = DialogueMachine(matrix, ASKED_SYMPTOMS, actions=("diagnosis", "confirm"),
+                               version=engine.diseases.version)
+
+    def session():
+        state = dialogue.step(dialogue.step(START, "hello"), "diagnosis")
+        while not dialogue.is_finished(state):
+            state = dialogue.step(state, rng.choice(("yes", "no")))
+        confirmed = dialogue.confirmed[state]
+        candidates, matched_counts = matrix.match(confirmed)
+        perfect = matrix.is_perfect(candidates, matched_counts)
+        if perfect.any():
+            candidates, matched_counts = candidates[perfect], matched_counts[perfect]
+        return [engine.diseases.summary(entry.disease_id)["treatment"]
+                for entry in rank_differential(matrix, candidates, matched_counts, 5)]
+    return session
+
+
+def reasoner_case(name, size, seed):
+    """
+    Build a reasoner over a knowledge base of size synthetic patients
+
+    Returns:
+        function: One query, on a random patient
+    """
+    sys.path.insert(0, DISEASE_DIR)
+    from facts import generate_patient_facts
+    from knowledge_base import MedicalKnowledgeBase
+    knowledge_base = MedicalKnowledgeBase.from_defaults()
+    knowledge_base.add_facts(generate_patient_facts(size, seed))
+    rng = random.Random(seed)
+    output = io.StringIO()
+
+    if name == "forward_chain":
+        from forward_chaining import ForwardChainingReasoner
+        reasoner = ForwardChainingReasoner(knowledge_base)
+        queries = ("diagnose({}, X)", "recommend_treatment({}, X)", "potential_serious_condition({})")
+        run = reasoner.forward_chain
+    else:
+        from backward_chaining import BackwardChainingReasoner
+        reasoner = BackwardChainingReasoner(knowledge_base)
+        queries = ("diagnose({}, viral_infection)", "high_risk({}, diabetes_complications)",
+                   "recommend_treatment({}, rest_and_hydration)")
+        run = reasoner.backward_chain
+
+    def query():
+        # The reasoners print their results; a benchmark only needs them computed
+        output.seek(0)
+        output.truncate()
+        with contextlib.redirect_stdout(output):
+            return run(rng.choice(queries).format(f"patient{rng.randrange(size)}"))
+    return query
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def calibration_ms(rounds=5):
+    """
+    Best of rounds timings of a fixed pure-Python workload, in milliseconds
+
+    Timings are compared against a baseline relative to this, so a slower
+    or busier machine is not mistaken for a slower program.
+    """
+    best = float("inf")
+    for _ in range(rounds):
+        began = time.perf_counter()
+        sorted(str(number * 7919 % 10007) for number in range(20000))
+        best = min(best, time.perf_counter() - began)
+    return best * 1000
+
+
+def run_case(name, size, operations, seed=0):
+    """
+    Time one case in this process
+
+    Returns:
+        dict: operations, seconds, throughput (operations/s), p50_ms,
+        p99_ms, peak_rss_mb (of the whole process, setup included) and
+        calibration_ms (see calibration_ms(), around the timed operations)
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        if name in ("forward_chain", "backward_chain"):
+            operation = reasoner_case(name, size, seed)
+        else:
+            operation = dental_case(name, size, workdir, seed)
+
+        for _ in range(min(10, operations)):
+            operation()
+        calibration = calibration_ms()
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(operations):
+            began = time.perf_counter()
+            operation()
+            latencies.append(time.perf_counter() - began)
+        elapsed = time.perf_counter() - start
+        calibration = (calibration + calibration_ms()) / 2
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "operations": operations,
+        "seconds": elapsed,
+        "throughput": operations / elapsed,
+        "p50_ms": percentiles[49] * 1000,
+        "p99_ms": percentiles[98] * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+        "calibration_ms": calibration,
+    }
+
+
+def measure(name, size, operations, seed=0, repeats=1):
+    """
+    Run a case in a fresh interpreter, so peak RSS and caches are its own
+
+    With several repeats, the run with the highest throughput relative to
+    its calibration_ms is kept, which filters out runs slowed by other load.
+    """
+    return max((_measure_once(name, size, operations, seed) for _ in range(repeats)),
+               key=lambda figures: figures["throughput"] * figures["calibration_ms"])
+
+
+def _measure_once(name, size, operations, seed):
+    completed = subprocess.run([sys.executable, __file__, "--case", name, "--size", str(size),
+                                "--operations", str(operations), "--seed", str(seed)],
+                               cwd=ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    return json.loads(completed.stdout)
+
+
+def compare(results, baseline, tolerance):
+    """
+    Measurements that regressed against a saved baseline by more than tolerance
+
+    Timings are scaled by the ratio of the two runs' calibration_ms first;
+    peak RSS is compared as is.
+
+    Returns:
+        list: (case key, metric, baseline value, current value) per regression
+    """
+    regressions = []
+    for key, figures in results.items():
+        for metric, larger_is_better in METRICS.items():
+            before = baseline.get(key, {}).get(metric)
+            if before is None:
+                continue
+            speed = figures.get("calibration_ms", 1) / baseline[key].get("calibration_ms", 1)
+            if metric == "throughput":
+                before /= speed
+            elif metric != "peak_rss_mb":
+                before *= speed
+            after = figures[metric]
+            if after < before / (1 + tolerance) if larger_is_better else after > before * (1 + tolerance):
+                regressions.append((key, metric, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the diagnosis, confirmation and inference paths",
+        epilog=f"Regression gate: --sizes {' '.join(map(str, BASELINE_SIZES))} --repeats {BASELINE_REPEATS} "
+               f"--baseline {os.path.basename(BASELINE)}")
+    parser.add_argument("cases", nargs="*", metavar="CASE", help=f"Cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument("--sizes", type=int, nargs="+", help="Sizes to run instead of each case's defaults")
+    parser.add_argument("--operations", type=int, default=1000, help="Timed operations per case and size")
+    parser.add_argument("--repeats", type=int, default=1, help="Runs per case and size, of which the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown or growth against the baseline")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        # Worker mode, see measure()
+        json.dump(run_case(args.case, args.size, args.operations, args.seed), sys.stdout)
+        return
+
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    results = {}
+    failed = []
+    print(f"{'case':<28} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'peak MB':>8}")
+    for name in args.cases or CASES:
+        for size in args.sizes or CASES[name]:
+            key = f"{name}[{size}]"
+            try:
+                results[key] = figures = measure(name, size, args.operations, args.seed, args.repeats)
+            except RuntimeError as error:
+                print(f"{key:<28} failed ({error})")
+                failed.append(key)
+                continue
+            print(f"{key:<28} {figures['throughput']:>10.0f} {figures['p50_ms']:>9.3f} {figures['p99_ms']:>9.3f} "
+                  f"{figures['peak_rss_mb']:>8.1f}")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance)
+        for key, metric, before, after in regressions:
+            print(f"REGRESSION {key} {metric}: {before:.3f} -> {after:.3f}")
+    if regressions or failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
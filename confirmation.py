@@ -0,0 +1,104 @@
+# confirmation.py
+from collections import namedtuple
+
+# Steps yielded by the dialogue generators: Ask expects the user's reply to
+# be sent back in, Say is output only
+Ask = namedtuple("Ask", "prompt")
+Say = namedtuple("Say", "text")
+
+
+def verdict_band(confirmed_count, total):
+    """
+    Verdict of a confirmation: 3 Confirmed, 2 High probability, 1 Low probability, 0 Very low probability
+    """
+    if confirmed_count == total:
+        return 3
+    if confirmed_count == 0:
+        return 0
+    return 2 if confirmed_count / total >= 0.5 else 1
+
+
+def confirm_symptoms(symptoms, detailed_questions):
+    """
+    Ask about a disease's symptoms, stopping as soon as the verdict is settled
+
+    Every symptom is asked first; unconfirmed symptoms with detailed
+    questions are then investigated, a symptom counting as confirmed when
+    more than half of its detailed questions are. Open questions can only
+    raise the confirmed count, so asking stops once even confirming all of
+    them would not change verdict_band(), and a symptom's detailed
+    questions stop once the majority is reached or out of reach. The
+    verdict is always the one asking every question would give.
+
+    Args:
+        symptoms (list): Symptoms the disease lists
+        detailed_questions (dict): Symptom -> follow-up questions
+
+    Yields:
+        Ask or Say: Dialogue steps; the reply to an Ask is sent back in
+
+    Returns:
+        tuple: (confirmed symptoms, symptoms answered with no)
+    """
+    confirmed_symptoms = []
+    unconfirmed_symptoms = []
+
+    def verdict_settled(open_symptoms):
+        return (verdict_band(len(confirmed_symptoms), len(symptoms))
+                == verdict_band(len(confirmed_symptoms) + open_symptoms, len(symptoms)))
+
+    # Initial symptom check
+    for position, symptom in enumerate(symptoms):
+        investigable = sum(1 for s in unconfirmed_symptoms if s in detailed_questions)
+        if verdict_settled(len(symptoms) - position + investigable):
+            return confirmed_symptoms, unconfirmed_symptoms
+        response = (yield Ask(f"Do you have the symptom: {symptom}? (y/n): ")).strip().lower()
+        if response == 'y':
+            confirmed_symptoms.append(symptom)
+        else:
+            unconfirmed_symptoms.append(symptom)
+
+    # If not all symptoms are confirmed, do deeper investigation
+    investigable = [symptom for symptom in unconfirmed_symptoms if symptom in detailed_questions]
+    if not investigable or verdict_settled(len(investigable)):
+        return confirmed_symptoms, unconfirmed_symptoms
+    yield Say("\nLet's do a more detailed investigation of your symptoms.")
+    for position, symptom in enumerate(investigable):
+        if verdict_settled(len(investigable) - position):
+            break
+
+        questions = detailed_questions[symptom]
+        required = len(questions) // 2 + 1
+        detailed_confirmations = 0
+
+        yield Say(f"\nAdditional questions about {symptom}:")
+        for asked, question in enumerate(questions, 1):
+            detailed_response = (yield Ask(f"{question} (y/n): ")).strip().lower()
+            if detailed_response == 'y':
+                detailed_confirmations += 1
+            if detailed_confirmations >= required or detailed_confirmations + len(questions) - asked < required:
+                break
+
+        if detailed_confirmations >= required:
+            confirmed_symptoms.append(symptom)
+    return confirmed_symptoms, unconfirmed_symptoms
+
+
+def run_dialogue(dialogue):
+    """
+    Drive a dialogue generator on the terminal with input() and print()
+
+    Returns:
+        The dialogue's return value
+    """
+    reply = None
+    while True:
+        try:
+            step = dialogue.send(reply)
+        except StopIteration as stop:
+            return stop.value
+        if isinstance(step, Ask):
+            reply = input(step.prompt)
+        else:
+            print(step.text)
+            reply = None
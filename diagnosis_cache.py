@@ -0,0 +1,185 @@
+# diagnosis_cache.py
+from collections import OrderedDict, namedtuple
+
+# Counters reported by DiagnosisCache.stats(); entries counts cached and
+# precomputed answer sets, version is the catalog version they belong to
+CacheStats = namedtuple("CacheStats", "hits misses evictions entries version")
+
+
+def symptom_mask(vocabulary, symptoms):
+    """
+    Canonical key of a set of confirmed symptoms: one bit per vocabulary column
+
+    Answer order and duplicates do not change the key, and symptoms the
+    catalog does not know are ignored, as they are when scoring.
+
+    Args:
+        vocabulary (dict): Symptom -> column (SymptomMatrix.vocabulary)
+        symptoms (iterable): Confirmed symptom names
+
+    Returns:
+        int: Bitmask of the known confirmed symptoms
+    """
+    mask = 0
+    for symptom in symptoms:
+        column = vocabulary.get(symptom)
+        if column is not None:
+            mask |= 1 << column
+    return mask
+
+
+class MatchTable:
+    # Bytes per stored match: an int32 disease id and a uint8 matched count
+    ENTRY_BYTES = 5
+
+    def __init__(self, offsets, disease_ids, counts):
+        """
+        Matches of every symptom mask, packed into flat arrays
+
+        The matches of mask m are disease_ids[offsets[m]:offsets[m + 1]]
+        with their matched symptom counts alongside, so the whole table is
+        three arrays rather than one result object per answer set.
+
+        Args:
+            offsets (np.ndarray): int64, 2 ** vocabulary size + 1 entries
+            disease_ids (np.ndarray): int32 ids, in catalog order per mask
+            counts (np.ndarray): uint8 matched counts, aligned with disease_ids
+        """
+        self.offsets = offsets
+        self.disease_ids = disease_ids
+        self.counts = counts
+
+    @staticmethod
+    def size(entries, masks):
+        """
+        Bytes taken by a table of masks answer sets holding entries matches in total
+        """
+        return entries * MatchTable.ENTRY_BYTES + (masks + 1) * 8
+
+    @classmethod
+    def build(cls, chunks, masks, entries):
+        """
+        Pack per-mask match counts into a table
+
+        Args:
+            chunks (iterable): (first mask, counts) pairs in mask order, counts
+                being a masks x diseases array of matched counts
+            masks (int): Number of masks covered by the chunks
+            entries (int): Total nonzero counts, to size the arrays up front
+
+        Returns:
+            MatchTable: Diseases with at least one matched symptom per mask
+        """
+        # Only precomputation builds tables, so numpy stays off the startup path
+        import numpy as np
+        offsets = np.zeros(masks + 1, dtype=np.int64)
+        disease_ids = np.empty(entries, dtype=np.int32)
+        counts = np.empty(entries, dtype=np.uint8)
+        filled = 0
+        for first, chunk in chunks:
+            rows, columns = np.nonzero(chunk)
+            disease_ids[filled:filled + len(columns)] = columns
+            counts[filled:filled + len(columns)] = chunk[rows, columns]
+            offsets[first + 1:first + len(chunk) + 1] = filled + np.cumsum(np.bincount(rows, minlength=len(chunk)))
+            filled += len(columns)
+        return cls(offsets, disease_ids, counts)
+
+    def __getitem__(self, mask):
+        start, end = self.offsets[mask], self.offsets[mask + 1]
+        return self.disease_ids[start:end], self.counts[start:end]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class DiagnosisCache:
+    def __init__(self, max_entries=4096):
+        """
+        Least-recently-used cache of diagnosis results keyed by symptom mask
+
+        Every entry belongs to one catalog version: looking up a key for
+        another version empties the cache first, so results computed against
+        a previous catalog are never served. For small vocabularies the
+        whole answer table can be filled up front with precompute(); those
+        results are never evicted.
+
+        Cached results are shared between callers and must not be modified.
+
+        Args:
+            max_entries (int): Answer sets kept besides the precomputed table
+        """
+        self.max_entries = max_entries
+        self.version = None
+        self.entries = OrderedDict()  # symptom mask -> result, least recently used first
+        self.table = None  # symptom mask -> result, when precomputed
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _check_version(self, version):
+        if version != self.version:
+            self.entries.clear()
+            self.table = None
+            self.version = version
+
+    def get(self, mask, version):
+        """
+        Cached result for a symptom mask, or None on a miss
+
+        Args:
+            mask (int): Output of symptom_mask()
+            version (str): Version of the catalog the caller scores against
+
+        Returns:
+            dict: Cached result, or None
+        """
+        self._check_version(version)
+        if self.table is not None:
+            self.hits += 1
+            return self.table[mask]
+        result = self.entries.get(mask)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(mask)
+        return result
+
+    def put(self, mask, result, version):
+        """
+        Store the result computed for a symptom mask after a miss
+        """
+        self._check_version(version)
+        if self.table is not None:
+            return
+        self.entries[mask] = result
+        self.entries.move_to_end(mask)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def precompute(self, results, version):
+        """
+        Install the full answer table
+
+        Args:
+            results (Sequence): Result of every symptom mask, indexed by mask
+                (2 ** vocabulary size entries), e.g. a MatchTable
+            version (str): Catalog version the results were computed against
+        """
+        self._check_version(version)
+        self.table = results
+        self.entries.clear()
+
+    def clear(self):
+        self.entries.clear()
+        self.table = None
+        self.version = None
+
+    def stats(self):
+        """
+        Returns:
+            CacheStats: Hit/miss counters and current size
+        """
+        entries = len(self.table) if self.table is not None else len(self.entries)
+        return CacheStats(self.hits, self.misses, self.evictions, entries, self.version)
@@ -0,0 +1,193 @@
+# dialogue_fsm.py
+import struct
+import threading
+from array import array
+
+from question_planner import next_symptom
+
+# Fixed states; question states are numbered from QUESTIONS on
+START = 0
+ACTION_SELECTION = 1
+CONFIRM_DISEASE = 2
+QUESTIONS = 3
+
+# Marks a state without a question (a finished diagnosis) in DialogueMachine.symptom
+NO_SYMPTOM = -1
+
+# Tree index dump() records for the fixed states
+_FIXED_STATES = 0xFF
+
+_YES = frozenset(("yes", "y"))
+_SESSION = struct.Struct("<4sB")
+
+
+class DialogueMachine:
+    def __init__(self, symptom_matrix, symptom_order, actions=None, version="", max_states=1 << 20):
+        """
+        Chat dialogue as a table-driven finite-state machine
+
+        Every question of a diagnosis is its own integer state, so the
+        answers so far are implied by the state: a diagnosis is a binary
+        tree of yes/no states, in a fixed symptom order for "diagnosis" and
+        chosen by the question planner for "quick". Leaves have no question
+        and record the confirmed symptoms.
+
+        The trees are grown lazily: a state's next question is chosen the
+        first time a conversation reaches it and kept, so later
+        conversations taking the same path are a couple of array lookups
+        per step. Only the paths actually visited are ever built, however
+        large the full tree of a catalog would be. A session is its tree and
+        path of answers (see dump() / load()). One machine can serve
+        sessions on several threads: new states are only added under a lock.
+
+        Args:
+            symptom_matrix (SymptomMatrix): Compiled catalog
+            symptom_order (tuple): Symptoms asked by the "diagnosis" action
+            actions (tuple): Actions offered after START, of "diagnosis",
+                "quick" and "confirm"; without actions START goes straight
+                into the diagnosis
+            version (str): Catalog version; sessions dumped for another version are rejected
+            max_states (int): Upper bound on built states
+
+        Raises:
+            ValueError: From step() or load(), if the dialogue would need more than max_states states
+        """
+        self.symptom_matrix = symptom_matrix
+        self.version = bytes.fromhex(version)[:4].ljust(4, b"\0") if version else b"\0" * 4
+        self.max_states = max_states
+        self.symptom = array("i", [NO_SYMPTOM] * QUESTIONS)  # state -> asked symptom column
+        self.on_yes = array("I", [0] * QUESTIONS)  # state -> next state after "yes"; 0 until first reached
+        self.on_no = array("I", [0] * QUESTIONS)
+        self.tree = array("B", [_FIXED_STATES] * QUESTIONS)  # state -> tree index
+        self.path = [0] * QUESTIONS  # state -> answers from its tree root as bits (1 = yes) after a leading 1
+        self.answers = [None] * QUESTIONS  # question state -> (confirmed, denied) until both children exist
+        self.confirmed = {}  # leaf state -> confirmed symptoms
+        self._choosers = []  # tree index -> function choosing the next symptom, None to finish
+        self._roots = []  # tree index -> root state
+        self._lock = threading.Lock()  # held while states are added
+
+        known = tuple(symptom for symptom in symptom_order if symptom in self.symptom_matrix.vocabulary)
+
+        def choose_fixed(confirmed, denied):
+            position = len(confirmed) + len(denied)
+            return known[position] if position < len(known) else None
+
+        self.roots = {"diagnosis": self._add_tree(choose_fixed)}
+        if actions and "quick" in actions:
+            self.roots["quick"] = self._add_tree(
+                lambda confirmed, denied: next_symptom(self.symptom_matrix, confirmed, denied))
+        self.actions = {action: self.roots[action] if action != "confirm" else CONFIRM_DISEASE
+                        for action in actions or ()}
+        # Where START (or a finished diagnosis) goes on the next input
+        self.restart = ACTION_SELECTION if actions else self.roots["diagnosis"]
+
+    def _add_tree(self, choose):
+        self._choosers.append(choose)
+        root = self._new_state(len(self._choosers) - 1, 1, (), ())
+        self._roots.append(root)
+        return root
+
+    def _new_state(self, tree, path, confirmed, denied):
+        if len(self.symptom) >= self.max_states:
+            raise ValueError(f"Dialogue needs more than {self.max_states} states")
+        symptom = self._choosers[tree](confirmed, denied)
+        state = len(self.symptom)
+        self.symptom.append(self.symptom_matrix.vocabulary[symptom] if symptom is not None else NO_SYMPTOM)
+        self.on_yes.append(0)
+        self.on_no.append(0)
+        self.tree.append(tree)
+        self.path.append(path)
+        if symptom is None:
+            self.confirmed[state] = confirmed
+            self.answers.append(None)
+        else:
+            self.answers.append((confirmed, denied))
+        return state
+
+    def _child(self, state, yes):
+        # Next state of a question state, built the first time it is reached
+        table = self.on_yes if yes else self.on_no
+        if not table[state]:
+            with self._lock:
+                # Another session may have built it while this one waited
+                if not table[state]:
+                    confirmed, denied = self.answers[state]
+                    symptom = self.symptom_matrix.symptoms[self.symptom[state]]
+                    answers = (confirmed + (symptom,), denied) if yes else (confirmed, denied + (symptom,))
+                    table[state] = self._new_state(self.tree[state], self.path[state] << 1 | yes, *answers)
+                    if self.on_yes[state] and self.on_no[state]:
+                        self.answers[state] = None
+        return table[state]
+
+    def step(self, state, text):
+        """
+        Next state after the user's input
+
+        Args:
+            state (int): Current state
+            text (str): User input
+
+        Returns:
+            int: Next state
+        """
+        if state >= QUESTIONS and self.symptom[state] != NO_SYMPTOM:
+            return self._child(state, text.strip().lower() in _YES)
+        if state == ACTION_SELECTION:
+            return self.actions.get(text.strip().lower(), ACTION_SELECTION)
+        if state == CONFIRM_DISEASE:
+            return START
+        # START and finished diagnoses take any input
+        return self.restart
+
+    def question(self, state):
+        """
+        Symptom asked in a state, or None if the state asks no symptom
+        """
+        column = self.symptom[state]
+        return self.symptom_matrix.symptoms[column] if column != NO_SYMPTOM else None
+
+    def is_finished(self, state):
+        return state in self.confirmed
+
+    def dump(self, state):
+        """
+        Serialize a session: the catalog version tag, the tree and the path of answers
+
+        State numbers depend on the order conversations were had in, so the
+        path is stored instead; any process with the same catalog resumes it.
+
+        Returns:
+            bytes: 5 bytes plus the path, one bit per answer
+        """
+        if state < QUESTIONS:
+            tree, path = _FIXED_STATES, state
+        else:
+            tree, path = self.tree[state], self.path[state]
+        return _SESSION.pack(self.version, tree) + path.to_bytes(max(1, (path.bit_length() + 7) // 8), "little")
+
+    def load(self, data):
+        """
+        Resume a session serialized by dump()
+
+        Raises:
+            ValueError: If the session belongs to another catalog version or is not a valid state
+        """
+        if len(data) <= _SESSION.size:
+            raise ValueError("Session does not belong to this dialogue")
+        version, tree = _SESSION.unpack_from(data)
+        path = int.from_bytes(data[_SESSION.size:], "little")
+        if version != self.version:
+            raise ValueError("Session does not belong to this dialogue")
+        if tree == _FIXED_STATES:
+            if path >= QUESTIONS:
+                raise ValueError("Session does not belong to this dialogue")
+            return path
+        if tree >= len(self._roots) or path < 1:
+            raise ValueError("Session does not belong to this dialogue")
+
+        state = self._roots[tree]
+        for shift in range(path.bit_length() - 2, -1, -1):
+            if self.symptom[state] == NO_SYMPTOM:
+                raise ValueError("Session does not belong to this dialogue")
+            state = self._child(state, path >> shift & 1)
+        return state
@@ -0,0 +1,77 @@
+# differential.py
+import heapq
+from collections import namedtuple
+
+# One disease of a ranked differential; the caller looks up further details
+# (e.g. the treatment) only for the diseases it shows
+Differential = namedtuple("Differential", "disease_id name matched_count symptom_count")
+
+
+def _ranking_keys(symptom_matrix, disease_ids, matched_counts):
+    # Match ratio, then specificity (symptoms the disease lists), then catalog order;
+    # the matched count rides along and never decides the order
+    listed = symptom_matrix.symptom_counts[disease_ids].tolist()
+    return [(count / max(total, 1), total, -disease_id, count)
+            for count, total, disease_id in zip(matched_counts.tolist(), listed, disease_ids.tolist())]
+
+
+def _entry(symptom_matrix, key):
+    _, total, negated_id, count = key
+    return Differential(-negated_id, symptom_matrix.disease_names[-negated_id], count, total)
+
+
+def rank_differential(symptom_matrix, disease_ids, matched_counts, k):
+    """
+    The k best candidates by match ratio, then specificity
+
+    Selected with a bounded heap of k entries, so only the returned
+    diseases are ever sorted.
+
+    Args:
+        symptom_matrix (SymptomMatrix): Compiled catalog
+        disease_ids (np.ndarray): Candidate diseases, e.g. from SymptomMatrix.match()
+        matched_counts (np.ndarray): Matched symptom count per candidate
+        k (int): Diseases to return
+
+    Returns:
+        list: Differential entries, best first
+    """
+    keys = _ranking_keys(symptom_matrix, disease_ids, matched_counts)
+    return [_entry(symptom_matrix, key) for key in heapq.nlargest(k, keys)]
+
+
+def differential_pages(symptom_matrix, disease_ids, matched_counts, page_size):
+    """
+    Rank candidates lazily, one page at a time
+
+    The first page is selected with a bounded heap like rank_differential().
+    Only if a second page is requested are the candidates heapified, after
+    which every further page costs page_size pops.
+
+    Args:
+        symptom_matrix (SymptomMatrix): Compiled catalog
+        disease_ids (np.ndarray): Candidate diseases
+        matched_counts (np.ndarray): Matched symptom count per candidate
+        page_size (int): Diseases per page
+
+    Yields:
+        list: Differential entries, best first, until the candidates run out
+    """
+    keys = _ranking_keys(symptom_matrix, disease_ids, matched_counts)
+    if not keys:
+        return
+    yield [_entry(symptom_matrix, key) for key in heapq.nlargest(page_size, keys)]
+    if len(keys) <= page_size:
+        return
+
+    # Min-heap on the negated ranking keys pops the best remaining candidate first
+    heap = [(-ratio, -total, -negated_id, count) for ratio, total, negated_id, count in keys]
+    heapq.heapify(heap)
+    for _ in range(page_size):
+        heapq.heappop(heap)
+    while heap:
+        page = []
+        while heap and len(page) < page_size:
+            ratio, total, disease_id, count = heapq.heappop(heap)
+            page.append(_entry(symptom_matrix, (-ratio, -total, -disease_id, count)))
+        yield page
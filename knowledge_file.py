@@ -0,0 +1,303 @@
+# knowledge_file.py
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "diseases.json")
+
+# Compiled layout (little-endian):
+#   header: magic, format version, 16-byte source digest, section counts
+#   string offsets    u32[strings + 1]    byte offsets into the string blob
+#   diseases          u32[diseases * 4]   name id, treatment id, symptom start, symptom end
+#   sorted names      u32[diseases]       disease indexes ordered by name, for lookups
+#   disease symptoms  u32[entries * 3]    symptom id, question start, question end
+#   questions         u32[questions]      question string ids
+#   string blob       utf-8 bytes of every interned string, stored once
+_MAGIC = b"DKB1"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sI16s4I")
+
+
+def read_source(path=DEFAULT_SOURCE):
+    """
+    Read a disease catalog from its JSON or YAML source file
+
+    Returns:
+        dict: Disease name -> symptoms, detailed_questions and treatment
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def source_digest(path=DEFAULT_SOURCE):
+    """
+    Digest of a catalog source file, recorded in the compiled file as its version
+
+    Returns:
+        bytes: 16-byte blake2b digest of the file contents
+    """
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).digest()
+
+
+def compiled_digest(compiled_path):
+    """
+    Source digest recorded in a compiled file's header
+
+    Returns:
+        bytes: The digest, or None if the file is missing, unreadable or
+        not a compiled knowledge file of this format version
+    """
+    try:
+        with open(compiled_path, "rb") as f:
+            header = f.read(_HEADER.size)
+    except OSError:
+        return None
+    if len(header) < _HEADER.size:
+        return None
+    magic, file_version, digest = _HEADER.unpack(header)[:3]
+    if magic != _MAGIC or file_version != _FORMAT_VERSION:
+        return None
+    return digest
+
+
+def cache_path(source_path):
+    """
+    Compiled file location in the user's cache directory, for sources in read-only directories
+
+    Named after the source's absolute path, so two catalogs with the same
+    file name do not share a compiled file.
+    """
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    source_path = os.path.abspath(source_path)
+    key = hashlib.blake2b(source_path.encode("utf-8"), digest_size=8).hexdigest()
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(cache_dir, "dental-expert-system", f"{name}-{key}.kb")
+
+
+def _encode_catalog(diseases, digest):
+    # Header, sections and string blob of the compiled format, as a list of byte chunks
+    strings = {}
+
+    def intern(value):
+        return strings.setdefault(value, len(strings))
+
+    records = array("I")
+    disease_symptoms = array("I")
+    questions = array("I")
+    names = list(diseases)
+
+    for name in names:
+        details = diseases[name]
+        detailed_questions = details.get("detailed_questions", {})
+        record = [intern(name), intern(details["treatment"]), len(disease_symptoms) // 3]
+        for symptom in details["symptoms"]:
+            question_start = len(questions)
+            questions.extend(intern(question) for question in detailed_questions.get(symptom, ()))
+            disease_symptoms.extend((intern(symptom), question_start, len(questions)))
+        record.append(len(disease_symptoms) // 3)
+        records.extend(record)
+
+    sorted_names = array("I", sorted(range(len(names)), key=names.__getitem__))
+
+    blob = bytearray()
+    string_offsets = array("I", [0])
+    for value in strings:
+        blob += value.encode("utf-8")
+        string_offsets.append(len(blob))
+
+    sections = [string_offsets, records, sorted_names, disease_symptoms, questions]
+    if sys.byteorder != "little":
+        for section in sections:
+            section.byteswap()
+
+    header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, digest[:16].ljust(16, b"\0"),
+                          len(strings), len(names), len(disease_symptoms) // 3, len(questions))
+    return [header] + [section.tobytes() for section in sections] + [bytes(blob)]
+
+
+def compile_catalog(diseases, compiled_path, digest=b""):
+    """
+    Compile a catalog dict into the binary knowledge file format
+
+    Args:
+        diseases (dict): Catalog as returned by read_source()
+        compiled_path (str): Output file, replaced atomically
+        digest (bytes): Digest of the source, recorded as the catalog version
+    """
+    chunks = _encode_catalog(diseases, digest)
+    temp_path = f"{compiled_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.writelines(chunks)
+        os.replace(temp_path, compiled_path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def load_catalog(source_path=DEFAULT_SOURCE, compiled_path=None):
+    """
+    Open the compiled catalog, (re)compiling it first if it was built from another source
+
+    The compiled file is current when the source digest recorded in its
+    header matches the source's contents. It is written next to the source,
+    or to the user's cache directory if that is not writable; if neither is,
+    the catalog is compiled in memory for this process only.
+
+    Args:
+        source_path (str): JSON/YAML catalog source
+        compiled_path (str): Compiled file; defaults to the source path with a
+            .kb suffix, then cache_path()
+
+    Returns:
+        CompiledCatalog: Read-only catalog, memory-mapped unless compiled in memory
+    """
+    if compiled_path is not None:
+        locations = [compiled_path]
+    else:
+        locations = [os.path.splitext(source_path)[0] + ".kb", cache_path(source_path)]
+
+    digest = source_digest(source_path)
+    for location in locations:
+        if compiled_digest(location) == digest:
+            return CompiledCatalog(location)
+
+    diseases = read_source(source_path)
+    for location in locations:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(location)), exist_ok=True)
+            compile_catalog(diseases, location, digest)
+        except OSError:
+            continue
+        return CompiledCatalog(location)
+    return CompiledCatalog(data=b"".join(_encode_catalog(diseases, digest)))
+
+
+class CompiledCatalog(Mapping):
+    def __init__(self, path=None, data=None):
+        """
+        Memory-map a compiled knowledge file
+
+        The catalog behaves like the original diseases dict; records are
+        decoded from the shared mapping on access, so every process opening
+        the same file shares one copy through the page cache.
+
+        Args:
+            path (str): File written by compile_catalog()
+            data (bytes): Compiled catalog held in memory instead of a file
+        """
+        if sys.byteorder != "little":
+            raise ValueError("Compiled knowledge files can only be mapped on little-endian hosts")
+
+        self.path = path
+        if data is not None:
+            self._mmap = data
+        else:
+            with open(path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, file_version, digest, n_strings, n_diseases, n_entries, n_questions = \
+            _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC or file_version != _FORMAT_VERSION:
+            raise ValueError(f"{path or 'data'} is not a compiled knowledge file")
+        self.version = digest.hex()
+
+        view = memoryview(self._mmap)
+        offset = _HEADER.size
+        sections = []
+        for count in (n_strings + 1, n_diseases * 4, n_diseases, n_entries * 3, n_questions):
+            sections.append(view[offset:offset + 4 * count].cast("I"))
+            offset += 4 * count
+        self._string_offsets, self._records, self._sorted_names, self._symptoms, self._questions = sections
+        self._blob = view[offset:]
+        self._size = n_diseases
+
+    def __reduce__(self):
+        # Pickle by path, so the receiving process maps the same file; a
+        # catalog compiled in memory has no file and travels as its bytes
+        if self.path is None:
+            return (CompiledCatalog, (None, bytes(self._mmap)))
+        return (CompiledCatalog, (self.path,))
+
+    def _string(self, string_id):
+        start = self._string_offsets[string_id]
+        return str(self._blob[start:self._string_offsets[string_id + 1]], "utf-8")
+
+    def _find(self, name):
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            index = self._sorted_names[middle]
+            candidate = self._string(self._records[4 * index])
+            if candidate == name:
+                return index
+            if candidate < name:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def record(self, index):
+        """
+        Decode the disease stored at a catalog position
+
+        Returns:
+            dict: symptoms, detailed_questions and treatment of the disease
+        """
+        _, treatment_id, start, end = self._records[4 * index:4 * index + 4]
+        symptoms = []
+        detailed_questions = {}
+        for entry in range(start, end):
+            symptom_id, question_start, question_end = self._symptoms[3 * entry:3 * entry + 3]
+            symptom = self._string(symptom_id)
+            symptoms.append(symptom)
+            if question_end > question_start:
+                detailed_questions[symptom] = [self._string(question_id)
+                                               for question_id in self._questions[question_start:question_end]]
+        return {
+            "symptoms": symptoms,
+            "detailed_questions": detailed_questions,
+            "treatment": self._string(treatment_id)
+        }
+
+    def summary(self, index):
+        """
+        Decode only the symptoms and treatment of the disease at a catalog position
+
+        Diagnosis results never show the detailed questions, so they are not
+        decoded here.
+
+        Returns:
+            dict: symptoms and treatment of the disease
+        """
+        _, treatment_id, start, end = self._records[4 * index:4 * index + 4]
+        return {
+            "symptoms": [self._string(symptom_id) for symptom_id in self._symptoms[3 * start:3 * end:3]],
+            "treatment": self._string(treatment_id)
+        }
+
+    def __getitem__(self, name):
+        index = self._find(name)
+        if index is None:
+            raise KeyError(name)
+        return self.record(index)
+
+    def __contains__(self, name):
+        return isinstance(name, str) and self._find(name) is not None
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield self._string(self._records[4 * index])
+
+    def __len__(self):
+        return self._size
@@ -0,0 +1,50 @@
+# question_planner.py
+import numpy as np
+
+
+def possible_diseases(symptom_matrix, denied):
+    """
+    Diseases that can still be a perfect match, i.e. list none of the denied symptoms
+
+    Returns:
+        np.ndarray: Boolean mask over the catalog
+    """
+    denied_bits = symptom_matrix.encode(denied)
+    return ~np.any(symptom_matrix.profiles & denied_bits, axis=1)
+
+
+def next_symptom(symptom_matrix, confirmed, denied):
+    """
+    Pick the most informative symptom to ask next
+
+    Only symptoms of diseases that can still be a perfect match and are not
+    fully answered yet are worth asking. Of those, the symptom splitting
+    these diseases closest to half and half has the highest expected
+    information gain. When none is left the diagnosis is settled: every
+    perfect match is known, and the remaining questions could only change
+    partial matches.
+
+    Args:
+        symptom_matrix (SymptomMatrix): Compiled catalog
+        confirmed (iterable): Symptoms answered with yes
+        denied (iterable): Symptoms answered with no
+
+    Returns:
+        str: Next symptom to ask, or None once the diagnosis is settled
+    """
+    asked = symptom_matrix.encode((*confirmed, *denied))
+    profiles = symptom_matrix.profiles
+
+    # Possible diseases that still list an unasked symptom
+    open_diseases = possible_diseases(symptom_matrix, denied) & np.any(profiles & ~asked, axis=1)
+    if not open_diseases.any():
+        return None
+
+    vocabulary_size = len(symptom_matrix.vocabulary)
+    counts = np.unpackbits(profiles[open_diseases], axis=1, count=vocabulary_size).sum(axis=0)
+    unasked = np.unpackbits(~asked, count=vocabulary_size).astype(bool)
+
+    # Distance from an even split; 0 is a perfect halving of the open diseases
+    imbalance = np.abs(2 * counts - open_diseases.sum()).astype(np.float64)
+    imbalance[(counts == 0) | ~unasked] = np.inf
+    return symptom_matrix.symptoms[int(np.argmin(imbalance))]
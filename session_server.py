@@ -0,0 +1,251 @@
+# session_server.py
+import argparse
+import asyncio
+import random
+import time
+from collections import namedtuple
+
+from app import Ask, DentalExpertSystem
+
+# Message sent to a client: kind is "say" (output), "ask" (a reply is
+# expected) or "end" (the session is over; text gives the reason)
+Message = namedtuple("Message", "kind text")
+
+
+class ServerBusy(Exception):
+    """Raised when a connection is refused because the server is at max_sessions"""
+
+
+class SessionServer:
+    def __init__(self, engine=None, idle_timeout=300.0, max_sessions=10000, queue_size=16):
+        """
+        Host dental expert system conversations on one asyncio event loop
+
+        Every conversation is a coroutine driving the engine's menu dialogue
+        generator (DentalExpertSystem.menu_dialogue), so a waiting session
+        costs a suspended coroutine and two small queues. The engine and its
+        compiled catalog are shared by all sessions.
+
+        Back-pressure: each session's inbox and outbox are bounded, so a
+        client sending faster than its dialogue consumes (or reading slower
+        than it produces) is made to wait, and connections beyond
+        max_sessions are refused. A session whose client stays silent, or
+        stops reading, for idle_timeout seconds is closed, and so is one
+        whose dialogue raises; either way the client gets an "end" message.
+
+        Args:
+            engine (DentalExpertSystem): Shared engine; one is built if omitted
+            idle_timeout (float): Seconds a session may wait on its client
+            max_sessions (int): Concurrent conversations accepted
+            queue_size (int): Messages buffered per direction and session
+        """
+        self.engine = engine if engine is not None else DentalExpertSystem()
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        self.sessions = {}  # session id -> asyncio.Task
+        self.timed_out = 0
+        self.failed = 0
+        self._next_id = 0
+
+    def connect(self):
+        """
+        Open a conversation with a local, in-process client
+
+        Returns:
+            LocalClient: The client end of the new session
+
+        Raises:
+            ServerBusy: If max_sessions conversations are already open
+        """
+        if len(self.sessions) >= self.max_sessions:
+            raise ServerBusy(f"{self.max_sessions} sessions already open")
+        session_id = self._next_id
+        self._next_id += 1
+        inbox = asyncio.Queue(self.queue_size)
+        outbox = asyncio.Queue(self.queue_size)
+        task = asyncio.get_running_loop().create_task(self._run_session(session_id, inbox, outbox))
+        self.sessions[session_id] = task
+        task.add_done_callback(lambda _: self.sessions.pop(session_id, None))
+        return LocalClient(session_id, inbox, outbox, task)
+
+    async def _run_session(self, session_id, inbox, outbox):
+        dialogue = self.engine.menu_dialogue()
+        reason = "goodbye"
+        try:
+            reply = None
+            while True:
+                try:
+                    step = dialogue.send(reply)
+                except StopIteration:
+                    break
+                if isinstance(step, Ask):
+                    await self._put(outbox, Message("ask", step.prompt))
+                    # Only a reply that is not there yet is waited for under the idle timeout
+                    if inbox.empty():
+                        reply = await asyncio.wait_for(inbox.get(), self.idle_timeout)
+                    else:
+                        reply = inbox.get_nowait()
+                    if reply is None:
+                        reason = "closed"
+                        break
+                else:
+                    await self._put(outbox, Message("say", step.text))
+                    reply = None
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            reason = "timeout"
+        except Exception:
+            # One broken conversation must not leave its client waiting for output
+            self.failed += 1
+            reason = "error"
+        finally:
+            dialogue.close()
+        # The end notice never blocks: a client that stopped reading just misses it
+        if not outbox.full():
+            outbox.put_nowait(Message("end", reason))
+
+    async def _put(self, outbox, message):
+        # Output goes straight into the queue; a full queue means the client
+        # stopped reading, which is waited on under the idle timeout
+        if outbox.full():
+            await asyncio.wait_for(outbox.put(message), self.idle_timeout)
+        else:
+            outbox.put_nowait(message)
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """
+        Serve sessions over TCP with a line protocol, one session per connection
+
+        Output lines are sent as-is; a line starting with "? " is a question
+        and the next line received is its answer.
+        """
+        async def handle(reader, writer):
+            try:
+                client = self.connect()
+            except ServerBusy as error:
+                writer.write(f"! {error}\n".encode())
+                await writer.drain()
+                writer.close()
+                return
+
+            async def forward_replies():
+                try:
+                    while line := await reader.readline():
+                        await client.send(line.decode().rstrip("\r\n"))
+                except ConnectionError:
+                    # The session ended before the client stopped sending, or the connection dropped
+                    pass
+                await client.close()
+
+            replies = asyncio.get_running_loop().create_task(forward_replies())
+            try:
+                while (message := await client.receive()).kind != "end":
+                    prefix = "? " if message.kind == "ask" else ""
+                    writer.write(f"{prefix}{message.text}\n".encode())
+                    await writer.drain()
+            finally:
+                replies.cancel()
+                writer.close()
+
+        server = await asyncio.start_server(handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+class LocalClient:
+    """Client end of an in-process session, standing in for a network connection"""
+    __slots__ = ("session_id", "_inbox", "_outbox", "_task")
+
+    def __init__(self, session_id, inbox, outbox, task):
+        self.session_id = session_id
+        self._inbox = inbox
+        self._outbox = outbox
+        self._task = task
+
+    async def send(self, text):
+        """
+        Answer the pending question; waits while the session's inbox is full
+
+        Raises:
+            ConnectionError: If the session has already ended
+        """
+        if self._task.done():
+            raise ConnectionError(f"Session {self.session_id} has ended")
+        await self._inbox.put(text)
+
+    async def receive(self):
+        """
+        Next message from the session
+
+        Returns:
+            Message: kind "say", "ask" or "end"
+        """
+        if self._task.done() and self._outbox.empty():
+            return Message("end", "closed")
+        return await self._outbox.get()
+
+    async def close(self):
+        if not self._task.done():
+            await self._inbox.put(None)
+
+
+async def simulated_client(server, rng, reply_delay=0.0):
+    """
+    Run one scripted conversation: a random menu choice answered at random
+
+    Returns:
+        int: Questions answered before the session ended
+    """
+    client = server.connect()
+    choices = iter([rng.choice("123"), "4"])
+    disease_names = server.engine.disease_names
+    answered = 0
+    while (message := await client.receive()).kind != "end":
+        if message.kind != "ask":
+            continue
+        if message.text.startswith("Enter your choice"):
+            reply = next(choices)
+        elif message.text.startswith("\nEnter the name"):
+            reply = rng.choice(disease_names)
+        else:
+            reply = rng.choice("yn")
+        if reply_delay:
+            await asyncio.sleep(rng.random() * reply_delay)
+        await client.send(reply)
+        answered += 1
+    return answered
+
+
+async def run_simulation(sessions, reply_delay, seed=0):
+    server = SessionServer(max_sessions=sessions)
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    answered = await asyncio.gather(*(simulated_client(server, rng, reply_delay) for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+    cache = server.engine.diagnosis_cache.stats()
+    print(f"{sessions} concurrent sessions, {sum(answered)} answers in {elapsed:.2f}s "
+          f"({sum(answered) / elapsed:.0f} answers/s, {server.timed_out} timed out, {server.failed} failed, "
+          f"diagnosis cache {cache.hits} hits / {cache.misses} misses)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dental expert system session server")
+    parser.add_argument("--serve", action="store_true", help="Serve TCP sessions instead of simulating clients")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--idle-timeout", type=float, default=300.0, help="Seconds before an idle session closes")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--sessions", type=int, default=2000, help="Simulated concurrent clients")
+    parser.add_argument("--reply-delay", type=float, default=0.01, help="Max simulated think time per answer")
+    args = parser.parse_args()
+
+    if args.serve:
+        server = SessionServer(idle_timeout=args.idle_timeout, max_sessions=args.max_sessions)
+        asyncio.run(server.serve(args.host, args.port))
+    else:
+        asyncio.run(run_simulation(args.sessions, args.reply_delay))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# startup_benchmark.py
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Entry points measured: name -> (working directory, module, stdin that exits the menu at once)
+ENTRY_POINTS = {
+    "app": (ROOT, "app", "4\n"),
+    "test": (ROOT, "test", "3\n"),
+    "session_server": (ROOT, "session_server", None),
+    "batch_diagnose": (ROOT, "batch_diagnose", None),
+    "disease_main": (os.path.join(ROOT, "Disease"), "main", "6\n"),
+}
+
+
+def import_times(directory, module):
+    """
+    Import a module in a fresh interpreter under -X importtime
+
+    Returns:
+        dict: Imported module name -> cumulative import time in microseconds
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=directory, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def run_to_exit(directory, module, stdin):
+    """
+    Wall time of starting a script and choosing Exit at its first menu
+
+    Returns:
+        float: Seconds
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, f"{module}.py"], cwd=directory, input=stdin, capture_output=True, text=True,
+                   check=True)
+    return time.perf_counter() - start
+
+
+def measure(name, repeat=5, top=5):
+    """
+    Startup figures of one entry point, medians over repeat fresh interpreters
+
+    Returns:
+        dict: import_ms (the entry module with everything it imports),
+        heaviest (the imports with the largest cumulative ms) and
+        exit_ms (start to Exit, for scripts with a menu)
+    """
+    directory, module, stdin = ENTRY_POINTS[name]
+    runs = [import_times(directory, module) for _ in range(repeat)]
+    samples = {}
+    for times in runs:
+        for imported, cumulative in times.items():
+            samples.setdefault(imported, []).append(cumulative)
+    medians = {imported: statistics.median(values) / 1000 for imported, values in samples.items()}
+    result = {
+        "import_ms": medians[module],
+        "heaviest": dict(sorted(((imported, round(ms, 1)) for imported, ms in medians.items() if imported != module),
+                                key=lambda item: -item[1])[:top]),
+    }
+    if stdin is not None:
+        result["exit_ms"] = statistics.median(run_to_exit(directory, module, stdin) for _ in range(repeat)) * 1000
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """
+    Entry points whose startup regressed against a saved baseline
+
+    Returns:
+        list: (entry point, metric, baseline ms, current ms) per regression
+    """
+    regressions = []
+    for name, figures in results.items():
+        for metric in ("import_ms", "exit_ms"):
+            before = baseline.get(name, {}).get(metric)
+            if before is not None and metric in figures and figures[metric] > before * (1 + tolerance):
+                regressions.append((name, metric, before, figures[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure interpreter startup of the expert system entry points")
+    parser.add_argument("entry_points", nargs="*", metavar="ENTRY_POINT", help=f"Entry points to measure (default: all of {', '.join(ENTRY_POINTS)})")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against the baseline")
+    args = parser.parse_args()
+    unknown = set(args.entry_points) - set(ENTRY_POINTS)
+    if unknown:
+        parser.error(f"unknown entry points: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name in args.entry_points or ENTRY_POINTS:
+        try:
+            results[name] = figures = measure(name, args.repeat)
+        except (RuntimeError, subprocess.CalledProcessError) as error:
+            print(f"{name}: failed to start ({error})")
+            continue
+        exit_time = f", {figures['exit_ms']:.1f} ms to exit" if "exit_ms" in figures else ""
+        print(f"{name}: {figures['import_ms']:.1f} ms to import{exit_time}")
+        for imported, ms in figures["heaviest"].items():
+            print(f"    {ms:8.1f} ms  {imported}")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for name, metric, before, after in regressions:
+            print(f"REGRESSION {name} {metric}: {before:.1f} ms -> {after:.1f} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# symptom_matrix.py
+import numpy as np
+
+# Bits set in every byte value, used when np.bitwise_count is unavailable (numpy < 2.0)
+_POPCOUNT_TABLE = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+# Upper bound on the unpacked catalog block built while scoring a batch
+_BATCH_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def _popcount(packed):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(packed)
+    return _POPCOUNT_TABLE[packed]
+
+
+class SymptomMatrix:
+    def __init__(self, diseases):
+        """
+        Compile a disease catalog into a bit-packed diseases x symptoms matrix
+
+        Args:
+            diseases (dict): Disease name -> details with a "symptoms" list
+        """
+        self.disease_names = list(diseases)
+
+        # Symptom vocabulary: symptom -> column, in first-seen catalog order
+        self.vocabulary = {}
+        for details in diseases.values():
+            for symptom in details["symptoms"]:
+                self.vocabulary.setdefault(symptom, len(self.vocabulary))
+        self.symptoms = list(self.vocabulary)
+
+        profiles = np.zeros((len(self.disease_names), len(self.vocabulary)), dtype=bool)
+        for row, disease in enumerate(self.disease_names):
+            columns = [self.vocabulary[symptom] for symptom in diseases[disease]["symptoms"]]
+            profiles[row, columns] = True
+
+        # One row of packed bytes per disease; 8 symptoms per byte
+        self.profiles = np.packbits(profiles, axis=1)
+        self.symptom_counts = profiles.sum(axis=1, dtype=np.int32)
+
+        # Posting lists: symptom column -> ids of the diseases listing it, in catalog order
+        self.postings = [np.flatnonzero(profiles[:, column]).astype(np.int32)
+                         for column in range(len(self.vocabulary))]
+
+    def encode(self, symptoms):
+        """
+        Turn a patient's confirmed symptoms into a packed bit vector
+
+        Args:
+            symptoms (iterable): Confirmed symptom names; unknown ones are ignored
+
+        Returns:
+            np.ndarray: Packed symptom bits, same width as a catalog row
+        """
+        bits = np.zeros(len(self.vocabulary), dtype=bool)
+        columns = [self.vocabulary[symptom] for symptom in symptoms if symptom in self.vocabulary]
+        bits[columns] = True
+        return np.packbits(bits)
+
+    def encode_batch(self, answers):
+        """
+        Encode several patients' answers into one packed matrix (patients x bytes)
+        """
+        answers = list(answers)
+        bits = np.zeros((len(answers), len(self.vocabulary)), dtype=bool)
+        for row, symptoms in enumerate(answers):
+            columns = [self.vocabulary[symptom] for symptom in symptoms if symptom in self.vocabulary]
+            bits[row, columns] = True
+        return np.packbits(bits, axis=1)
+
+    def candidates(self, symptoms):
+        """
+        Diseases listing at least one of the symptoms, from the posting lists
+
+        Returns:
+            np.ndarray: Disease ids in catalog order
+        """
+        postings = [self.postings[self.vocabulary[symptom]] for symptom in set(symptoms) if symptom in self.vocabulary]
+        if not postings:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(postings))
+
+    def match(self, symptoms):
+        """
+        Matched symptom counts for the diseases sharing a symptom with the patient
+
+        Candidates are selected from the posting lists of the confirmed
+        symptoms and only their rows of the matrix are scored, so the cost
+        follows the posting sizes rather than the catalog size.
+
+        Args:
+            symptoms (iterable): Confirmed symptom names; unknown ones are ignored
+
+        Returns:
+            tuple: (disease ids in catalog order, matched symptom count per id)
+        """
+        symptoms = list(symptoms)
+        disease_ids = self.candidates(symptoms)
+        counts = _popcount(self.profiles[disease_ids] & self.encode(symptoms)).sum(axis=1, dtype=np.int32)
+        return disease_ids, counts
+
+    def is_perfect(self, disease_ids, counts):
+        """
+        Which of the matched diseases have every symptom they list confirmed
+
+        Args:
+            disease_ids (np.ndarray): Disease ids, e.g. from match()
+            counts (np.ndarray): Matched symptom count per id
+
+        Returns:
+            np.ndarray: Boolean mask over disease_ids
+        """
+        return counts == self.symptom_counts[disease_ids]
+
+    def match_counts_batch(self, encoded):
+        """
+        Matched symptom counts for a batch of patients (patients x diseases)
+
+        Args:
+            encoded (np.ndarray): Output of encode_batch()
+
+        Returns:
+            np.ndarray: Matched symptom count per patient and disease
+        """
+        vocabulary_size = len(self.vocabulary)
+        patients = np.unpackbits(encoded, axis=1, count=vocabulary_size).astype(np.float32)
+        counts = np.empty((encoded.shape[0], len(self.disease_names)), dtype=np.int32)
+
+        # Unpack the catalog a block of diseases at a time and score it with one matmul
+        chunk = max(1, _BATCH_CHUNK_BYTES // (4 * max(1, vocabulary_size)))
+        for start in range(0, len(self.disease_names), chunk):
+            block = np.unpackbits(self.profiles[start:start + chunk], axis=1, count=vocabulary_size)
+            counts[:, start:start + chunk] = patients @ block.T.astype(np.float32)
+        return counts
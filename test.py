@@ -1,9 +1,21 @@
 from experta import KnowledgeEngine, Fact, Rule, DefFacts, MATCH
+from confirmation import confirm_symptoms, run_dialogue
+from knowledge_file import load_catalog
 
 class DentalExpertSystem(KnowledgeEngine):
     def __init__(self, diseases):
         super().__init__()
         self.diseases = diseases
+        self.disease_names = list(diseases)
+        self.symptom_index = self._build_symptom_index()
+
+    def _build_symptom_index(self):
+        # Inverted index: symptom -> ids of the diseases that list it
+        index = {}
+        for disease_id, disease in enumerate(self.disease_names):
+            for symptom in self.diseases[disease]["symptoms"]:
+                index.setdefault(symptom, []).append(disease_id)
+        return index
 
     @DefFacts()
     def _initial_action(self):
@@ -18,39 +30,8 @@ class DentalExpertSystem(KnowledgeEngine):
         disease_details = self.diseases[disease]
         symptoms = disease_details["symptoms"]
 
-        # Track confirmed and unconfirmed symptoms
-        confirmed_symptoms = []
-        unconfirmed_symptoms = []
-
-        # Initial symptom check
-        for symptom in symptoms:
-            response = input(f"Do you have the symptom: {symptom}? (y/n): ").strip().lower()
-            if response == 'y':
-                confirmed_symptoms.append(symptom)
-            else:
-                unconfirmed_symptoms.append(symptom)
-
-        # If not all symptoms are confirmed, do deeper investigation
-        if unconfirmed_symptoms:
-            print("\nLet's do a more detailed investigation of your symptoms.")
-            for symptom in unconfirmed_symptoms:
-                # Check if detailed questions exist for this symptom
-                if "detailed_questions" in disease_details and symptom in disease_details["detailed_questions"]:
-                    detailed_questions = disease_details["detailed_questions"][symptom]
-
-                    # Ask additional detailed questions
-                    detailed_confirmations = 0
-                    total_questions = len(detailed_questions)
-
-                    print(f"\nAdditional questions about {symptom}:")
-                    for question in detailed_questions:
-                        detailed_response = input(f"{question} (y/n): ").strip().lower()
-                        if detailed_response == 'y':
-                            detailed_confirmations += 1
-
-                    # If more than half of detailed questions are confirmed, consider the symptom confirmed
-                    if detailed_confirmations > total_questions // 2:
-                        confirmed_symptoms.append(symptom)
+        # Asking stops as soon as the verdict is settled
+        confirmed_symptoms, _ = run_dialogue(confirm_symptoms(symptoms, disease_details.get("detailed_questions", {})))
 
         # Final diagnosis
         if len(confirmed_symptoms) == len(symptoms):
@@ -83,20 +64,30 @@ class DentalExpertSystem(KnowledgeEngine):
         perfectly_matching = []
         partially_matching = []
 
-        for disease, details in self.diseases.items():
+        # Only diseases listing at least one confirmed symptom are visited;
+        # match counts are summed from the posting lists of the index
+        matched_counts = {}
+        for symptom in user_symptoms:
+            for disease_id in self.symptom_index.get(symptom, ()):
+                matched_counts[disease_id] = matched_counts.get(disease_id, 0) + 1
+
+        # Report candidates in catalog order
+        for disease_id in sorted(matched_counts):
+            disease = self.disease_names[disease_id]
+            details = self.diseases[disease]
             disease_symptoms = details["symptoms"]
-            matched_symptoms = set(user_symptoms).intersection(disease_symptoms)
-            if len(matched_symptoms) == len(disease_symptoms):
+            matched_count = matched_counts[disease_id]
+            if matched_count == len(disease_symptoms):
                 perfectly_matching.append({
                     "name": disease,
-                    "matched_count": len(matched_symptoms),
+                    "matched_count": matched_count,
                     "symptoms": disease_symptoms,
                     "treatment": details["treatment"]
                 })
-            elif matched_symptoms:
+            else:
                 partially_matching.append({
                     "name": disease,
-                    "matched_count": len(matched_symptoms),
+                    "matched_count": matched_count,
                     "symptoms": disease_symptoms,
                     "treatment": details["treatment"]
                 })
@@ -136,117 +127,8 @@ class DentalExpertSystem(KnowledgeEngine):
 
 
 
-# Define diseases, symptoms, detailed questions, and treatments
-diseases = {
-    "Cavities": {
-        "symptoms": ["tooth pain", "sensitivity to sweets", "visible holes"],
-        "detailed_questions": {
-            "tooth pain": [
-                "Do you experience sharp, sudden pain when biting down?",
-                "Does the pain worsen when eating hot or cold foods?",
-                "Do you feel persistent aching in a specific tooth?",
-                "Does the pain keep you awake at night?"
-            ],
-            "sensitivity to sweets": [
-                "Do you experience pain when eating sugary foods?",
-                "Do your teeth hurt when consuming cold or sweet drinks?",
-                "Do you feel a sharp sensation when something sweet touches your teeth?"
-            ],
-            "visible holes": [
-                "Have you noticed any dark spots or holes in your teeth?",
-                "Can you see any discoloration or chipped areas in your teeth?",
-                "When you run your tongue over your teeth, do you feel any rough or uneven surfaces?"
-            ]
-        },
-        "treatment": (
-            "\n* Dental fillings: Removing the decayed part and filling it with composite resin, amalgam, or other materials.\n"
-            "* Crowns: If the cavity is extensive, a crown may be used to protect the remaining tooth.\n"
-            "* Fluoride treatments: Strengthen enamel and reverse early stages of decay.\n"
-            "* Preventive care: Brushing twice daily with fluoride toothpaste, reducing sugary foods and drinks."
-        )
-    },
-    "Tooth Sensitivity": {
-        "symptoms": ["tooth pain", "sensitivity to sweets"],
-        "detailed_questions": {
-            "tooth pain": [
-                "Do you experience sharp, quick pain when exposed to cold or hot temperatures?",
-                "Does brushing or flossing cause discomfort?",
-                "Do you experience pain when breathing in cold air?",
-                "Is the pain localized to a specific tooth or area?"
-            ],
-            "sensitivity to sweets": [
-                "Do sweet foods cause a sudden, sharp pain?",
-                "Do you avoid certain foods due to sensitivity?",
-                "Does the pain subside quickly after the stimulus is removed?"
-            ]
-        },
-        "treatment": (
-            "\n* Desensitizing toothpaste: Reduces nerve sensitivity over time.\n"
-            "* Fluoride treatments: Applied by a dentist to strengthen enamel and reduce pain.\n"
-            "* Dental bonding: Covers exposed roots or damaged areas with a protective resin.\n"
-            "* Nightguards: For teeth grinding (bruxism) which can exacerbate sensitivity."
-        )
-    },
-    "Tooth Abscess": {
-        "symptoms": ["tooth pain", "swollen gums", "bad breath"],
-        "detailed_questions": {
-            "tooth pain": [
-                "Do you experience severe, throbbing pain?",
-                "Does the pain worsen when you lie down?",
-                "Do you feel pain when touching the affected area?",
-                "Is the pain constant or intermittent?"
-            ],
-            "swollen gums": [
-                "Are your gums red and swollen?",
-                "Do you notice any pus around the affected tooth?",
-                "Is there a painful bump or abscess on your gums?",
-                "Do your gums feel tender to touch?"
-            ],
-            "bad breath": [
-                "Do people comment on your bad breath?",
-                "Do you have a persistent bad taste in your mouth?",
-                "Does the bad breath persist even after brushing?",
-                "Do you notice an unpleasant odor when you exhale?"
-            ]
-        },
-        "treatment": (
-            "\n* Root canal therapy: Removes the infection and seals the tooth to prevent reinfection.\n"
-            "* Incision and drainage: Draining the abscess if necessary.\n"
-            "* Antibiotics: To control the infection if it has spread.\n"
-            "* Tooth extraction: In severe cases where the tooth cannot be saved."
-        )
-    },
-    "Gingivitis": {
-        "symptoms": ["bleeding gums", "swollen gums", "bad breath"],
-        "detailed_questions": {
-            "bleeding gums": [
-                "Do your gums bleed when brushing or flossing?",
-                "Do you see blood on your toothbrush or dental floss?",
-                "Do your gums bleed easily when touched?",
-                "Do you notice bleeding when eating hard foods?"
-            ],
-            "swollen gums": [
-                "Are your gums puffy or enlarged?",
-                "Do your gums appear red instead of pink?",
-                "Do your gums feel tender or painful?",
-                "Do you notice any changes in gum texture?"
-            ],
-            "bad breath": [
-                "Do you have persistent bad breath?",
-                "Do people comment on an unpleasant odor from your mouth?",
-                "Does the bad breath continue even after brushing?",
-                "Do you have a constant bad taste in your mouth?"
-            ]
-        },
-        "treatment": (
-            "\n* Improved oral hygiene: Regular brushing and flossing.\n"
-            "* Professional dental cleaning: Remove plaque and tartar buildup.\n"
-            "* Antiseptic mouthwash: Reduces bacteria and inflammation.\n"
-            "* Antibiotics: In severe cases to control bacterial infection."
-        )
-    },
-    # Add more diseases as needed
-}
+# Load diseases, symptoms, detailed questions, and treatments from the shared catalog
+diseases = load_catalog()
 
 # Start the expert system
 if __name__ == "__main__":
@@ -1,87 +1,122 @@
 import streamlit as st
 from experta import KnowledgeEngine, Fact, Rule, DefFacts, MATCH
+from dialogue_fsm import ACTION_SELECTION, CONFIRM_DISEASE, START, DialogueMachine
+from differential import rank_differential
+from knowledge_file import load_catalog
+from symptom_matrix import SymptomMatrix
+
+
+# Diseases listed in a diagnosis, best match first
+DIFFERENTIAL_SIZE = 5
+
+# Seconds between checks whether the catalog source changed
+CATALOG_CHECK_INTERVAL = 5.0
+
+# Symptoms asked during a diagnosis, in order
+SYMPTOM_QUERY = ("tooth pain", "sensitivity to sweets", "visible holes", "swollen gums", "bleeding gums", "bad breath")
 
 
 class DentalExpertSystem(KnowledgeEngine):
     def __init__(self, diseases):
         super().__init__()
         self.diseases = diseases
-        self.symptom_query = None
-        self.confirmed_symptoms = []
-        self.diagnosis_step = None
-        self.current_disease = None
+        self.symptom_matrix = SymptomMatrix(diseases)
+        # The conversation flow, compiled once; a user's session is a state number
+        self.dialogue = DialogueMachine(self.symptom_matrix, SYMPTOM_QUERY, actions=("diagnosis", "quick", "confirm"),
+                                        version=diseases.version)
+        self._diagnoses = {}  # finished dialogue state -> diagnosis text
 
     @DefFacts()
     def _initial_action(self):
         yield Fact(action="start")
 
-    def ask_symptom(self):
-        if self.symptom_query:
-            symptom = self.symptom_query.pop(0)
-            return symptom
-        return None
-
-    def finalize_diagnosis(self):
-        user_symptoms = set(self.confirmed_symptoms)
-        perfectly_matching = []
-        partially_matching = []
-
-        for disease, details in self.diseases.items():
-            disease_symptoms = set(details["symptoms"])
-            matched_symptoms = user_symptoms.intersection(disease_symptoms)
-            if len(matched_symptoms) == len(disease_symptoms):
-                perfectly_matching.append({
-                    "name": disease,
-                    "symptoms": matched_symptoms,
-                    "treatment": details["treatment"]
-                })
-            elif matched_symptoms:
-                partially_matching.append({
-                    "name": disease,
-                    "symptoms": matched_symptoms,
-                    "treatment": details["treatment"]
-                })
-
-        if perfectly_matching:
-            return f"You have these diseases:\n" + "\n".join(
-                f"- {d['name']} (Treatment: {d['treatment']})" for d in perfectly_matching)
-        elif partially_matching:
-            return f"You may have these diseases:\n" + "\n".join(
-                f"- {d['name']} (Symptoms Matched: {', '.join(d['symptoms'])})\n  Treatment: {d['treatment']}"
-                for d in partially_matching)
-        else:
+    def respond(self, previous_state, state, prompt):
+        """
+        Assistant message for a dialogue transition
+
+        Args:
+            previous_state (int): State the user answered in
+            state (int): State the dialogue moved to
+            prompt (str): The user's input
+
+        Returns:
+            str: Message to show
+        """
+        if previous_state == CONFIRM_DISEASE:
+            return self.describe_disease(prompt.strip())
+        if state == ACTION_SELECTION:
+            if previous_state == ACTION_SELECTION:
+                return "Invalid input. Please choose 'diagnosis', 'quick' or 'confirm'."
+            return "Do you want to 'diagnosis', 'quick' (fewer questions) or 'confirm'?"
+        if state == CONFIRM_DISEASE:
+            return "Please enter the disease name you want to confirm:"
+        if self.dialogue.is_finished(state):
+            if state not in self._diagnoses:
+                self._diagnoses[state] = self.finalize_diagnosis(self.dialogue.confirmed[state])
+            return self._diagnoses[state]
+        return f"Do you have {self.dialogue.question(state)}? (yes or no)"
+
+    def describe_disease(self, disease):
+        if disease in self.diseases:
+            symptoms = self.diseases[disease]["symptoms"]
+            treatment = self.diseases[disease]["treatment"]
+            return f"'{disease}' has these symptoms: {', '.join(symptoms)}\nTreatment: {treatment}"
+        return f"Disease '{disease}' not found in our database."
+
+    def finalize_diagnosis(self, confirmed_symptoms):
+        user_symptoms = set(confirmed_symptoms)
+
+        # Only diseases on the posting lists of the confirmed symptoms are scored
+        candidates, matched_counts = self.symptom_matrix.match(user_symptoms)
+        perfect = self.symptom_matrix.is_perfect(candidates, matched_counts)
+        if perfect.any():
+            candidates, matched_counts = candidates[perfect], matched_counts[perfect]
+        if not len(candidates):
             return "No diseases match your symptoms. Please consult a dentist for further advice."
 
+        # Only the best-ranked diseases are materialized as result dicts
+        matches = []
+        for entry in rank_differential(self.symptom_matrix, candidates, matched_counts, DIFFERENTIAL_SIZE):
+            details = self.diseases.summary(entry.disease_id)
+            matches.append({
+                "name": entry.name,
+                "symptoms": [symptom for symptom in details["symptoms"] if symptom in user_symptoms],
+                "treatment": details["treatment"]
+            })
+        more = f"\n...and {len(candidates) - len(matches)} more" if len(candidates) > len(matches) else ""
+
+        if perfect.any():
+            return f"You have these diseases:\n" + "\n".join(
+                f"- {d['name']} (Treatment: {d['treatment']})" for d in matches) + more
+        return f"You may have these diseases:\n" + "\n".join(
+            f"- {d['name']} (Symptoms Matched: {', '.join(d['symptoms'])})\n  Treatment: {d['treatment']}"
+            for d in matches) + more
+
+
+@st.cache_resource(ttl=CATALOG_CHECK_INTERVAL)
+def get_catalog():
+    # Diseases, symptoms, detailed questions, and treatments from the shared catalog;
+    # reopened every CATALOG_CHECK_INTERVAL seconds, which recompiles it if the source changed
+    return load_catalog()
+
 
-# Define diseases, symptoms, and treatments
-diseases = {
-    "Cavities": {
-        "symptoms": ["tooth pain", "sensitivity to sweets", "visible holes"],
-        "treatment": "Dental fillings, crowns, fluoride treatments."
-    },
-    "Tooth Sensitivity": {
-        "symptoms": ["tooth pain", "sensitivity to sweets"],
-        "treatment": "Desensitizing toothpaste, fluoride treatments, dental bonding."
-    },
-    "Tooth Abscess": {
-        "symptoms": ["tooth pain", "swollen gums", "bad breath"],
-        "treatment": "Root canal, antibiotics, incision, and drainage."
-    },
-    "Gingivitis": {
-        "symptoms": ["bleeding gums", "swollen gums", "bad breath"],
-        "treatment": "Improved oral hygiene, professional cleaning, antiseptic mouthwash."
-    },
-}
+@st.cache_resource(max_entries=1)
+def get_engine(_diseases, version):
+    # One rule network and compiled catalog for the whole server process, rebuilt for a new catalog version
+    engine = DentalExpertSystem(_diseases)
+    engine.reset()
+    return engine
 
 
 # Streamlit Interface
 st.title("🦷 Dental Expert System Chatbot")
-if "engine" not in st.session_state:
-    st.session_state.engine = DentalExpertSystem(diseases)
-    st.session_state.engine.reset()
-    st.session_state.step = "start"
+diseases = get_catalog()
+engine = get_engine(diseases, diseases.version)
 
-engine = st.session_state.engine
+# Dialogue states belong to one catalog version; a session started on another one starts over
+if st.session_state.get("catalog_version") != diseases.version:
+    st.session_state.catalog_version = diseases.version
+    st.session_state.state = START
 
 if "conversation" not in st.session_state:
     st.session_state.conversation = []
@@ -95,73 +130,13 @@ if prompt := st.chat_input("Type your response here..."):
     # Add user's response to the conversation
     st.session_state.conversation.append({"role": "user", "content": prompt})
 
-    # Expert system logic
-    if st.session_state.step == "start":
-        st.session_state.conversation.append({
-            "role": "assistant",
-            "content": "Do you want to 'diagnosis' or 'confirm'?"
-        })
-        st.session_state.step = "action_selection"
-
-    elif st.session_state.step == "action_selection":
-        if prompt.lower() == "diagnosis":
-            engine.diagnosis_step = "symptom_check"
-            engine.symptom_query = [
-                "tooth pain", "sensitivity to sweets", "visible holes", "swollen gums", "bleeding gums", "bad breath"
-            ]
-            symptom = engine.ask_symptom()
-            st.session_state.conversation.append({
-                "role": "assistant",
-                "content": f"Do you have {symptom}? (yes or no)"
-            })
-            st.session_state.step = "diagnosis"
-
-        elif prompt.lower() == "confirm":
-            st.session_state.conversation.append({
-                "role": "assistant",
-                "content": "Please enter the disease name you want to confirm:"
-            })
-            st.session_state.step = "confirm_disease"
-
-        else:
-            st.session_state.conversation.append({
-                "role": "assistant",
-                "content": "Invalid input. Please choose 'diagnosis' or 'confirm'."
-            })
-
-    elif st.session_state.step == "diagnosis":
-        if prompt.lower() == "yes":
-            engine.confirmed_symptoms.append(engine.symptom_query[0])
-
-        symptom = engine.ask_symptom()
-        if symptom:
-            st.session_state.conversation.append({
-                "role": "assistant",
-                "content": f"Do you have {symptom}? (yes or no)"
-            })
-        else:
-            diagnosis_result = engine.finalize_diagnosis()
-            st.session_state.conversation.append({
-                "role": "assistant",
-                "content": diagnosis_result
-            })
-            st.session_state.step = "start"
-
-    elif st.session_state.step == "confirm_disease":
-        disease = prompt.strip()
-        if disease in diseases:
-            symptoms = diseases[disease]["symptoms"]
-            treatment = diseases[disease]["treatment"]
-            st.session_state.conversation.append({
-                "role": "assistant",
-                "content": f"'{disease}' has these symptoms: {', '.join(symptoms)}\nTreatment: {treatment}"
-            })
-        else:
-            st.session_state.conversation.append({
-                "role": "assistant",
-                "content": f"Disease '{disease}' not found in our database."
-            })
-        st.session_state.step = "start"
+    # Expert system logic: one table lookup moves the dialogue on
+    previous_state = st.session_state.state
+    st.session_state.state = engine.dialogue.step(previous_state, prompt)
+    st.session_state.conversation.append({
+        "role": "assistant",
+        "content": engine.respond(previous_state, st.session_state.state, prompt)
+    })
 
     # Update conversation history
     for msg in st.session_state.conversation:
@@ -1,178 +1,105 @@
 import streamlit as st
 from experta import KnowledgeEngine, Fact, Rule, DefFacts, MATCH
+from dialogue_fsm import START, DialogueMachine
+from differential import rank_differential
+from knowledge_file import load_catalog
+from symptom_matrix import SymptomMatrix
+
+
+# Diseases listed in a diagnosis, best match first
+DIFFERENTIAL_SIZE = 5
+
+# Seconds between checks whether the catalog source changed
+CATALOG_CHECK_INTERVAL = 5.0
+
+# Symptoms asked during a diagnosis, in order
+SYMPTOM_QUERY = ("tooth pain", "sensitivity to sweets", "visible holes", "swollen gums", "bleeding gums", "bad breath")
 
 
 class DentalExpertSystem(KnowledgeEngine):
     def __init__(self, diseases):
         super().__init__()
         self.diseases = diseases
-        self.symptom_query = None
-        self.confirmed_symptoms = []
-        self.diagnosis_step = None
-        self.current_disease = None
+        self.symptom_matrix = SymptomMatrix(diseases)
+        # The conversation flow, compiled once; a user's session is a state number
+        self.dialogue = DialogueMachine(self.symptom_matrix, SYMPTOM_QUERY, version=diseases.version)
+        self._diagnoses = {}  # finished dialogue state -> diagnosis text
 
     @DefFacts()
     def _initial_action(self):
         yield Fact(action="start")
 
-    def ask_symptom(self):
-        if self.symptom_query:
-            symptom = self.symptom_query.pop(0)
-            return symptom
-        return None
-
-    def finalize_diagnosis(self):
-        user_symptoms = set(self.confirmed_symptoms)
-        perfectly_matching = []
-        partially_matching = []
-
-        for disease, details in self.diseases.items():
-            disease_symptoms = set(details["symptoms"])
-            matched_symptoms = user_symptoms.intersection(disease_symptoms)
-            if len(matched_symptoms) == len(disease_symptoms):
-                perfectly_matching.append({
-                    "name": disease,
-                    "symptoms": matched_symptoms,
-                    "treatment": details["treatment"]
-                })
-            elif matched_symptoms:
-                partially_matching.append({
-                    "name": disease,
-                    "symptoms": matched_symptoms,
-                    "treatment": details["treatment"]
-                })
-
-        if perfectly_matching:
+    def respond(self, state):
+        """
+        Assistant message on entering a dialogue state
+
+        Returns:
+            str: Message to show
+        """
+        if self.dialogue.is_finished(state):
+            if state not in self._diagnoses:
+                self._diagnoses[state] = self.finalize_diagnosis(self.dialogue.confirmed[state])
+            return self._diagnoses[state]
+        question = f"Do you have {self.dialogue.question(state)}? (yes/no)"
+        if state == self.dialogue.restart:
+            return f"Please answer the following questions about your symptoms (yes/no).\n{question}"
+        return question
+
+    def finalize_diagnosis(self, confirmed_symptoms):
+        user_symptoms = set(confirmed_symptoms)
+
+        # Only diseases on the posting lists of the confirmed symptoms are scored
+        candidates, matched_counts = self.symptom_matrix.match(user_symptoms)
+        perfect = self.symptom_matrix.is_perfect(candidates, matched_counts)
+        if perfect.any():
+            candidates, matched_counts = candidates[perfect], matched_counts[perfect]
+        if not len(candidates):
+            return "No diseases match your symptoms. Please consult a dentist for further advice."
+
+        # Only the best-ranked diseases are materialized as result dicts
+        matches = []
+        for entry in rank_differential(self.symptom_matrix, candidates, matched_counts, DIFFERENTIAL_SIZE):
+            details = self.diseases.summary(entry.disease_id)
+            matches.append({
+                "name": entry.name,
+                "symptoms": [symptom for symptom in details["symptoms"] if symptom in user_symptoms],
+                "treatment": details["treatment"]
+            })
+        more = f"\n...and {len(candidates) - len(matches)} more" if len(candidates) > len(matches) else ""
+
+        if perfect.any():
             return f"You have these diseases:\n" + "\n".join(
                 f"- {d['name']} (Symptoms Matched: {len(d['symptoms'])})\nSymptoms: {', '.join(d['symptoms'])}\nTreatment: {d['treatment']}"
-                for d in perfectly_matching)
-        elif partially_matching:
-            return f"You may have these diseases:\n" + "\n".join(
-                f"- {d['name']} (Symptoms Matched: {len(d['symptoms'])})\nSymptoms: {', '.join(d['symptoms'])}\nTreatment: {d['treatment']}"
-                for d in partially_matching)
-        else:
-            return "No diseases match your symptoms. Please consult a dentist for further advice."
+                for d in matches) + more
+        return f"You may have these diseases:\n" + "\n".join(
+            f"- {d['name']} (Symptoms Matched: {len(d['symptoms'])})\nSymptoms: {', '.join(d['symptoms'])}\nTreatment: {d['treatment']}"
+            for d in matches) + more
+
+
+@st.cache_resource(ttl=CATALOG_CHECK_INTERVAL)
+def get_catalog():
+    # Diseases, symptoms, detailed questions, and treatments from the shared catalog;
+    # reopened every CATALOG_CHECK_INTERVAL seconds, which recompiles it if the source changed
+    return load_catalog()
+
 
+@st.cache_resource(max_entries=1)
+def get_engine(_diseases, version):
+    # One rule network and compiled catalog for the whole server process, rebuilt for a new catalog version
+    engine = DentalExpertSystem(_diseases)
+    engine.reset()
+    return engine
 
-# Define diseases, symptoms, detailed questions, and treatments
-diseases = {
-    "Cavities": {
-        "symptoms": ["tooth pain", "sensitivity to sweets", "visible holes"],
-        "detailed_questions": {
-            "tooth pain": [
-                "Do you experience sharp, sudden pain when biting down?",
-                "Does the pain worsen when eating hot or cold foods?",
-                "Do you feel persistent aching in a specific tooth?",
-                "Does the pain keep you awake at night?"
-            ],
-            "sensitivity to sweets": [
-                "Do you experience pain when eating sugary foods?",
-                "Do your teeth hurt when consuming cold or sweet drinks?",
-                "Do you feel a sharp sensation when something sweet touches your teeth?"
-            ],
-            "visible holes": [
-                "Have you noticed any dark spots or holes in your teeth?",
-                "Can you see any discoloration or chipped areas in your teeth?",
-                "When you run your tongue over your teeth, do you feel any rough or uneven surfaces?"
-            ]
-        },
-        "treatment": (
-            "\n* Dental fillings: Removing the decayed part and filling it with composite resin, amalgam, or other materials.\n"
-            "* Crowns: If the cavity is extensive, a crown may be used to protect the remaining tooth.\n"
-            "* Fluoride treatments: Strengthen enamel and reverse early stages of decay.\n"
-            "* Preventive care: Brushing twice daily with fluoride toothpaste, reducing sugary foods and drinks."
-        )
-    },
-    "Tooth Sensitivity": {
-        "symptoms": ["tooth pain", "sensitivity to sweets"],
-        "detailed_questions": {
-            "tooth pain": [
-                "Do you experience sharp, quick pain when exposed to cold or hot temperatures?",
-                "Does brushing or flossing cause discomfort?",
-                "Do you experience pain when breathing in cold air?",
-                "Is the pain localized to a specific tooth or area?"
-            ],
-            "sensitivity to sweets": [
-                "Do sweet foods cause a sudden, sharp pain?",
-                "Do you avoid certain foods due to sensitivity?",
-                "Does the pain subside quickly after the stimulus is removed?"
-            ]
-        },
-        "treatment": (
-            "\n* Desensitizing toothpaste: Reduces nerve sensitivity over time.\n"
-            "* Fluoride treatments: Applied by a dentist to strengthen enamel and reduce pain.\n"
-            "* Dental bonding: Covers exposed roots or damaged areas with a protective resin.\n"
-            "* Nightguards: For teeth grinding (bruxism) which can exacerbate sensitivity."
-        )
-    },
-    "Tooth Abscess": {
-        "symptoms": ["tooth pain", "swollen gums", "bad breath"],
-        "detailed_questions": {
-            "tooth pain": [
-                "Do you experience severe, throbbing pain?",
-                "Does the pain worsen when you lie down?",
-                "Do you feel pain when touching the affected area?",
-                "Is the pain constant or intermittent?"
-            ],
-            "swollen gums": [
-                "Are your gums red and swollen?",
-                "Do you notice any pus around the affected tooth?",
-                "Is there a painful bump or abscess on your gums?",
-                "Do your gums feel tender to touch?"
-            ],
-            "bad breath": [
-                "Do people comment on your bad breath?",
-                "Do you have a persistent bad taste in your mouth?",
-                "Does the bad breath persist even after brushing?",
-                "Do you notice an unpleasant odor when you exhale?"
-            ]
-        },
-        "treatment": (
-            "\n* Root canal therapy: Removes the infection and seals the tooth to prevent reinfection.\n"
-            "* Incision and drainage: Draining the abscess if necessary.\n"
-            "* Antibiotics: To control the infection if it has spread.\n"
-            "* Tooth extraction: In severe cases where the tooth cannot be saved."
-        )
-    },
-    "Gingivitis": {
-        "symptoms": ["bleeding gums", "swollen gums", "bad breath"],
-        "detailed_questions": {
-            "bleeding gums": [
-                "Do your gums bleed when brushing or flossing?",
-                "Do you see blood on your toothbrush or dental floss?",
-                "Do your gums bleed easily when touched?",
-                "Do you notice bleeding when eating hard foods?"
-            ],
-            "swollen gums": [
-                "Are your gums puffy or enlarged?",
-                "Do your gums appear red instead of pink?",
-                "Do your gums feel tender or painful?",
-                "Do you notice any changes in gum texture?"
-            ],
-            "bad breath": [
-                "Do you have persistent bad breath?",
-                "Do people comment on an unpleasant odor from your mouth?",
-                "Does the bad breath continue even after brushing?",
-                "Do you have a constant bad taste in your mouth?"
-            ]
-        },
-        "treatment": (
-            "\n* Improved oral hygiene: Regular brushing and flossing.\n"
-            "* Professional dental cleaning: Remove plaque and tartar buildup.\n"
-            "* Antiseptic mouthwash: Reduces bacteria and inflammation.\n"
-            "* Antibiotics: In severe cases to control bacterial infection."
-        )
-    },
-}
 
 # Streamlit Interface
 st.title("🦷 Dental Expert System Chatbot")
-if "engine" not in st.session_state:
-    st.session_state.engine = DentalExpertSystem(diseases)
-    st.session_state.engine.reset()
-    st.session_state.step = "start"
+diseases = get_catalog()
+engine = get_engine(diseases, diseases.version)
 
-engine = st.session_state.engine
+# Dialogue states belong to one catalog version; a session started on another one starts over
+if st.session_state.get("catalog_version") != diseases.version:
+    st.session_state.catalog_version = diseases.version
+    st.session_state.state = START
 
 if "conversation" not in st.session_state:
     st.session_state.conversation = []
@@ -186,39 +113,9 @@ if prompt := st.chat_input("Type your response here..."):
     # Add user's response to the conversation
     st.session_state.conversation.append({"role": "user", "content": prompt})
 
-    # Expert system logic
-    if st.session_state.step == "start":
-        st.session_state.conversation.append({
-            "role": "assistant",
-            "content": "Please answer the following questions about your symptoms (yes/no)."
-        })
-        st.session_state.step = "symptom_check"
-
-    elif st.session_state.step == "symptom_check":
-        symptoms = [
-            "Do you have bleeding gums?",
-            "Do you have visible holes?",
-            "Do you have swollen gums?",
-            "Do you have sensitivity to sweets?",
-            "Do you have bad breath?",
-            "Do you have tooth pain?"
-        ]
-        if symptoms:
-            question = symptoms.pop(0)
-            st.session_state.conversation.append({
-                "role": "assistant",
-                "content": question
-            })
-            st.session_state.step = "diagnosis"
-
-    elif st.session_state.step == "diagnosis":
-        user_input = prompt.lower()
-        if user_input == 'y':
-            engine.confirmed_symptoms.append(symptoms[0])  # Add the confirmed symptom
-
-        # If no symptom matches, finalize diagnosis
-        st.session_state.conversation.append({
-            "role": "assistant",
-            "content": engine.finalize_diagnosis()})
-
-        st.session_state.step = "end"
+    # Expert system logic: one table lookup moves the dialogue on
+    st.session_state.state = engine.dialogue.step(st.session_state.state, prompt)
+    st.session_state.conversation.append({
+        "role": "assistant",
+        "content": engine.respond(st.session_state.state)
+    })
@@ -0,0 +1,35 @@
+# conftest.py
+import json
+import os
+import sys
+
+import pytest
+
+# The dental modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_suite import ASKED_SYMPTOMS, generate_catalog  # noqa: E402
+
+
+@pytest.fixture
+def catalog():
+    """Synthetic catalog small enough to precompute: 30 diseases over 12 symptoms"""
+    return generate_catalog(30, symptom_count=12, seed=1)
+
+
+@pytest.fixture
+def source_path(tmp_path, catalog):
+    path = tmp_path / "diseases.json"
+    path.write_text(json.dumps(catalog), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def engine(source_path):
+    from app import DentalExpertSystem
+    return DentalExpertSystem(source_path=source_path, check_interval=None)
+
+
+@pytest.fixture
+def symptom_order():
+    return ASKED_SYMPTOMS
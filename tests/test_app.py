@@ -0,0 +1,77 @@
+# test_app.py
+import json
+import random
+
+import pytest
+
+import app
+from app import DentalExpertSystem
+
+
+def random_answers(matrix, count, seed=0):
+    rng = random.Random(seed)
+    return [set(rng.sample(matrix.symptoms, rng.randint(0, len(matrix.symptoms)))) for _ in range(count)]
+
+
+def test_precomputed_table_matches_uncached_scoring(source_path):
+    engine = DentalExpertSystem(source_path=source_path, precompute=True, check_interval=None)
+    assert engine.diagnosis_cache.table is not None
+    matrix = engine.symptom_matrix
+    for symptoms in random_answers(matrix, 500):
+        cached_ids, cached_counts = engine.diagnosis_cache.get(app.symptom_mask(matrix.vocabulary, symptoms),
+                                                               engine.diseases.version)
+        disease_ids, counts = matrix.match(symptoms)
+        assert dict(zip(cached_ids.tolist(), cached_counts.tolist())) == dict(zip(disease_ids.tolist(),
+                                                                                  counts.tolist()))
+
+
+@pytest.mark.parametrize("options", [{"precompute": True}, {"cache_size": 1}])
+def test_batch_results_do_not_depend_on_caching(source_path, options):
+    uncached = DentalExpertSystem(source_path=source_path, cache_size=0, check_interval=None)
+    engine = DentalExpertSystem(source_path=source_path, check_interval=None, **options)
+    answers = random_answers(uncached.symptom_matrix, 300) * 2
+    assert list(engine.diagnose_batch(answers, batch_size=64)) == list(uncached.diagnose_batch(answers))
+
+
+def test_precompute_respects_the_memory_budget(engine, monkeypatch):
+    monkeypatch.setattr(app, "PRECOMPUTE_MAX_BYTES", 1024)
+    assert not engine.precompute_diagnoses()
+    assert engine.diagnosis_cache.table is None
+    monkeypatch.setattr(app, "PRECOMPUTE_MAX_SYMPTOMS", 4)
+    monkeypatch.setattr(app, "PRECOMPUTE_MAX_BYTES", 64 << 20)
+    assert not engine.precompute_diagnoses()
+
+
+def test_check_catalog_picks_up_an_edited_source(source_path, catalog):
+    engine = DentalExpertSystem(source_path=source_path, precompute=True, check_interval=0)
+    version = engine.diseases.version
+    assert not engine.check_catalog()
+
+    catalog["New Disease"] = {"symptoms": ["symptom 7"], "treatment": "Rest"}
+    with open(source_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f)
+    assert engine.check_catalog()
+    assert engine.diseases.version != version
+    assert engine.disease_names[-1] == "New Disease"
+    (result,) = engine.diagnose_batch([{"symptom 7"}])
+    assert {"name": "New Disease", "matched_count": 1, "symptoms": ["symptom 7"], "treatment": "Rest"} in \
+        result["perfect"]
+    assert engine.diagnosis_cache.stats().version == engine.diseases.version
+
+
+def test_check_catalog_keeps_the_catalog_on_a_broken_source(engine, source_path):
+    engine.check_interval = 0
+    names = engine.disease_names
+    with open(source_path, "w", encoding="utf-8") as f:
+        f.write('{"Half written": ')
+    assert not engine.check_catalog()
+    assert engine.disease_names == names
+
+
+def test_check_catalog_is_rate_limited(source_path, catalog):
+    engine = DentalExpertSystem(source_path=source_path, check_interval=3600)
+    catalog["New Disease"] = {"symptoms": ["symptom 7"], "treatment": "Rest"}
+    with open(source_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f)
+    assert not engine.check_catalog()
+    assert engine.reload_catalog()
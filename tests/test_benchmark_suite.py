@@ -0,0 +1,88 @@
+# test_benchmark_suite.py
+import json
+import subprocess
+import sys
+
+import pytest
+
+import benchmark_suite
+from benchmark_suite import CASES, compare, measure, run_case
+
+FIGURES = {"operations", "seconds", "throughput", "p50_ms", "p99_ms", "peak_rss_mb", "calibration_ms"}
+
+
+def run_suite(*args):
+    return subprocess.run([sys.executable, benchmark_suite.__file__, *args], cwd=benchmark_suite.ROOT,
+                          capture_output=True, text=True)
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_every_case_runs(name):
+    figures = run_case(name, 100, operations=20)
+    assert set(figures) == FIGURES
+    assert figures["operations"] == 20
+    assert figures["throughput"] > 0
+    assert figures["p50_ms"] <= figures["p99_ms"]
+
+
+def test_measure_runs_the_case_in_a_worker():
+    figures = measure("dental_diagnose", 100, operations=20)
+    assert set(figures) == FIGURES
+
+
+def test_measure_reports_a_failed_worker():
+    with pytest.raises(RuntimeError, match="StatisticsError"):
+        measure("dental_diagnose", 100, operations=0)
+
+
+def test_compare_scales_timings_by_calibration():
+    baseline = {"case[1]": {"throughput": 100.0, "p50_ms": 1.0, "peak_rss_mb": 50.0, "calibration_ms": 10.0}}
+    # Twice as slow on a machine that is twice as slow is no regression
+    results = {"case[1]": {"throughput": 50.0, "p50_ms": 2.0, "peak_rss_mb": 50.0, "calibration_ms": 20.0}}
+    assert compare(results, baseline, 0.25) == []
+    # Peak RSS is not scaled
+    results["case[1]"]["peak_rss_mb"] = 100.0
+    assert compare(results, baseline, 0.25) == [("case[1]", "peak_rss_mb", 50.0, 100.0)]
+
+
+def test_compare_flags_each_regressed_metric():
+    baseline = {"case[1]": {"throughput": 100.0, "p50_ms": 1.0, "peak_rss_mb": 50.0, "calibration_ms": 10.0}}
+    results = {"case[1]": {"throughput": 70.0, "p50_ms": 1.3, "peak_rss_mb": 60.0, "calibration_ms": 10.0}}
+    assert compare(results, baseline, 0.25) == [("case[1]", "throughput", 100.0, 70.0),
+                                                ("case[1]", "p50_ms", 1.0, 1.3)]
+    assert compare(results, baseline, 0.5) == []
+
+
+def test_compare_skips_cases_and_metrics_missing_from_the_baseline():
+    baseline = {"case[1]": {"throughput": 100.0}}
+    results = {"case[1]": {"throughput": 100.0, "p50_ms": 9.0, "peak_rss_mb": 900.0},
+               "case[2]": {"throughput": 1.0, "p50_ms": 9.0, "peak_rss_mb": 900.0}}
+    assert compare(results, baseline, 0.25) == []
+
+
+def test_suite_passes(tmp_path):
+    results = tmp_path / "results.json"
+    completed = run_suite("dental_diagnose", "--sizes", "100", "--operations", "20", "--save", str(results))
+    assert completed.returncode == 0, completed.stdout + completed.stderr
+    assert list(json.loads(results.read_text())) == ["dental_diagnose[100]"]
+
+
+def test_failed_case_fails_the_run():
+    completed = run_suite("dental_diagnose", "--sizes", "100", "--operations", "0")
+    assert completed.returncode == 1
+    assert "dental_diagnose[100]" in completed.stdout and "failed" in completed.stdout
+
+
+def test_failed_case_missing_from_the_baseline_fails_the_run(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text("{}")
+    completed = run_suite("dental_diagnose", "--sizes", "100", "--operations", "0", "--baseline", str(baseline))
+    assert completed.returncode == 1
+
+
+def test_regression_fails_the_run(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"dental_diagnose[100]": {"throughput": 1e12, "calibration_ms": 1}}))
+    completed = run_suite("dental_diagnose", "--sizes", "100", "--operations", "20", "--baseline", str(baseline))
+    assert completed.returncode == 1
+    assert "REGRESSION dental_diagnose[100] throughput" in completed.stdout
@@ -0,0 +1,83 @@
+# test_confirmation.py
+import random
+
+import pytest
+
+from confirmation import Ask, confirm_symptoms, verdict_band
+
+
+def converse(symptoms, detailed_questions, answers):
+    # Replies from a fixed answer per symptom and question; returns the outcome and the questions asked
+    dialogue = confirm_symptoms(symptoms, detailed_questions)
+    asked, reply = [], None
+    while True:
+        try:
+            step = dialogue.send(reply)
+        except StopIteration as stop:
+            return stop.value, asked
+        reply = None
+        if isinstance(step, Ask):
+            question = step.prompt.removesuffix(" (y/n): ")
+            if question.startswith("Do you have the symptom: "):
+                question = question.removeprefix("Do you have the symptom: ").removesuffix("?")
+            asked.append(question)
+            reply = "y" if answers[question] else "n"
+
+
+def band_asking_everything(symptoms, detailed_questions, answers):
+    confirmed = [symptom for symptom in symptoms if answers[symptom]]
+    for symptom in symptoms:
+        questions = detailed_questions.get(symptom, ())
+        if not answers[symptom] and questions and sum(answers[q] for q in questions) > len(questions) // 2:
+            confirmed.append(symptom)
+    return verdict_band(len(confirmed), len(symptoms))
+
+
+def test_verdict_band():
+    assert [verdict_band(count, 4) for count in range(5)] == [0, 1, 2, 2, 3]
+    assert verdict_band(1, 3) == 1 and verdict_band(2, 3) == 2
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_early_stop_keeps_the_verdict(seed):
+    rng = random.Random(seed)
+    symptoms = [f"symptom {index}" for index in range(rng.randint(1, 5))]
+    detailed_questions = {symptom: [f"Question {index} about {symptom}?" for index in range(rng.randint(1, 4))]
+                          for symptom in symptoms if rng.random() < 0.7}
+    answers = {question: rng.random() < 0.5
+               for question in symptoms + [q for questions in detailed_questions.values() for q in questions]}
+
+    (confirmed, denied), asked = converse(symptoms, detailed_questions, answers)
+    assert verdict_band(len(confirmed), len(symptoms)) == band_asking_everything(symptoms, detailed_questions,
+                                                                                 answers)
+    assert len(asked) == len(set(asked))
+    assert set(confirmed) <= set(symptoms)
+    assert not any(answers[symptom] for symptom in denied)
+
+
+@pytest.mark.parametrize("replies, asked", [
+    ((True, True, True, False), 3),  # the majority of 3 out of 4 is reached
+    ((False, False, True, True), 2),  # 3 out of 4 is out of reach
+    ((True, False, True, False), 4),  # 2 out of 4 is not a majority, but only known at the end
+])
+def test_detailed_questions_stop_at_the_majority(replies, asked):
+    symptoms = ["pain", "swelling"]
+    questions = [f"Question {index}?" for index in range(4)]
+    answers = {"pain": True, "swelling": False, **dict(zip(questions, replies))}
+    (confirmed, _), asked_questions = converse(symptoms, {"swelling": questions}, answers)
+    assert asked_questions[2:] == questions[:asked]
+    assert confirmed == (["pain", "swelling"] if sum(replies) > 2 else ["pain"])
+
+
+def test_stops_once_the_verdict_is_settled():
+    # Two confirmed of four stay "high probability" whatever the last symptom is
+    (confirmed, denied), asked = converse(["a", "b", "c", "d"], {}, {"a": True, "b": True, "c": False, "d": True})
+    assert asked == ["a", "b", "c"]
+    assert (confirmed, denied) == (["a", "b"], ["c"])
+    # One confirmed of five stays "low probability"
+    answers = {"a": True, "b": False, "c": False, "d": False, "e": True}
+    assert converse(["a", "b", "c", "d", "e"], {}, answers)[1] == ["a", "b", "c", "d"]
+    # Unless a denied symptom can still be confirmed by its detailed questions
+    (confirmed, _), asked = converse(["a", "b", "c", "d", "e"], {"b": ["Really?"]}, dict(answers, **{"Really?": True}))
+    assert asked == ["a", "b", "c", "d", "e", "Really?"]
+    assert confirmed == ["a", "e", "b"]
@@ -0,0 +1,59 @@
+# test_diagnosis_cache.py
+import numpy as np
+import pytest
+
+from diagnosis_cache import CacheStats, DiagnosisCache, MatchTable, symptom_mask
+
+VOCABULARY = {"pain": 0, "swelling": 1, "bleeding": 2}
+
+
+def test_symptom_mask_is_canonical():
+    assert symptom_mask(VOCABULARY, ["bleeding", "pain"]) == 0b101
+    assert symptom_mask(VOCABULARY, ["pain", "bleeding", "pain", "unknown"]) == 0b101
+    assert symptom_mask(VOCABULARY, []) == 0
+
+
+def test_match_table_offsets():
+    # 4 masks x 3 diseases, scored in two chunks of two masks
+    counts = np.array([[0, 0, 0], [1, 0, 2], [0, 0, 0], [0, 3, 1]], dtype=np.int32)
+    table = MatchTable.build([(0, counts[:2]), (2, counts[2:])], 4, int(np.count_nonzero(counts)))
+    assert table.offsets.tolist() == [0, 0, 2, 2, 4]
+    assert len(table) == 4
+    for mask in range(4):
+        disease_ids, matched = table[mask]
+        expected = np.flatnonzero(counts[mask])
+        assert disease_ids.tolist() == expected.tolist()
+        assert matched.tolist() == counts[mask, expected].tolist()
+    assert MatchTable.size(4, 4) == 4 * MatchTable.ENTRY_BYTES + 5 * 8
+
+
+def test_lru_eviction_and_stats():
+    cache = DiagnosisCache(max_entries=2)
+    assert cache.get(1, "v1") is None
+    cache.put(1, "one", "v1")
+    cache.put(2, "two", "v1")
+    assert cache.get(1, "v1") == "one"  # 2 is now the least recently used
+    cache.put(3, "three", "v1")
+    assert cache.get(2, "v1") is None
+    assert cache.get(3, "v1") == "three"
+    assert cache.stats() == CacheStats(hits=2, misses=2, evictions=1, entries=2, version="v1")
+
+
+def test_version_change_empties_the_cache():
+    cache = DiagnosisCache()
+    cache.put(1, "one", "v1")
+    cache.precompute(["a", "b"], "v1")
+    assert cache.get(1, "v1") == "b"
+    assert cache.get(1, "v2") is None
+    assert cache.stats().entries == 0 and cache.stats().version == "v2"
+    cache.put(1, "one", "v2")
+    assert cache.get(1, "v2") == "one"
+
+
+@pytest.mark.parametrize("version", ["v1", "v2"])
+def test_precomputed_table_is_never_evicted(version):
+    cache = DiagnosisCache(max_entries=1)
+    cache.precompute(["a", "b", "c", "d"], "v1")
+    cache.put(0, "other", "v1")
+    assert cache.get(0, version) == ("a" if version == "v1" else None)
+    assert cache.stats().evictions == 0
@@ -0,0 +1,136 @@
+# test_dialogue_fsm.py
+import random
+import sys
+import threading
+
+import pytest
+
+from dialogue_fsm import ACTION_SELECTION, CONFIRM_DISEASE, START, DialogueMachine
+from question_planner import next_symptom
+
+ACTIONS = ("diagnosis", "quick", "confirm")
+
+
+@pytest.fixture
+def machine(engine, symptom_order):
+    return DialogueMachine(engine.symptom_matrix, symptom_order, actions=ACTIONS, version=engine.diseases.version)
+
+
+def converse(machine, action, answers):
+    state = machine.step(machine.step(START, "hello"), action)
+    for answer in answers:
+        if machine.is_finished(state):
+            break
+        state = machine.step(state, answer)
+    return state
+
+
+def test_concurrent_sessions_share_one_machine(engine, symptom_order):
+    # Sessions on several threads grow the same lazy trees at once
+    reference = DialogueMachine(engine.symptom_matrix, symptom_order, actions=ACTIONS)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(5):
+            machine = DialogueMachine(engine.symptom_matrix, symptom_order, actions=ACTIONS)
+            start = threading.Barrier(16)
+            sessions, errors = [], []
+
+            def run(seed):
+                rng = random.Random(seed)
+                start.wait()
+                try:
+                    for _ in range(30):
+                        action = rng.choice(("diagnosis", "quick"))
+                        answers = [rng.choice(("yes", "no")) for _ in range(len(machine.symptom_matrix.symptoms))]
+                        sessions.append((action, answers, machine.confirmed[converse(machine, action, answers)]))
+                except Exception as error:
+                    errors.append(error)
+
+            threads = [threading.Thread(target=run, args=(seed,)) for seed in range(16)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            assert errors == []
+            states = len(machine.symptom)
+            assert len(machine.on_yes) == len(machine.on_no) == len(machine.tree) == len(machine.answers) == states
+            for action, answers, confirmed in sessions:
+                assert reference.confirmed[converse(reference, action, answers)] == confirmed
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def test_fixed_diagnosis_asks_in_order(machine, symptom_order):
+    state = machine.step(ACTION_SELECTION, "diagnosis")
+    asked = []
+    while not machine.is_finished(state):
+        asked.append(machine.question(state))
+        state = machine.step(state, "yes" if len(asked) % 2 else "no")
+    assert asked == list(symptom_order)
+    assert machine.confirmed[state] == symptom_order[::2]
+
+
+def test_quick_leaves_match_the_planner(machine):
+    rng = random.Random(0)
+    for _ in range(50):
+        state = machine.step(ACTION_SELECTION, "quick")
+        confirmed, denied = (), ()
+        while True:
+            symptom = next_symptom(machine.symptom_matrix, confirmed, denied)
+            assert machine.question(state) == symptom
+            if symptom is None:
+                break
+            yes = rng.random() < 0.5
+            confirmed, denied = (confirmed + (symptom,), denied) if yes else (confirmed, denied + (symptom,))
+            state = machine.step(state, "yes" if yes else "no")
+        assert machine.is_finished(state)
+        assert machine.confirmed[state] == confirmed
+
+
+@pytest.mark.parametrize("action", ["diagnosis", "quick"])
+def test_dump_load_round_trip(machine, engine, symptom_order, action):
+    rng = random.Random(1)
+    # A second process with the same catalog, whose states are numbered differently
+    other = DialogueMachine(engine.symptom_matrix, symptom_order, actions=ACTIONS, version=engine.diseases.version)
+    converse(other, "quick" if action == "diagnosis" else "diagnosis", ["no"] * 12)
+    for _ in range(20):
+        state = machine.step(ACTION_SELECTION, action)
+        while True:
+            resumed = other.load(machine.dump(state))
+            assert other.question(resumed) == machine.question(state)
+            assert other.dump(resumed) == machine.dump(state)
+            if machine.is_finished(state):
+                assert other.confirmed[resumed] == machine.confirmed[state]
+                break
+            state = machine.step(state, rng.choice(("yes", "no")))
+
+
+@pytest.mark.parametrize("state", [START, ACTION_SELECTION, CONFIRM_DISEASE])
+def test_dump_load_fixed_states(machine, state):
+    assert machine.load(machine.dump(state)) == state
+
+
+def test_load_rejects_other_catalog_versions(machine, engine, symptom_order):
+    data = machine.dump(machine.step(machine.step(ACTION_SELECTION, "diagnosis"), "yes"))
+    other = DialogueMachine(engine.symptom_matrix, symptom_order, actions=ACTIONS, version="ff" * 16)
+    with pytest.raises(ValueError):
+        other.load(data)
+    with pytest.raises(ValueError):
+        other.load(machine.dump(START))
+
+
+@pytest.mark.parametrize("data", [b"", b"\0" * 5, bytes(4) + b"\x07\x01", bytes(4) + b"\xff\x09"])
+def test_load_rejects_invalid_sessions(engine, symptom_order, data):
+    machine = DialogueMachine(engine.symptom_matrix, symptom_order, actions=ACTIONS)
+    with pytest.raises(ValueError):
+        machine.load(data)
+
+
+def test_load_rejects_paths_past_a_leaf(machine):
+    state = converse(machine, "diagnosis", ["yes"] * 12)
+    data = machine.dump(state)
+    path = int.from_bytes(data[5:], "little") << 1
+    with pytest.raises(ValueError):
+        machine.load(data[:5] + path.to_bytes((path.bit_length() + 7) // 8, "little"))
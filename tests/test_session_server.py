@@ -0,0 +1,114 @@
+# test_session_server.py
+import asyncio
+import gc
+import socket
+import struct
+
+import pytest
+
+from app import Ask, Say
+from session_server import Message, SessionServer
+
+
+class ScriptedEngine:
+    """Stands in for DentalExpertSystem: asks one question, then fails if told to"""
+
+    def __init__(self, fail=False, lines=1):
+        self.fail = fail
+        self.lines = lines
+
+    def menu_dialogue(self):
+        reply = yield Ask("Enter your choice: ")
+        for _ in range(self.lines):
+            yield Say(f"You chose {reply}")
+        if self.fail:
+            raise KeyError(reply)
+
+
+async def conversation(server, replies):
+    client = server.connect()
+    replies = iter(replies)
+    messages = []
+    while (message := await asyncio.wait_for(client.receive(), 5)).kind != "end":
+        messages.append(message)
+        if message.kind == "ask":
+            await client.send(next(replies))
+    return messages + [message]
+
+
+def test_session_ends_with_goodbye():
+    server = SessionServer(ScriptedEngine())
+    messages = asyncio.run(conversation(server, ["1"]))
+    assert messages == [Message("ask", "Enter your choice: "), Message("say", "You chose 1"),
+                        Message("end", "goodbye")]
+
+
+def test_failing_dialogue_ends_the_session():
+    server = SessionServer(ScriptedEngine(fail=True))
+    messages = asyncio.run(conversation(server, ["1"]))
+    assert messages[-1] == Message("end", "error")
+    assert server.failed == 1 and server.sessions == {}
+
+
+def test_idle_session_times_out():
+    async def silent_client(server):
+        client = server.connect()
+        assert (await client.receive()).kind == "ask"
+        return await asyncio.wait_for(client.receive(), 5)
+
+    server = SessionServer(ScriptedEngine(), idle_timeout=0.01)
+    assert asyncio.run(silent_client(server)) == Message("end", "timeout")
+    assert server.timed_out == 1
+
+
+async def tcp_session(server, talk):
+    # Serve on a free port, run talk(reader, writer) as the client, then collect loop errors
+    errors = []
+    loop = asyncio.get_running_loop()
+    loop.set_exception_handler(lambda _, context: errors.append(context))
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    serving = loop.create_task(server.serve("127.0.0.1", port))
+    for _ in range(100):
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            break
+        except OSError:
+            await asyncio.sleep(0.01)
+    try:
+        return await talk(reader, writer), errors
+    finally:
+        serving.cancel()
+        # Unretrieved task exceptions are reported when the task is collected
+        gc.collect()
+
+
+def test_tcp_session():
+    async def talk(reader, writer):
+        assert await reader.readline() == b"? Enter your choice: \n"
+        writer.write(b"1\n")
+        return [line async for line in reader]
+
+    received, errors = asyncio.run(tcp_session(SessionServer(ScriptedEngine(lines=2)), talk))
+    assert received == [b"You chose 1\n"] * 2
+    assert errors == []
+
+
+def test_tcp_connection_reset_closes_the_session():
+    server = SessionServer(ScriptedEngine())
+
+    async def talk(reader, writer):
+        assert await reader.readline() == b"? Enter your choice: \n"
+        # Abort with a reset rather than a clean close, so the server's read fails
+        writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        writer.transport.abort()
+        for _ in range(100):
+            if not server.sessions:
+                return True
+            await asyncio.sleep(0.01)
+        return False
+
+    closed, errors = asyncio.run(tcp_session(server, talk))
+    assert closed
+    assert errors == []
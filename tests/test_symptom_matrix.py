@@ -0,0 +1,24 @@
+# test_symptom_matrix.py
+import random
+
+from symptom_matrix import SymptomMatrix
+
+
+def test_match_agrees_with_batch_scoring(catalog):
+    matrix = SymptomMatrix(catalog)
+    rng = random.Random(0)
+    answers = [rng.sample(matrix.symptoms, rng.randint(0, len(matrix.symptoms))) for _ in range(200)]
+    for symptoms, counts in zip(answers, matrix.match_counts_batch(matrix.encode_batch(answers))):
+        disease_ids, matched = matrix.match(symptoms)
+        assert disease_ids.tolist() == counts.nonzero()[0].tolist()
+        assert matched.tolist() == counts[disease_ids].tolist()
+        perfect = matrix.is_perfect(disease_ids, matched)
+        assert all(set(catalog[matrix.disease_names[disease_id]]["symptoms"]) <= set(symptoms)
+                   for disease_id in disease_ids[perfect].tolist())
+
+
+def test_diseases_without_symptoms_never_match():
+    matrix = SymptomMatrix({"Empty": {"symptoms": []}, "Pain": {"symptoms": ["pain"]}})
+    assert matrix.match([])[0].tolist() == []
+    disease_ids, counts = matrix.match(["pain", "unknown"])
+    assert disease_ids.tolist() == [1] and matrix.is_perfect(disease_ids, counts).tolist() == [True]